@@ -0,0 +1,139 @@
+"""
+Set-based bulk operations on alerts.
+
+Alerts are selected either by an ID list or by a filter spec (e.g. all unread
+alerts for one studio older than seven days), or both, and every operation is
+a single UPDATE or DELETE ... WHERE; rows are never loaded. ID lists are split
+into chunks of ID_CHUNK_SIZE, one statement each, all in the caller's
+transaction. Each operation returns the number of rows it changed: alerts
+already in the target state are left untouched and not counted. Deleting
+alerts also drops their unsent notifications, chunk by chunk.
+"""
+from datetime import datetime, timedelta
+from itertools import islice
+
+from sqlalchemy import update, delete, func, true, and_
+from src.models.maintenance import db, Alert, Priority
+from src.alert_escalation import discard_pending_notifications
+
+# Keeps IN lists well under SQLite's bound-parameter limit
+ID_CHUNK_SIZE = 500
+
+FILTER_FIELDS = (
+    'studio_id', 'equipment_id', 'schedule_id', 'alert_type', 'priority',
+    'is_read', 'is_resolved', 'older_than_days', 'created_before', 'created_after'
+)
+
+
+def _integer(field, value):
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(f'{field} must be an integer')
+    return value
+
+
+def _timestamp(field, value):
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{field} must be an ISO date or datetime')
+
+
+def _values(value):
+    return value if isinstance(value, list) else [value]
+
+
+def filter_conditions(filters):
+    """
+    WHERE conditions for a filter spec. Keys are FILTER_FIELDS; ids, alert_type
+    and priority also accept a list, and older_than_days counts from now.
+    """
+    if not isinstance(filters, dict):
+        raise ValueError('filter must be an object')
+    unknown = sorted(set(filters) - set(FILTER_FIELDS))
+    if unknown:
+        raise ValueError(f'Unknown filter field: {unknown[0]}')
+
+    table = Alert.__table__
+    conditions = []
+    for field in ('studio_id', 'equipment_id', 'schedule_id'):
+        if field in filters:
+            conditions.append(table.c[field].in_([_integer(field, value) for value in _values(filters[field])]))
+    if 'alert_type' in filters:
+        conditions.append(table.c.alert_type.in_([str(value) for value in _values(filters['alert_type'])]))
+    if 'priority' in filters:
+        try:
+            priorities = [Priority(value) for value in _values(filters['priority'])]
+        except ValueError:
+            raise ValueError(f'Invalid priority: {filters["priority"]}')
+        conditions.append(table.c.priority.in_(priorities))
+    for field in ('is_read', 'is_resolved'):
+        if field in filters:
+            if not isinstance(filters[field], bool):
+                raise ValueError(f'{field} must be true or false')
+            column = table.c[field]
+            conditions.append(column == true() if filters[field] else column.isnot(True))
+    if 'older_than_days' in filters:
+        days = _integer('older_than_days', filters['older_than_days'])
+        conditions.append(table.c.created_at < datetime.utcnow() - timedelta(days=days))
+    if 'created_before' in filters:
+        conditions.append(table.c.created_at < _timestamp('created_before', filters['created_before']))
+    if 'created_after' in filters:
+        conditions.append(table.c.created_at >= _timestamp('created_after', filters['created_after']))
+    return conditions
+
+
+def _id_chunks(alert_ids, chunk_size):
+    if not isinstance(alert_ids, list):
+        raise ValueError('alert_ids must be a list')
+    ids = iter(sorted({_integer('alert_ids', alert_id) for alert_id in alert_ids}))
+    while True:
+        chunk = list(islice(ids, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _selections(conditions, alert_ids=None, filters=None, chunk_size=ID_CHUNK_SIZE):
+    """WHERE conditions selecting the alerts, one list per ID chunk (or one for a filter)"""
+    if not alert_ids and not filters:
+        raise ValueError('Provide alert_ids or a non-empty filter')
+    conditions = list(conditions) + (filter_conditions(filters) if filters else [])
+    if not alert_ids:
+        yield conditions
+        return
+    for chunk in _id_chunks(alert_ids, chunk_size):
+        yield [Alert.__table__.c.id.in_(chunk)] + conditions
+
+
+def _execute(statement, conditions, alert_ids=None, filters=None, chunk_size=ID_CHUNK_SIZE):
+    """Run ``statement`` once per ID chunk (or once for a filter); returns rows affected"""
+    return sum(
+        db.session.execute(statement.where(*selection)).rowcount
+        for selection in _selections(conditions, alert_ids, filters, chunk_size)
+    )
+
+
+def bulk_mark_read(alert_ids=None, filters=None):
+    table = Alert.__table__
+    statement = update(table).values(is_read=True, read_at=func.coalesce(table.c.read_at, datetime.utcnow()))
+    return _execute(statement, [table.c.is_read.isnot(True)], alert_ids, filters)
+
+
+def bulk_resolve(alert_ids=None, filters=None, resolved_by=None):
+    table = Alert.__table__
+    statement = update(table).values(is_resolved=True, resolved_at=datetime.utcnow(), resolved_by=resolved_by)
+    return _execute(statement, [table.c.is_resolved.isnot(True)], alert_ids, filters)
+
+
+def bulk_acknowledge(alert_ids=None, filters=None):
+    """Alerts have no separate acknowledgement state; acknowledging marks them read"""
+    return bulk_mark_read(alert_ids, filters)
+
+
+def bulk_delete(alert_ids=None, filters=None):
+    deleted = 0
+    for selection in _selections([], alert_ids, filters):
+        # Queued notifications would otherwise go out for alerts that no longer exist
+        discard_pending_notifications(and_(*selection))
+        deleted += db.session.execute(delete(Alert.__table__).where(*selection)).rowcount
+    return deleted
@@ -0,0 +1,177 @@
+"""
+Set-based escalation of overdue alerts.
+
+An open alert (not resolved and not yet read/acknowledged) is overdue once it
+has sat at its priority longer than that priority's response time
+(RESPONSE_HOURS, counted from escalated_at or, before its first escalation,
+created_at). A pass raises every overdue alert one priority with a single
+UPDATE per transition, highest first, which also bumps escalation_level,
+stamps escalated_at with the pass time and tags the row with the pass's
+unique escalation_pass id. The alerts escalated in the pass (selected by that
+id) are then rescored and queued for notification together: one UPDATE for
+priority_score and one INSERT ... SELECT into the alert_notifications outbox,
+so a pass costs a fixed handful of statements however many alerts it touches.
+dispatch_notifications() drains the outbox in batches.
+
+escalation_level, escalated_at and escalation_pass are mapped onto Alert here
+when the model doesn't declare them; ensure_escalation_columns() adds them to
+an existing database.
+"""
+import uuid
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import Column, Integer, String, DateTime, inspect, select, update, insert, delete, func, literal, text
+from src.models.maintenance import db, Alert, Priority
+from src.alert_severity import severity_expression
+
+logger = logging.getLogger(__name__)
+
+# Hours an alert may wait at each priority before it is overdue
+RESPONSE_HOURS = {Priority.CRITICAL: 1, Priority.HIGH: 4, Priority.MEDIUM: 24, Priority.LOW: 72}
+# (from, to), highest first so no alert moves twice in one pass
+ESCALATIONS = (
+    (Priority.HIGH, Priority.CRITICAL),
+    (Priority.MEDIUM, Priority.HIGH),
+    (Priority.LOW, Priority.MEDIUM),
+)
+ESCALATION_MINUTES = 5
+NOTIFICATION_BATCH_SIZE = 1000
+
+_ESCALATION_COLUMNS = (
+    Column('escalation_level', Integer, default=0, nullable=False, server_default='0'),
+    Column('escalated_at', DateTime),
+    Column('escalation_pass', String(32)),
+)
+for _column in _ESCALATION_COLUMNS:
+    if _column.name not in Alert.__table__.c:
+        Alert.__table__.append_column(_column)
+        Alert.__mapper__.add_property(_column.name, _column)
+
+
+class AlertNotification(db.Model):
+    __tablename__ = 'alert_notifications'
+
+    id = db.Column(db.Integer, primary_key=True)
+    alert_id = db.Column(db.Integer, nullable=False, index=True)
+    studio_id = db.Column(db.Integer)
+    kind = db.Column(db.String(30), nullable=False)  # escalation
+    escalation_level = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    sent_at = db.Column(db.DateTime, index=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'alert_id': self.alert_id,
+            'studio_id': self.studio_id,
+            'kind': self.kind,
+            'escalation_level': self.escalation_level,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'sent_at': self.sent_at.isoformat() if self.sent_at else None
+        }
+
+
+def ensure_escalation_columns():
+    """Add the escalation columns to an existing alerts table"""
+    table = Alert.__table__
+    with db.engine.begin() as connection:
+        existing = {column['name'] for column in inspect(connection).get_columns(table.name)}
+        for column in _ESCALATION_COLUMNS:
+            if column.name not in existing:
+                logger.info(f"Adding alerts.{column.name}")
+                column_type = column.type.compile(dialect=connection.dialect)
+                default = ' NOT NULL DEFAULT 0' if column.server_default is not None else ''
+                connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}{default}"))
+
+
+def open_condition():
+    """Alerts nobody has resolved or acknowledged yet"""
+    table = Alert.__table__
+    condition = table.c.is_resolved.isnot(True) & table.c.is_read.isnot(True)
+    if 'status' in table.c:
+        condition = condition & (table.c.status == 'active')
+    return condition
+
+
+def overdue_condition(priority, now):
+    """Open alerts at ``priority`` past its response time"""
+    table = Alert.__table__
+    waiting_since = func.coalesce(table.c.escalated_at, table.c.created_at)
+    return open_condition() & (table.c.priority == priority) & (waiting_since < now - timedelta(hours=RESPONSE_HOURS[priority]))
+
+
+def escalate_overdue_alerts(now=None):
+    """
+    Escalate every overdue alert by one priority and queue a notification for
+    each. Runs in the caller's transaction; returns counts per transition.
+    """
+    table = Alert.__table__
+    now = now or datetime.utcnow()
+    pass_id = uuid.uuid4().hex
+    summary = {'escalated': {}, 'total': 0}
+
+    for current, target in ESCALATIONS:
+        result = db.session.execute(update(table).where(overdue_condition(current, now)).values(
+            priority=target,
+            escalation_level=func.coalesce(table.c.escalation_level, 0) + 1,
+            escalated_at=now,
+            escalation_pass=pass_id
+        ))
+        summary['escalated'][f'{current.value}_to_{target.value}'] = result.rowcount
+        summary['total'] += result.rowcount
+
+    if summary['total']:
+        escalated = table.c.escalation_pass == pass_id
+        db.session.execute(update(table).where(escalated).values(priority_score=severity_expression(now)))
+        notifications = AlertNotification.__table__
+        db.session.execute(insert(notifications).from_select(
+            ['alert_id', 'studio_id', 'kind', 'escalation_level', 'created_at'],
+            select(table.c.id, table.c.studio_id, literal('escalation'), table.c.escalation_level, literal(now))
+            .where(escalated)
+        ))
+
+    # Critical alerts can't go higher; report how many are past their response time
+    summary['overdue_critical'] = db.session.execute(
+        select(func.count()).select_from(table).where(overdue_condition(Priority.CRITICAL, now))
+    ).scalar()
+    return summary
+
+
+def dispatch_notifications(batch_size=NOTIFICATION_BATCH_SIZE, now=None):
+    """Deliver one batch of queued notifications and mark it sent; returns the count"""
+    notifications = AlertNotification.__table__
+    table = Alert.__table__
+    rows = db.session.execute(
+        select(notifications.c.id, table.c.title, table.c.priority, notifications.c.escalation_level)
+        .outerjoin(table, table.c.id == notifications.c.alert_id)
+        .where(notifications.c.sent_at.is_(None))
+        .order_by(notifications.c.id)
+        .limit(batch_size)
+    ).all()
+    if not rows:
+        return 0
+
+    # Email/SMS delivery would plug in here; notifications are logged for now
+    for _, title, priority, level in rows:
+        if title is None and priority is None:
+            # The alert was deleted before delivery; just mark it sent
+            continue
+        priority = priority.value if hasattr(priority, 'value') else priority
+        logger.info(f"NOTIFICATION: {str(priority).upper()} - {title}: Alert escalated to {priority} (level {level})")
+    db.session.execute(
+        update(notifications)
+        .where(notifications.c.sent_at.is_(None), notifications.c.id <= rows[-1][0])
+        .values(sent_at=now or datetime.utcnow())
+    )
+    return len(rows)
+
+
+def discard_pending_notifications(alert_condition):
+    """Delete unsent notifications for the alerts matching ``alert_condition``; call before deleting them"""
+    notifications = AlertNotification.__table__
+    table = Alert.__table__
+    return db.session.execute(delete(notifications).where(
+        notifications.c.sent_at.is_(None),
+        notifications.c.alert_id.in_(select(table.c.id).where(alert_condition))
+    )).rowcount
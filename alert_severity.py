@@ -0,0 +1,142 @@
+"""
+Stored, indexed severity score for alerts.
+
+priority_score = priority level (25/50/75/100 for low..critical)
+               + hours since creation, capped at MAX_AGE_BONUS
+               + CRITICAL_EQUIPMENT_BONUS if the alert's equipment is critical
+
+The score is computed in SQL by one expression, used everywhere it is written:
+right after an ORM flush that inserts an alert or changes its priority,
+creation time or equipment (and for every alert of a device whose is_critical
+flag changed), and by refresh_priority_scores(), which the scheduler runs
+every REFRESH_MINUTES to advance the age component. Only alerts younger than
+MAX_AGE_BONUS hours still change with age, so the periodic UPDATE touches a
+small, index-selected set of rows. With (priority_score, id) indexed, sorting
+alerts by severity reads the top of the index instead of every alert.
+
+priority_score is mapped onto Alert here when the model doesn't declare it;
+ensure_priority_score() adds the column and index to an existing database.
+"""
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import Column, Integer, Index, event, inspect, select, update, case, cast, extract, func, or_, true, text
+from sqlalchemy.orm import Session
+from src.models.maintenance import db, Alert, Equipment, Priority
+
+logger = logging.getLogger(__name__)
+
+LEVEL_SCORES = {Priority.LOW: 25, Priority.MEDIUM: 50, Priority.HIGH: 75, Priority.CRITICAL: 100}
+MAX_AGE_BONUS = 48
+CRITICAL_EQUIPMENT_BONUS = 25
+REFRESH_MINUTES = 10
+INDEX_NAME = 'ix_alerts_priority_score'
+
+_RESCORED_KEY = 'alert_severity_rescored'
+
+# Alert columns the score depends on
+SCORED_FIELDS = ('priority', 'created_at', 'equipment_id')
+
+if 'priority_score' not in Alert.__table__.c:
+    Alert.__table__.append_column(Column('priority_score', Integer, default=0, nullable=False, server_default='0'))
+    Alert.__mapper__.add_property('priority_score', Alert.__table__.c.priority_score)
+priority_score_index = Index(INDEX_NAME, Alert.__table__.c.priority_score, Alert.__table__.c.id)
+
+
+def _age_hours(now):
+    """
+    Whole hours between created_at and ``now`` in the bound engine's dialect.
+    Elsewhere the age is counted as the number of hour marks (up to
+    MAX_AGE_BONUS) created_at is at or before, which any database can compare.
+    """
+    created_at = Alert.__table__.c.created_at
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        return cast((func.julianday(now) - func.julianday(created_at)) * 24, Integer)
+    if dialect == 'postgresql':
+        return cast(extract('epoch', now - created_at) / 3600, Integer)
+    if dialect in ('mysql', 'mariadb'):
+        return func.timestampdiff(text('HOUR'), created_at, now)
+    return sum(
+        case((created_at <= now - timedelta(hours=hours), 1), else_=0) for hours in range(1, MAX_AGE_BONUS + 1)
+    )
+
+
+def severity_expression(now=None):
+    """SQL for an alert row's priority_score at ``now``"""
+    table = Alert.__table__
+    age = _age_hours(now or datetime.utcnow())
+    equipment = Equipment.__table__
+    critical = select(
+        case((equipment.c.is_critical == true(), CRITICAL_EQUIPMENT_BONUS), else_=0)
+    ).where(equipment.c.id == table.c.equipment_id).scalar_subquery()
+    return (
+        case(*[(table.c.priority == level, score) for level, score in LEVEL_SCORES.items()], else_=0)
+        + case((age >= MAX_AGE_BONUS, MAX_AGE_BONUS), (age < 0, 0), else_=age)
+        + func.coalesce(critical, 0)
+    )
+
+
+def refresh_priority_scores(alert_ids=None, equipment_ids=None, full=False, now=None, connection=None):
+    """
+    Recompute priority_score in one UPDATE: for the given alerts or equipment,
+    for every alert (full), or by default for the alerts whose age component
+    can still change. Returns the number of rows updated.
+    """
+    table = Alert.__table__
+    now = now or datetime.utcnow()
+    statement = update(table).values(priority_score=severity_expression(now))
+    if alert_ids is not None or equipment_ids is not None:
+        conditions = []
+        if alert_ids:
+            conditions.append(table.c.id.in_(list(alert_ids)))
+        if equipment_ids:
+            conditions.append(table.c.equipment_id.in_(list(equipment_ids)))
+        if not conditions:
+            return 0
+        statement = statement.where(or_(*conditions))
+    elif not full:
+        statement = statement.where(table.c.created_at >= now - timedelta(hours=MAX_AGE_BONUS + 1))
+    return (connection or db.session).execute(statement).rowcount
+
+
+def ensure_priority_score():
+    """Add the priority_score column and index to an existing alerts table and backfill it"""
+    table = Alert.__table__
+    with db.engine.begin() as connection:
+        columns = {column['name'] for column in inspect(connection).get_columns(table.name)}
+        if 'priority_score' not in columns:
+            logger.info("Adding alerts.priority_score")
+            connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN priority_score INTEGER NOT NULL DEFAULT 0"))
+            refresh_priority_scores(full=True, connection=connection)
+        priority_score_index.create(connection, checkfirst=True)
+
+
+@event.listens_for(Session, 'after_flush')
+def _score_flushed_alerts(session, flush_context):
+    """Score alerts inserted or re-prioritised in this flush, in the same transaction"""
+    alert_ids, equipment_ids = set(), set()
+    for instance in session.new:
+        if isinstance(instance, Alert):
+            alert_ids.add(instance.id)
+    for instance in session.dirty:
+        if isinstance(instance, Alert):
+            attributes = inspect(instance).attrs
+            if any(attributes[name].history.added for name in SCORED_FIELDS):
+                alert_ids.add(instance.id)
+        elif isinstance(instance, Equipment) and inspect(instance).attrs.is_critical.history.added:
+            equipment_ids.add(instance.id)
+    if alert_ids or equipment_ids:
+        refresh_priority_scores(alert_ids, equipment_ids, connection=session.connection())
+        session.info[_RESCORED_KEY] = (alert_ids, equipment_ids)
+
+
+@event.listens_for(Session, 'after_flush_postexec')
+def _expire_rescored(session, flush_context):
+    """Reload priority_score on next access for alerts rescored in SQL"""
+    alert_ids, equipment_ids = session.info.pop(_RESCORED_KEY, ((), ()))
+    if not alert_ids and not equipment_ids:
+        return
+    for instance in list(session.identity_map.values()):
+        if isinstance(instance, Alert) and (instance.id in alert_ids or instance.equipment_id in equipment_ids):
+            session.expire(instance, ['priority_score'])
@@ -0,0 +1,250 @@
+"""
+In-memory alert statistics.
+
+Alert counts (total, unread, unresolved, unresolved by priority and by type,
+and creations per hour for the recent window) are kept per studio and for all
+studios together, so /alerts/stats is answered from a few dictionary lookups
+instead of a round of COUNT queries.
+
+The counters are loaded from the database on first use and kept current
+incrementally: every ORM flush touching alerts is turned into +1/-1 deltas on
+the (studio, read, resolved, priority, type, hour) state of each row, and the
+deltas are applied once the transaction commits. Bulk UPDATE/DELETE/INSERT
+statements on the alerts table and writes from other workers bypass those
+events, so the counters are also rebuilt with two grouped queries (the recent
+window grouped by creation hour in SQL) every RECONCILE_SECONDS, and straight
+away after a bulk statement commits.
+"""
+import time
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, inspect, select, func, or_
+from sqlalchemy.orm import Session
+from src.models.maintenance import db, Alert
+
+# How often the counters are rebuilt to pick up writes the session events didn't see
+RECONCILE_SECONDS = 60
+RECENT_DAYS = 7
+
+# Columns a counter depends on; a write touching none of them is ignored
+TRACKED_FIELDS = ('studio_id', 'is_read', 'is_resolved', 'priority', 'alert_type', 'created_at')
+
+_HOUR_FORMAT = '%Y-%m-%d %H:00:00'
+
+_PENDING_KEY = 'alert_stats_changes'
+_STALE_KEY = 'alert_stats_stale'
+
+
+def _hour(value):
+    return (value or datetime.utcnow()).replace(minute=0, second=0, microsecond=0)
+
+
+def _hour_bucket(column):
+    """SQL truncating ``column`` to the hour, or None if the dialect has no known form"""
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        return func.strftime(_HOUR_FORMAT, column)
+    if dialect == 'postgresql':
+        return func.date_trunc('hour', column)
+    if dialect in ('mysql', 'mariadb'):
+        return func.date_format(column, _HOUR_FORMAT)
+    return None
+
+
+def _bucket_value(value):
+    return datetime.strptime(value, _HOUR_FORMAT) if isinstance(value, str) else value
+
+
+def _state(values):
+    """Counter key for one alert: (studio_id, is_read, is_resolved, priority, alert_type, created hour)"""
+    priority = values['priority']
+    return (
+        values['studio_id'],
+        bool(values['is_read']),
+        bool(values['is_resolved']),
+        priority.value if hasattr(priority, 'value') else priority,
+        values['alert_type'],
+        _hour(values['created_at'])
+    )
+
+
+def _empty_scope():
+    return {'total': 0, 'unread': 0, 'unresolved': 0, 'by_priority': Counter(), 'by_type': Counter(), 'created': Counter()}
+
+
+class AlertCounters:
+    """Alert counts per studio (and for all studios under key None)"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._scopes = {}
+        self._reconciled_at = None
+        self._stale = False
+
+    @property
+    def loaded(self):
+        return self._reconciled_at is not None
+
+    def _add(self, state, count):
+        studio_id, is_read, is_resolved, priority, alert_type, hour = state
+        for key in {None, studio_id}:
+            scope = self._scopes.get(key)
+            if scope is None:
+                scope = self._scopes[key] = _empty_scope()
+            scope['total'] += count
+            scope['created'][hour] += count
+            if not is_read:
+                scope['unread'] += count
+            if not is_resolved:
+                scope['unresolved'] += count
+                scope['by_priority'][priority] += count
+                scope['by_type'][alert_type] += count
+
+    def apply(self, changes):
+        """Apply committed deltas: {state: +n/-n}"""
+        with self._lock:
+            if not self.loaded:
+                return
+            for state, count in changes.items():
+                if count:
+                    self._add(state, count)
+
+    def invalidate(self):
+        """Rebuild from the database on the next read"""
+        self._stale = True
+
+    def reconcile(self):
+        """Rebuild every counter from the database"""
+        table = Alert.__table__
+        group = (table.c.studio_id, table.c.is_read, table.c.is_resolved, table.c.priority, table.c.alert_type)
+        since = _hour(datetime.utcnow() - timedelta(days=RECENT_DAYS))
+        recent = table.c.created_at >= since
+        older = or_(table.c.created_at < since, table.c.created_at.is_(None))
+        with self._lock:
+            self._stale = False
+            self._scopes = {}
+            # Rows older than the recent window share one bucket
+            for row in db.session.execute(select(*group, func.count()).where(older).group_by(*group)):
+                self._add(_state(dict(zip(TRACKED_FIELDS, row[:5]), created_at=datetime.min)), row[5])
+            bucket = _hour_bucket(table.c.created_at)
+            if bucket is None:
+                for row in db.session.execute(select(*group, table.c.created_at).where(recent)):
+                    self._add(_state(dict(zip(TRACKED_FIELDS, row))), 1)
+            else:
+                bucket = bucket.label('created_hour')
+                for row in db.session.execute(select(*group, bucket, func.count()).where(recent).group_by(*group, bucket)):
+                    self._add(_state(dict(zip(TRACKED_FIELDS, row[:5]), created_at=_bucket_value(row[5]))), row[6])
+            self._reconciled_at = time.monotonic()
+
+    def refresh(self, force=False):
+        with self._lock:
+            if force or self._stale or not self.loaded or time.monotonic() - self._reconciled_at >= RECONCILE_SECONDS:
+                self.reconcile()
+
+    def stats(self, studio_id=None):
+        """Counts in the shape /alerts/stats returns"""
+        since = _hour(datetime.utcnow() - timedelta(days=RECENT_DAYS))
+        with self._lock:
+            scope = self._scopes.get(studio_id) or _empty_scope()
+            return {
+                'total_alerts': scope['total'],
+                'unread_alerts': scope['unread'],
+                'unresolved_alerts': scope['unresolved'],
+                'recent_alerts': sum(count for hour, count in scope['created'].items() if hour >= since),
+                'by_priority': {priority: count for priority, count in scope['by_priority'].items() if count},
+                'by_type': {alert_type: count for alert_type, count in scope['by_type'].items() if count}
+            }
+
+
+alert_counters = AlertCounters()
+
+
+def get_alert_stats(studio_id=None):
+    alert_counters.refresh()
+    return alert_counters.stats(studio_id)
+
+
+def _current_values(histories, previous):
+    return {
+        name: history.added[0] if history.added else previous[name]
+        for name, history in histories.items()
+    }
+
+
+@event.listens_for(Session, 'before_flush')
+def _collect_updates(session, flush_context, instances):
+    """Deltas for modified and deleted alerts, taken while the old row is still in the database"""
+    if not alert_counters.loaded:
+        return
+    changes = session.info.setdefault(_PENDING_KEY, Counter())
+    unknown = {}
+    for instance in list(session.dirty) + list(session.deleted):
+        if not isinstance(instance, Alert) or instance.id is None:
+            continue
+        deleted = instance in session.deleted
+        attributes = inspect(instance).attrs
+        histories = {name: attributes[name].history for name in TRACKED_FIELDS}
+        if not deleted and not any(history.added for history in histories.values()):
+            continue
+        previous = {}
+        for name, history in histories.items():
+            if history.deleted:
+                previous[name] = history.deleted[0]
+            elif history.unchanged:
+                previous[name] = history.unchanged[0]
+        if len(previous) < len(TRACKED_FIELDS):
+            # Set while expired (e.g. after a commit): old values aren't in memory
+            unknown[instance.id] = (histories, deleted)
+            continue
+        changes[_state(previous)] -= 1
+        if not deleted:
+            changes[_state(_current_values(histories, previous))] += 1
+
+    if unknown:
+        table = Alert.__table__
+        rows = session.connection().execute(
+            select(table.c.id, *[table.c[name] for name in TRACKED_FIELDS]).where(table.c.id.in_(list(unknown)))
+        )
+        for row in rows:
+            histories, deleted = unknown[row[0]]
+            previous = dict(zip(TRACKED_FIELDS, row[1:]))
+            changes[_state(previous)] -= 1
+            if not deleted:
+                changes[_state(_current_values(histories, previous))] += 1
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_inserts(session, flush_context):
+    if not alert_counters.loaded:
+        return
+    changes = session.info.setdefault(_PENDING_KEY, Counter())
+    for instance in session.new:
+        if isinstance(instance, Alert):
+            changes[_state({name: getattr(instance, name) for name in TRACKED_FIELDS})] += 1
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _detect_bulk_statements(orm_execute_state):
+    """Bulk DML on alerts isn't seen by the flush events; rebuild after it commits"""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return
+    table = getattr(orm_execute_state.statement, 'table', None)
+    if table is not None and getattr(table, 'name', None) == Alert.__tablename__:
+        orm_execute_state.session.info[_STALE_KEY] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_changes(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if session.info.pop(_STALE_KEY, False):
+        alert_counters.invalidate()
+    elif pending:
+        alert_counters.apply(pending)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_STALE_KEY, None)
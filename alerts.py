@@ -2,6 +2,10 @@ from flask import Blueprint, request, jsonify
 from src.models.maintenance import db, Alert, Studio, Equipment, MaintenanceSchedule, Priority
 from datetime import datetime, date, timedelta
 from sqlalchemy import and_, or_
+from src.alert_bulk import bulk_mark_read, bulk_resolve, bulk_acknowledge, bulk_delete
+from src.alert_stats import get_alert_stats as get_cached_alert_stats
+from src import alert_severity  # maps Alert.priority_score
+from src.alert_escalation import escalate_overdue_alerts
 
 alerts_bp = Blueprint('alerts', __name__)
 
@@ -16,6 +20,10 @@ def get_alerts():
         is_read = request.args.get('is_read', type=bool)
         is_resolved = request.args.get('is_resolved', type=bool)
         limit = request.args.get('limit', default=50, type=int)
+        sort = request.args.get('sort', 'created')
+        
+        if sort not in ('created', 'severity'):
+            return jsonify({'success': False, 'error': f'Invalid sort: {sort}'}), 400
         
         query = Alert.query
         
@@ -36,12 +44,18 @@ def get_alerts():
         if is_resolved is not None:
             query = query.filter(Alert.is_resolved == is_resolved)
         
-        alerts = query.order_by(Alert.created_at.desc()).limit(limit).all()
+        # Severity reads the top of the (priority_score, id) index
+        if sort == 'severity':
+            query = query.order_by(Alert.priority_score.desc(), Alert.id.desc())
+        else:
+            query = query.order_by(Alert.created_at.desc())
+        alerts = query.limit(limit).all()
         
         # Include related data
         result = []
         for alert in alerts:
             alert_data = alert.to_dict()
+            alert_data['priority_score'] = alert.priority_score
             alert_data['studio_name'] = alert.studio.name if alert.studio else None
             alert_data['equipment_name'] = alert.equipment.name if alert.equipment else None
             result.append(alert_data)
@@ -168,26 +182,22 @@ def delete_alert(alert_id):
 
 @alerts_bp.route('/alerts/bulk-read', methods=['POST'])
 def mark_alerts_read():
-    """Mark multiple alerts as read"""
+    """Mark alerts as read by ID list or filter spec in one set-based statement"""
     try:
-        data = request.get_json()
-        alert_ids = data.get('alert_ids', [])
+        data = request.get_json() or {}
         
-        if not alert_ids:
-            return jsonify({'success': False, 'error': 'No alert IDs provided'}), 400
-        
-        alerts = Alert.query.filter(Alert.id.in_(alert_ids)).all()
-        
-        for alert in alerts:
-            alert.is_read = True
-            if not alert.read_at:
-                alert.read_at = datetime.utcnow()
+        try:
+            count = bulk_mark_read(data.get('alert_ids'), data.get('filter'))
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'success': False, 'error': str(e)}), 400
         
         db.session.commit()
         
         return jsonify({
             'success': True,
-            'message': f'{len(alerts)} alerts marked as read'
+            'count': count,
+            'message': f'{count} alerts marked as read'
         })
     except Exception as e:
         db.session.rollback()
@@ -195,27 +205,68 @@ def mark_alerts_read():
 
 @alerts_bp.route('/alerts/bulk-resolve', methods=['POST'])
 def resolve_alerts():
-    """Mark multiple alerts as resolved"""
+    """Mark alerts as resolved by ID list or filter spec in one set-based statement"""
     try:
-        data = request.get_json()
-        alert_ids = data.get('alert_ids', [])
-        resolved_by = data.get('resolved_by')
+        data = request.get_json() or {}
         
-        if not alert_ids:
-            return jsonify({'success': False, 'error': 'No alert IDs provided'}), 400
+        try:
+            count = bulk_resolve(data.get('alert_ids'), data.get('filter'), resolved_by=data.get('resolved_by'))
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'success': False, 'error': str(e)}), 400
         
-        alerts = Alert.query.filter(Alert.id.in_(alert_ids)).all()
+        db.session.commit()
         
-        for alert in alerts:
-            alert.is_resolved = True
-            alert.resolved_at = datetime.utcnow()
-            alert.resolved_by = resolved_by
+        return jsonify({
+            'success': True,
+            'count': count,
+            'message': f'{count} alerts resolved'
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@alerts_bp.route('/alerts/bulk-acknowledge', methods=['POST'])
+def acknowledge_alerts():
+    """Acknowledge alerts by ID list or filter spec in one set-based statement"""
+    try:
+        data = request.get_json() or {}
+        
+        try:
+            count = bulk_acknowledge(data.get('alert_ids'), data.get('filter'))
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'count': count,
+            'message': f'{count} alerts acknowledged'
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@alerts_bp.route('/alerts/bulk-delete', methods=['POST'])
+def delete_alerts():
+    """Delete alerts by ID list or filter spec in one set-based statement"""
+    try:
+        data = request.get_json() or {}
+        
+        try:
+            count = bulk_delete(data.get('alert_ids'), data.get('filter'))
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'success': False, 'error': str(e)}), 400
         
         db.session.commit()
         
         return jsonify({
             'success': True,
-            'message': f'{len(alerts)} alerts resolved'
+            'count': count,
+            'message': f'{count} alerts deleted'
         })
     except Exception as e:
         db.session.rollback()
@@ -313,60 +364,31 @@ def generate_maintenance_alerts():
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@alerts_bp.route('/alerts/escalate', methods=['POST'])
+def escalate_alerts():
+    """Escalate every overdue alert by one priority and queue notifications"""
+    try:
+        summary = escalate_overdue_alerts()
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'data': summary,
+            'message': f"{summary['total']} alerts escalated"
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @alerts_bp.route('/alerts/stats', methods=['GET'])
 def get_alert_stats():
-    """Get alert statistics"""
+    """Get alert statistics, served from the in-memory counters"""
     try:
         studio_id = request.args.get('studio_id', type=int)
         
-        query = Alert.query
-        if studio_id:
-            query = query.filter(Alert.studio_id == studio_id)
-        
-        # Total counts
-        total_alerts = query.count()
-        unread_alerts = query.filter(Alert.is_read == False).count()
-        unresolved_alerts = query.filter(Alert.is_resolved == False).count()
-        
-        # Alerts by priority
-        from sqlalchemy import func
-        priority_stats = db.session.query(
-            Alert.priority,
-            func.count(Alert.id).label('count')
-        ).filter(Alert.is_resolved == False)
-        
-        if studio_id:
-            priority_stats = priority_stats.filter(Alert.studio_id == studio_id)
-        
-        priority_stats = priority_stats.group_by(Alert.priority).all()
-        priority_data = {priority.value: count for priority, count in priority_stats}
-        
-        # Alerts by type
-        type_stats = db.session.query(
-            Alert.alert_type,
-            func.count(Alert.id).label('count')
-        ).filter(Alert.is_resolved == False)
-        
-        if studio_id:
-            type_stats = type_stats.filter(Alert.studio_id == studio_id)
-        
-        type_stats = type_stats.group_by(Alert.alert_type).all()
-        type_data = {alert_type: count for alert_type, count in type_stats}
-        
-        # Recent alerts (last 7 days)
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        recent_alerts = query.filter(Alert.created_at >= week_ago).count()
-        
         return jsonify({
             'success': True,
-            'data': {
-                'total_alerts': total_alerts,
-                'unread_alerts': unread_alerts,
-                'unresolved_alerts': unresolved_alerts,
-                'recent_alerts': recent_alerts,
-                'by_priority': priority_data,
-                'by_type': type_data
-            }
+            'data': get_cached_alert_stats(studio_id or None)
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
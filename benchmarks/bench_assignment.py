@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the technician assignment solver.
+
+Generates a synthetic backlog of open schedules (a share of it already
+overdue) and a technician roster, then times the greedy pass and the local
+search and reports lateness and utilization before and after improvement.
+No database is needed.
+
+Usage:
+    python benchmarks/bench_assignment.py --schedules 20000 --technicians 200
+    python benchmarks/bench_assignment.py --restricted-share 0.5 --load 1.1
+"""
+import os
+import sys
+import json
+import random
+import argparse
+import statistics
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from src.technician_assignment import AssignmentSolver, Job, Technician, DEFAULT_CAPACITY_MINUTES
+
+DURATIONS = [30, 45, 60, 60, 90, 120, 180]
+WEIGHTS = [(1, 30), (2, 45), (4, 20), (8, 5)]
+
+
+def generate(schedules, technicians, horizon_days, studios, load, overdue_share, restricted_share, seed):
+    """Synthetic jobs sized so total work is ``load`` times total capacity"""
+    rng = random.Random(seed)
+    roster = []
+    for index in range(technicians):
+        studio_ids = None
+        if rng.random() < restricted_share:
+            home = rng.randrange(studios)
+            studio_ids = frozenset({home, (home + 1) % studios, (home + 2) % studios})
+        roster.append(Technician(f'Tech {index:03d}', DEFAULT_CAPACITY_MINUTES, studio_ids))
+
+    capacity = technicians * DEFAULT_CAPACITY_MINUTES * horizon_days
+    scale = load * capacity / (schedules * statistics.mean(DURATIONS))
+    priority_weights, shares = zip(*WEIGHTS)
+    jobs = []
+    for index in range(schedules):
+        due = -rng.randint(1, 14) if rng.random() < overdue_share else rng.randrange(horizon_days)
+        duration = max(15, int(rng.choice(DURATIONS) * scale))
+        weight = rng.choices(priority_weights, weights=shares)[0]
+        jobs.append(Job(index + 1, rng.randrange(studios), due, duration, weight, None))
+    return jobs, roster
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the technician assignment solver')
+    parser.add_argument('--schedules', type=int, default=20000)
+    parser.add_argument('--technicians', type=int, default=200)
+    parser.add_argument('--horizon-days', type=int, default=14)
+    parser.add_argument('--studios', type=int, default=100)
+    parser.add_argument('--load', type=float, default=0.9, help='Total work as a share of total capacity')
+    parser.add_argument('--overdue-share', type=float, default=0.05)
+    parser.add_argument('--restricted-share', type=float, default=0.0,
+                        help='Share of technicians limited to three home studios')
+    parser.add_argument('--time-limit', type=float, default=2.0, help='Local search budget in seconds')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Write results as JSON')
+    args = parser.parse_args()
+
+    jobs, roster = generate(args.schedules, args.technicians, args.horizon_days, args.studios,
+                            args.load, args.overdue_share, args.restricted_share, args.seed)
+
+    runs = []
+    for _ in range(args.repeat):
+        solver = AssignmentSolver(jobs, roster, args.horizon_days, time_limit=args.time_limit)
+        result = solver.solve()
+        result.pop('placement')
+        result.pop('unassigned')
+        runs.append(result)
+
+    best = min(runs, key=lambda r: r['elapsed_seconds'])
+    print(f"{args.schedules} schedules x {args.technicians} technicians over {args.horizon_days} days (load {args.load})")
+    print(f"  greedy:       {best['greedy_seconds']:.3f}s")
+    print(f"  total:        {best['elapsed_seconds']:.3f}s "
+          f"(median {statistics.median(r['elapsed_seconds'] for r in runs):.3f}s over {args.repeat} runs)")
+    print(f"  moves:        {best['lateness_moves']} lateness, {best['balance_moves']} balance")
+    for label in ('greedy', 'final'):
+        m = best[label]
+        print(f"  {label:<7} assigned={m['assigned']} unassigned={m['unassigned']} late={m['late_jobs']} "
+              f"weighted_lateness={m['weighted_lateness']} utilization={m['utilization_min']}-{m['utilization_max']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'arguments': vars(args), 'runs': runs}, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the HTML report renderer.
+
+Builds synthetic maintenance summary data (overdue and upcoming rows split
+evenly) and renders it through the compiled report template at several sizes,
+reporting time to first chunk, total render time, output size and peak memory
+while streaming. Per-row cost should stay flat as the report grows. No
+database is needed.
+
+Usage:
+    python benchmarks/bench_html_report.py --rows 50000
+    python benchmarks/bench_html_report.py --rows 5000 50000 200000 --repeat 5
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+import tracemalloc
+from datetime import date, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from src.report_templates import stream_maintenance_report, render_maintenance_digest
+
+PRIORITIES = ['low', 'medium', 'high', 'critical']
+TASKS = ['Amplifier Inspection', 'Microphone Battery Check', 'DSP Firmware Update', 'Speaker Cleaning']
+
+
+def generate(rows, seed):
+    """Report data shaped like build_maintenance_summary's output"""
+    rng = random.Random(seed)
+    today = date.today()
+
+    def item(index, days):
+        return {
+            'id': index,
+            'equipment_name': f'Device <{index}> & Co',
+            'studio_name': f'Studio {rng.randrange(100)}',
+            'task_name': rng.choice(TASKS),
+            'scheduled_date': (today + timedelta(days=days)).isoformat(),
+            'priority': rng.choice(PRIORITIES)
+        }
+
+    overdue = [dict(item(i, -rng.randint(1, 60)), days_overdue=rng.randint(1, 60)) for i in range(rows // 2)]
+    upcoming = [dict(item(i, rng.randint(0, 30)), days_until=rng.randint(0, 30)) for i in range(rows - rows // 2)]
+    return {
+        'report_info': {
+            'generated_at': today.isoformat(),
+            'period_start': (today - timedelta(days=30)).isoformat(),
+            'period_end': today.isoformat(),
+            'studio_id': None,
+            'studio_name': None
+        },
+        'summary': {
+            'total_equipment': rows,
+            'maintenance_completion_rate': 87.5,
+            'overdue_tasks': len(overdue),
+            'upcoming_tasks': len(upcoming),
+            'critical_alerts': 3,
+            'avg_task_duration': 42.0
+        },
+        'equipment_stats': {'total_equipment': rows, 'critical_equipment': rows // 10,
+                            'by_category': {'sound_system': rows // 2, 'lighting': rows - rows // 2}},
+        'overdue_maintenance': overdue,
+        'upcoming_maintenance': upcoming,
+        'recommendations': [{'type': 'urgent', 'title': 'Address Overdue Maintenance',
+                             'description': f'{len(overdue)} maintenance tasks are overdue.'}]
+    }
+
+
+def measure(report_data):
+    """Timing pass, then a separate pass under tracemalloc for peak memory"""
+    started = time.perf_counter()
+    first_chunk, size = None, 0
+    for chunk in stream_maintenance_report(report_data):
+        if first_chunk is None:
+            first_chunk = time.perf_counter() - started
+        size += len(chunk)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    for chunk in stream_maintenance_report(report_data):
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'first_chunk_seconds': first_chunk, 'elapsed_seconds': elapsed, 'bytes': size, 'peak_bytes': peak}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the streaming HTML report renderer')
+    parser.add_argument('--rows', type=int, nargs='+', default=[5000, 50000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Write results as JSON')
+    args = parser.parse_args()
+
+    results = []
+    for rows in args.rows:
+        report_data = generate(rows, args.seed)
+        runs = [measure(report_data) for _ in range(args.repeat)]
+        best = min(runs, key=lambda r: r['elapsed_seconds'])
+
+        started = time.perf_counter()
+        digest = render_maintenance_digest(report_data)
+        digest_seconds = time.perf_counter() - started
+
+        results.append({'rows': rows, 'runs': runs, 'digest_seconds': digest_seconds, 'digest_bytes': len(digest)})
+        print(f"{rows} rows")
+        print(f"  first chunk:  {best['first_chunk_seconds'] * 1000:.2f} ms")
+        print(f"  total:        {best['elapsed_seconds']:.3f}s "
+              f"(median {statistics.median(r['elapsed_seconds'] for r in runs):.3f}s over {args.repeat} runs), "
+              f"{best['elapsed_seconds'] / rows * 1e6:.2f} us/row")
+        print(f"  output:       {best['bytes'] / 1024 / 1024:.1f} MB, peak traced memory {best['peak_bytes'] / 1024:.0f} KB")
+        print(f"  digest:       {digest_seconds * 1000:.2f} ms, {len(digest) / 1024:.0f} KB")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'arguments': vars(args), 'results': results}, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
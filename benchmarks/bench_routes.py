@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Route-level benchmark suite for the SoulCycle AV Maintenance System.
+
+Loads synthetic datasets (see ``create_sample_data.py --scale``) into throwaway
+SQLite databases and exercises every read API route through the Flask test
+client, recording p50/p95 latency, SQL query counts and peak Python memory per
+route. Results can be saved as a local baseline and compared against later.
+No baseline is committed: timings only mean something on the machine that
+recorded them, so create one with ``run --update-baseline`` first.
+
+Usage:
+    python benchmarks/bench_routes.py run --datasets small medium
+    python benchmarks/bench_routes.py run --update-baseline
+    python benchmarks/bench_routes.py compare --tolerance 0.25
+"""
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import platform
+import subprocess
+import tempfile
+import tracemalloc
+from datetime import datetime, date
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, PROJECT_DIR)
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+DEFAULT_RESULTS = os.path.join(BENCH_DIR, 'results.json')
+DEFAULT_DATA_DIR = os.path.join(BENCH_DIR, '.data')
+
+# Dataset sizes passed straight to create_scaled_data
+DATASETS = {
+    'small': {'studios': 5, 'devices_per_studio': 10, 'years': 1, 'alerts_per_studio': 20},
+    'medium': {'studios': 50, 'devices_per_studio': 30, 'years': 2, 'alerts_per_studio': 60},
+    'large': {'studios': 300, 'devices_per_studio': 60, 'years': 3, 'alerts_per_studio': 100}
+}
+
+# (name, path) pairs; {studio_id} and {equipment_id} are filled from the dataset
+ROUTES = [
+    ('studios.list', '/api/studios'),
+    ('studios.detail', '/api/studios/{studio_id}'),
+    ('studios.equipment', '/api/studios/{studio_id}/equipment'),
+    ('studios.stats', '/api/studios/{studio_id}/stats'),
+    ('equipment.list', '/api/equipment'),
+    ('equipment.list_by_studio', '/api/equipment?studio_id={studio_id}'),
+    ('equipment.detail', '/api/equipment/{equipment_id}'),
+    ('equipment.categories', '/api/equipment/categories'),
+    ('equipment.maintenance_due', '/api/equipment/maintenance-due'),
+    ('equipment.stats', '/api/equipment/stats'),
+    ('maintenance.tasks', '/api/maintenance/tasks'),
+    ('maintenance.schedules', '/api/maintenance/schedules'),
+    ('maintenance.schedules_by_studio', '/api/maintenance/schedules?studio_id={studio_id}'),
+    ('maintenance.overdue', '/api/maintenance/schedules/overdue'),
+    ('maintenance.history', '/api/maintenance/history'),
+    ('maintenance.stats', '/api/maintenance/stats'),
+    ('alerts.list', '/api/alerts'),
+    ('alerts.stats', '/api/alerts/stats'),
+    ('alerts.types', '/api/alerts/types')
+]
+
+REPORT_ROUTES = [
+    ('reports.maintenance_summary', '/api/reports/maintenance-summary'),
+    ('reports.equipment_status', '/api/reports/equipment-status'),
+    ('reports.monthly_summary', '/api/reports/monthly-summary')
+]
+
+REPORT_FORMATS = ['json', 'csv', 'html']
+
+
+def _percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def all_routes():
+    """Every benchmarked (name, path) pair including each report format"""
+    routes = list(ROUTES)
+    for name, path in REPORT_ROUTES:
+        for fmt in REPORT_FORMATS:
+            routes.append((f'{name}.{fmt}', f'{path}?format={fmt}'))
+    return routes
+
+
+def _benchmark_dataset(name, db_path, output_path, iterations, warmup, seed, as_of):
+    """Build (if needed) and benchmark one dataset; runs in a child process"""
+    build = not os.path.exists(db_path)
+
+    # The app binds its engine at import time, so these imports must follow DATABASE_URL
+    from sqlalchemy import event
+    from src.main import app
+    from src.models.maintenance import db, Studio, Equipment, MaintenanceSchedule, MaintenanceHistory, Alert
+    from create_sample_data import create_scaled_data
+
+    if build:
+        create_scaled_data(seed=seed, as_of=as_of, **DATASETS[name])
+
+    with app.app_context():
+        row_counts = {
+            'studios': Studio.query.count(),
+            'equipment': Equipment.query.count(),
+            'schedules': MaintenanceSchedule.query.count(),
+            'history': MaintenanceHistory.query.count(),
+            'alerts': Alert.query.count()
+        }
+        sample = {
+            'studio_id': db.session.query(Studio.id).order_by(Studio.id).first()[0],
+            'equipment_id': db.session.query(Equipment.id).order_by(Equipment.id).first()[0]
+        }
+
+        query_count = {'value': 0}
+
+        def _count_query(conn, cursor, statement, parameters, context, executemany):
+            query_count['value'] += 1
+
+        event.listen(db.engine, 'before_cursor_execute', _count_query)
+        db.session.remove()
+
+    client = app.test_client()
+    results = {}
+
+    for route_name, template in all_routes():
+        path = template.format(**sample)
+
+        for _ in range(warmup):
+            client.get(path).get_data()
+
+        latencies = []
+        queries = []
+        status_code = None
+        for _ in range(iterations):
+            query_count['value'] = 0
+            started = time.perf_counter()
+            response = client.get(path)
+            response.get_data()
+            latencies.append((time.perf_counter() - started) * 1000)
+            queries.append(query_count['value'])
+            status_code = response.status_code
+
+        # Memory is measured on a separate request so tracing overhead doesn't skew latency
+        tracemalloc.start()
+        client.get(path).get_data()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        results[route_name] = {
+            'path': path,
+            'status_code': status_code,
+            'p50_ms': round(_percentile(latencies, 50), 3),
+            'p95_ms': round(_percentile(latencies, 95), 3),
+            'mean_ms': round(sum(latencies) / len(latencies), 3),
+            'queries': max(queries),
+            'peak_memory_kb': round(peak / 1024, 1)
+        }
+        print(f"  [{name}] {route_name:<40} p50={results[route_name]['p50_ms']:>9.2f}ms "
+              f"p95={results[route_name]['p95_ms']:>9.2f}ms queries={results[route_name]['queries']:>6} "
+              f"peak={results[route_name]['peak_memory_kb']:>10.1f}KB")
+
+    with open(output_path, 'w') as f:
+        json.dump({'rows': row_counts, 'routes': results}, f)
+
+
+def run_benchmarks(datasets, iterations=20, warmup=2, seed=42, as_of=None, data_dir=DEFAULT_DATA_DIR):
+    """Benchmark each dataset in its own interpreter and collect the results"""
+    as_of = as_of or date.today()
+    os.makedirs(data_dir, exist_ok=True)
+
+    results = {
+        'meta': {
+            'generated_at': datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': seed,
+            'as_of': as_of.isoformat(),
+            'iterations': iterations,
+            'warmup': warmup
+        },
+        'datasets': {}
+    }
+
+    for name in datasets:
+        db_path = os.path.join(data_dir, f'{name}-seed{seed}-{as_of.isoformat()}.db')
+        print(f"Benchmarking dataset '{name}' ({db_path})")
+
+        with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as tmp:
+            output_path = tmp.name
+        try:
+            env = dict(os.environ, DATABASE_URL=f'sqlite:///{db_path}')
+            subprocess.run([
+                sys.executable, os.path.abspath(__file__), '_dataset', name,
+                '--db-path', db_path, '--output', output_path,
+                '--iterations', str(iterations), '--warmup', str(warmup),
+                '--seed', str(seed), '--as-of', as_of.isoformat()
+            ], env=env, check=True)
+            with open(output_path) as f:
+                results['datasets'][name] = json.load(f)
+        finally:
+            os.unlink(output_path)
+
+    return results
+
+
+def compare_results(baseline, current, tolerance=0.2, min_ms=1.0):
+    """
+    Compare two result sets and return a list of regression descriptions.
+
+    Latency and peak memory regress when they grow by more than ``tolerance``
+    (latency changes below ``min_ms`` are treated as noise). Query counts are
+    deterministic for a given dataset, so any increase is a regression.
+    """
+    regressions = []
+    for dataset, current_data in current['datasets'].items():
+        baseline_routes = baseline.get('datasets', {}).get(dataset, {}).get('routes', {})
+        for route, now in current_data['routes'].items():
+            before = baseline_routes.get(route)
+            if not before:
+                continue
+
+            if now['p95_ms'] - before['p95_ms'] > min_ms and now['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+                regressions.append(f"{dataset}/{route}: p95 {before['p95_ms']:.2f}ms -> {now['p95_ms']:.2f}ms")
+            if now['queries'] > before['queries']:
+                regressions.append(f"{dataset}/{route}: queries {before['queries']} -> {now['queries']}")
+            if now['peak_memory_kb'] > before['peak_memory_kb'] * (1 + tolerance):
+                regressions.append(f"{dataset}/{route}: peak memory {before['peak_memory_kb']:.1f}KB -> {now['peak_memory_kb']:.1f}KB")
+            if now['status_code'] != before['status_code']:
+                regressions.append(f"{dataset}/{route}: status {before['status_code']} -> {now['status_code']}")
+    return regressions
+
+
+def _add_run_arguments(parser):
+    parser.add_argument('--datasets', nargs='+', choices=list(DATASETS), default=['small', 'medium', 'large'])
+    parser.add_argument('--iterations', type=int, default=20, help='Timed requests per route')
+    parser.add_argument('--warmup', type=int, default=2, help='Untimed requests per route before measuring')
+    parser.add_argument('--seed', type=int, default=42, help='Dataset seed')
+    parser.add_argument('--as-of', help='Dataset anchor date YYYY-MM-DD (default today)')
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR, help='Where generated SQLite datasets are cached')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Route-level benchmarks for the SoulCycle AV Maintenance System')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='Run the benchmarks and write a results file')
+    _add_run_arguments(run_parser)
+    run_parser.add_argument('--output', default=DEFAULT_RESULTS, help='Results file to write')
+    run_parser.add_argument('--update-baseline', action='store_true', help='Also overwrite the local baseline')
+    run_parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+
+    compare_parser = subparsers.add_parser('compare', help='Compare results against the local baseline')
+    _add_run_arguments(compare_parser)
+    compare_parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    compare_parser.add_argument('--results', help='Existing results file (runs the benchmarks when omitted)')
+    compare_parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed relative growth (0.2 = 20%%)')
+    compare_parser.add_argument('--min-ms', type=float, default=1.0, help='Ignore latency changes smaller than this')
+
+    dataset_parser = subparsers.add_parser('_dataset')
+    dataset_parser.add_argument('name', choices=list(DATASETS))
+    dataset_parser.add_argument('--db-path', required=True)
+    dataset_parser.add_argument('--output', required=True)
+    dataset_parser.add_argument('--iterations', type=int, required=True)
+    dataset_parser.add_argument('--warmup', type=int, required=True)
+    dataset_parser.add_argument('--seed', type=int, required=True)
+    dataset_parser.add_argument('--as-of', required=True)
+
+    args = parser.parse_args()
+    as_of = datetime.strptime(args.as_of, '%Y-%m-%d').date() if args.as_of else None
+
+    if args.command == '_dataset':
+        _benchmark_dataset(args.name, args.db_path, args.output, args.iterations, args.warmup, args.seed, as_of)
+        return 0
+
+    if args.command == 'run':
+        results = run_benchmarks(args.datasets, args.iterations, args.warmup, args.seed, as_of, args.data_dir)
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Results written to {args.output}")
+        if args.update_baseline:
+            with open(args.baseline, 'w') as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+            print(f"Baseline updated at {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; create one with: run --update-baseline")
+        return 2
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    if args.results:
+        with open(args.results) as f:
+            current = json.load(f)
+    else:
+        current = run_benchmarks(args.datasets, args.iterations, args.warmup, args.seed, as_of, args.data_dir)
+
+    regressions = compare_results(baseline, current, args.tolerance, args.min_ms)
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%} tolerance:")
+        for line in regressions:
+            print(f"  - {line}")
+        return 1
+
+    print("No regressions against baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
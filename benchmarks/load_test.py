@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Concurrent load-test harness for a running SoulCycle AV Maintenance System instance.
+
+Drives a configurable mix of dashboard reads, report generation and technician
+writes (schedule updates, equipment usage posts) from many asyncio clients at
+once, or replays the request lines of a werkzeug access log such as flask.log.
+Reports throughput, latency percentiles, error rates and SQLite "database is
+locked" failures; a concurrency sweep finds the saturation point.
+
+Usage:
+    python benchmarks/load_test.py --url http://localhost:5000 --concurrency 16 --duration 30
+    python benchmarks/load_test.py --sweep 1,2,4,8,16,32,64 --duration 20
+    python benchmarks/load_test.py --replay flask.log --concurrency 8
+"""
+import re
+import sys
+import json
+import math
+import time
+import random
+import asyncio
+import argparse
+from urllib.parse import urlsplit
+
+# Operation name -> relative weight in the synthetic profile
+DEFAULT_MIX = {
+    'dashboard.alert_stats': 20,
+    'dashboard.equipment_stats': 10,
+    'dashboard.maintenance_stats': 10,
+    'dashboard.alerts': 15,
+    'dashboard.overdue': 8,
+    'dashboard.schedules_by_studio': 8,
+    'reports.maintenance_summary_html': 2,
+    'reports.equipment_status_csv': 1,
+    'technician.update_schedule': 14,
+    'technician.update_usage': 12
+}
+
+LOCKED_MARKER = b'database is locked'
+ACCESS_LOG_PATTERN = re.compile(r'"(GET|POST|PUT|DELETE|HEAD) (\S+) HTTP/[\d.]+"')
+
+
+def _percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(pct / 100.0 * len(ordered))) - 1]
+
+
+class SyntheticProfile:
+    """Builds requests for the weighted dashboard / technician traffic mix"""
+
+    def __init__(self, mix, studio_ids, equipment_ids, schedule_ids, seed=None):
+        self.names = list(mix)
+        self.weights = [mix[name] for name in self.names]
+        self.studio_ids = studio_ids
+        self.equipment_ids = equipment_ids
+        self.schedule_ids = schedule_ids
+        self.rng = random.Random(seed)
+
+    def next_request(self):
+        """Return (operation, method, path, json_body)"""
+        op = self.rng.choices(self.names, weights=self.weights)[0]
+        studio_id = self.rng.choice(self.studio_ids)
+
+        if op == 'dashboard.alert_stats':
+            return op, 'GET', f'/api/alerts/stats?studio_id={studio_id}', None
+        if op == 'dashboard.equipment_stats':
+            return op, 'GET', f'/api/equipment/stats?studio_id={studio_id}', None
+        if op == 'dashboard.maintenance_stats':
+            return op, 'GET', f'/api/maintenance/stats?studio_id={studio_id}', None
+        if op == 'dashboard.alerts':
+            return op, 'GET', f'/api/alerts?studio_id={studio_id}&limit=50', None
+        if op == 'dashboard.overdue':
+            return op, 'GET', f'/api/maintenance/schedules/overdue?studio_id={studio_id}', None
+        if op == 'dashboard.schedules_by_studio':
+            return op, 'GET', f'/api/maintenance/schedules?studio_id={studio_id}&status=scheduled', None
+        if op == 'reports.maintenance_summary_html':
+            return op, 'GET', '/api/reports/maintenance-summary?format=html', None
+        if op == 'reports.equipment_status_csv':
+            return op, 'GET', f'/api/reports/equipment-status?format=csv&studio_id={studio_id}', None
+        if op == 'technician.update_schedule':
+            schedule_id = self.rng.choice(self.schedule_ids)
+            body = {'notes': f'Load test visit {self.rng.randint(1, 10 ** 6)}',
+                    'actual_duration_minutes': self.rng.randint(15, 120)}
+            return op, 'PUT', f'/api/maintenance/schedules/{schedule_id}', body
+        equipment_id = self.rng.choice(self.equipment_ids)
+        body = {'operating_hours': self.rng.randint(100, 20000), 'power_cycles': self.rng.randint(10, 3000)}
+        return op, 'POST', f'/api/equipment/{equipment_id}/usage', body
+
+
+class ReplayProfile:
+    """Cycles through the request lines of a werkzeug access log"""
+
+    def __init__(self, log_path, include_writes=False):
+        self.requests = []
+        self.skipped = 0
+        with open(log_path, errors='replace') as f:
+            for line in f:
+                match = ACCESS_LOG_PATTERN.search(line)
+                if not match:
+                    continue
+                method, path = match.groups()
+                # Access logs carry no request bodies, so writes are only replayed on request
+                if method not in ('GET', 'HEAD') and not include_writes:
+                    self.skipped += 1
+                    continue
+                self.requests.append((f'replay.{method.lower()}', method, path, {} if method in ('POST', 'PUT') else None))
+        if not self.requests:
+            raise ValueError(f'No replayable request lines found in {log_path}')
+        self.position = 0
+
+    def next_request(self):
+        request = self.requests[self.position % len(self.requests)]
+        self.position += 1
+        return request
+
+
+async def _send(host, port, method, path, body, timeout):
+    """Issue one HTTP/1.1 request on a fresh connection; returns (status, raw_body)"""
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        payload = json.dumps(body).encode() if body is not None else b''
+        head = [f'{method} {path} HTTP/1.1', f'Host: {host}:{port}', 'Connection: close', 'Accept: */*']
+        if body is not None:
+            head += ['Content-Type: application/json', f'Content-Length: {len(payload)}']
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode() + payload)
+        await writer.drain()
+        raw = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except (ConnectionError, OSError):
+            pass
+
+    status_line, _, rest = raw.partition(b'\r\n')
+    parts = status_line.split()
+    status = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 0
+    return status, rest
+
+
+class Stats:
+    """Collects per-operation latencies and failures for one run"""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.locked = 0
+        self.transport_errors = 0
+
+    def record(self, op, latency_ms, status, body):
+        self.latencies.setdefault(op, []).append(latency_ms)
+        if status >= 500 or status == 0:
+            self.errors[op] = self.errors.get(op, 0) + 1
+        if LOCKED_MARKER in body:
+            self.locked += 1
+
+    def record_failure(self, op):
+        self.transport_errors += 1
+        self.errors[op] = self.errors.get(op, 0) + 1
+
+    def summary(self, elapsed, concurrency):
+        all_latencies = [value for values in self.latencies.values() for value in values]
+        total = len(all_latencies) + self.transport_errors
+        error_count = sum(self.errors.values())
+        return {
+            'concurrency': concurrency,
+            'duration_s': round(elapsed, 2),
+            'requests': total,
+            'throughput_rps': round(total / elapsed, 2) if elapsed else 0,
+            'p50_ms': round(_percentile(all_latencies, 50) or 0, 2),
+            'p95_ms': round(_percentile(all_latencies, 95) or 0, 2),
+            'p99_ms': round(_percentile(all_latencies, 99) or 0, 2),
+            'error_rate': round(error_count / total, 4) if total else 0,
+            'database_locked': self.locked,
+            'transport_errors': self.transport_errors,
+            'operations': {
+                op: {
+                    'requests': len(values),
+                    'p50_ms': round(_percentile(values, 50), 2),
+                    'p95_ms': round(_percentile(values, 95), 2),
+                    'errors': self.errors.get(op, 0)
+                }
+                for op, values in sorted(self.latencies.items())
+            }
+        }
+
+
+async def run_load(base_url, profile, concurrency, duration, timeout=30.0):
+    """Run ``concurrency`` clients against ``base_url`` for ``duration`` seconds"""
+    parts = urlsplit(base_url)
+    host, port = parts.hostname, parts.port or 80
+    stats = Stats()
+    deadline = time.perf_counter() + duration
+
+    async def client():
+        while time.perf_counter() < deadline:
+            op, method, path, body = profile.next_request()
+            started = time.perf_counter()
+            try:
+                status, raw = await _send(host, port, method, path, body, timeout)
+            except (OSError, asyncio.TimeoutError):
+                stats.record_failure(op)
+                continue
+            stats.record(op, (time.perf_counter() - started) * 1000, status, raw)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return stats.summary(time.perf_counter() - started, concurrency)
+
+
+async def _discover_ids(base_url, timeout=30.0):
+    """Derive studio / equipment / schedule id ranges from the stats endpoints"""
+    parts = urlsplit(base_url)
+    host, port = parts.hostname, parts.port or 80
+
+    async def get_json(path):
+        status, raw = await _send(host, port, 'GET', path, None, timeout)
+        if status != 200:
+            raise RuntimeError(f'GET {path} returned {status}')
+        body = raw.split(b'\r\n\r\n', 1)[1]
+        return json.loads(body)
+
+    studios = (await get_json('/api/studios'))['data']
+    equipment_total = (await get_json('/api/equipment/stats'))['data']['total_equipment']
+    schedule_total = (await get_json('/api/maintenance/stats'))['data']['scheduled_maintenance']['total']
+    return (
+        [studio['id'] for studio in studios] or [1],
+        list(range(1, max(equipment_total, 1) + 1)),
+        list(range(1, max(schedule_total, 1) + 1))
+    )
+
+
+def find_saturation(results, min_gain=0.05):
+    """First concurrency level after which throughput stops improving by ``min_gain``"""
+    for previous, current in zip(results, results[1:]):
+        if current['throughput_rps'] < previous['throughput_rps'] * (1 + min_gain):
+            return previous['concurrency']
+    return results[-1]['concurrency'] if results else None
+
+
+def _print_summary(summary):
+    print(f"concurrency={summary['concurrency']:<4} rps={summary['throughput_rps']:>8.1f} "
+          f"p50={summary['p50_ms']:>8.1f}ms p95={summary['p95_ms']:>8.1f}ms p99={summary['p99_ms']:>8.1f}ms "
+          f"errors={summary['error_rate']:.2%} locked={summary['database_locked']}")
+
+
+def _parse_mix(value):
+    mix = dict(DEFAULT_MIX)
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f'Unknown operation: {name}')
+        mix[name] = float(weight)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrent load test for the SoulCycle AV Maintenance System')
+    parser.add_argument('--url', default='http://localhost:5000', help='Base URL of the running instance')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds per run (per level when sweeping)')
+    parser.add_argument('--sweep', help='Comma-separated concurrency levels, e.g. 1,2,4,8,16,32')
+    parser.add_argument('--mix', type=_parse_mix, default=DEFAULT_MIX,
+                        help='Override operation weights, e.g. technician.update_usage=30,dashboard.alerts=5')
+    parser.add_argument('--replay', help='Replay the request lines of a werkzeug access log instead of the synthetic mix')
+    parser.add_argument('--replay-writes', action='store_true', help='Also replay POST/PUT/DELETE lines (with empty bodies)')
+    parser.add_argument('--seed', type=int, default=None, help='Seed for the synthetic request mix')
+    parser.add_argument('--timeout', type=float, default=30, help='Per-request timeout in seconds')
+    parser.add_argument('--output', help='Write the JSON summary to this file')
+    args = parser.parse_args()
+
+    if args.replay:
+        profile = ReplayProfile(args.replay, include_writes=args.replay_writes)
+        print(f"Replaying {len(profile.requests)} requests from {args.replay} ({profile.skipped} write lines skipped)")
+    else:
+        studio_ids, equipment_ids, schedule_ids = asyncio.run(_discover_ids(args.url, args.timeout))
+        profile = SyntheticProfile(args.mix, studio_ids, equipment_ids, schedule_ids, seed=args.seed)
+
+    levels = [int(level) for level in args.sweep.split(',')] if args.sweep else [args.concurrency]
+    results = []
+    for level in levels:
+        summary = asyncio.run(run_load(args.url, profile, level, args.duration, args.timeout))
+        _print_summary(summary)
+        results.append(summary)
+
+    report = {'runs': results}
+    if len(results) > 1:
+        report['saturation_concurrency'] = find_saturation(results)
+        print(f"Throughput saturates at concurrency {report['saturation_concurrency']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
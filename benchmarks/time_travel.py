@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Time-travel harness for the maintenance scheduler.
+
+Loads a scaled synthetic dataset into a throwaway SQLite database, then drives
+MaintenanceScheduler with a SimulatedClock across a simulated period (a year by
+default), firing daily_maintenance_check, check_overdue_maintenance,
+weekly_maintenance_summary and monthly_maintenance_report on their production
+cadence. Technicians are simulated by completing a share of each day's work.
+Reports per-job duration and table growth over simulated time.
+
+Usage:
+    python benchmarks/time_travel.py --days 365 --studios 50 --devices-per-studio 30
+    python benchmarks/time_travel.py --completion-rate 0.7 --output time_travel.json
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+from datetime import datetime, date, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+
+def _complete_days_work(db, MaintenanceSchedule, TaskStatus, day, completion_rate):
+    """Mark a deterministic share of the day's scheduled work as completed"""
+    cutoff = int(completion_rate * 100)
+    table = MaintenanceSchedule.__table__
+    completed_at = datetime.combine(day, datetime.min.time()) + timedelta(hours=17)
+    result = db.session.execute(
+        table.update()
+        .where(table.c.scheduled_date == day)
+        .where(table.c.status == TaskStatus.SCHEDULED)
+        .where(table.c.id % 100 < cutoff)
+        .values(status=TaskStatus.COMPLETED, completed_date=completed_at)
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def run(args):
+    # The app binds its engine at import time, so DATABASE_URL has to be set first
+    os.environ['DATABASE_URL'] = f'sqlite:///{args.db_path}'
+
+    from src.main import app
+    from src.models.maintenance import db, Alert, MaintenanceSchedule, TaskStatus
+    from src.scheduler import MaintenanceScheduler, SimulatedClock
+    from create_sample_data import create_scaled_data
+
+    start = datetime.strptime(args.start, '%Y-%m-%d').date() if args.start else date.today()
+    create_scaled_data(
+        studios=args.studios,
+        devices_per_studio=args.devices_per_studio,
+        years=args.years,
+        alerts_per_studio=args.alerts_per_studio,
+        seed=args.seed,
+        as_of=start,
+        horizon_days=args.days + 30
+    )
+
+    clock = SimulatedClock(datetime.combine(start, datetime.min.time()))
+    scheduler = MaintenanceScheduler(app, clock=clock)
+    job_runs = []
+
+    def record(name, simulated_time, duration):
+        with app.app_context():
+            job_runs.append({
+                'job': name,
+                'simulated_time': simulated_time.isoformat(),
+                'duration_s': round(duration, 4),
+                'alerts': Alert.query.count(),
+                'schedules': MaintenanceSchedule.query.count()
+            })
+
+    monthly = {}
+    for offset in range(args.days):
+        day = start + timedelta(days=offset)
+        scheduler.run_simulated(datetime.combine(day + timedelta(days=1), datetime.min.time()), on_job=record)
+        with app.app_context():
+            completed = _complete_days_work(db, MaintenanceSchedule, TaskStatus, day, args.completion_rate)
+
+        bucket = monthly.setdefault(day.strftime('%Y-%m'), {'completed_schedules': 0})
+        bucket['completed_schedules'] += completed
+
+    # Roll job runs up per simulated month
+    for run_record in job_runs:
+        bucket = monthly[run_record['simulated_time'][:7]]
+        job = bucket.setdefault(run_record['job'], {'runs': 0, 'total_s': 0.0, 'max_s': 0.0})
+        job['runs'] += 1
+        job['total_s'] += run_record['duration_s']
+        job['max_s'] = max(job['max_s'], run_record['duration_s'])
+        bucket['alerts'] = run_record['alerts']
+        bucket['schedules'] = run_record['schedules']
+
+    print(f"\n{'Month':<8} {'Alerts':>9} {'Schedules':>10}  Job (runs, mean s, max s)")
+    for month, bucket in sorted(monthly.items()):
+        jobs = ', '.join(
+            f"{name.split('_')[0]}={stats['runs']}/{stats['total_s'] / stats['runs']:.3f}/{stats['max_s']:.3f}"
+            for name, stats in sorted(bucket.items()) if isinstance(stats, dict)
+        )
+        print(f"{month:<8} {bucket.get('alerts', 0):>9} {bucket.get('schedules', 0):>10}  {jobs}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'monthly': monthly, 'job_runs': job_runs}, f, indent=2)
+        print(f"Detailed results written to {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the maintenance scheduler across simulated time')
+    parser.add_argument('--days', type=int, default=365, help='Simulated days to run')
+    parser.add_argument('--start', help='Simulated start date YYYY-MM-DD (default today)')
+    parser.add_argument('--completion-rate', type=float, default=0.8,
+                        help="Share of each day's scheduled work technicians complete")
+    parser.add_argument('--studios', type=int, default=20)
+    parser.add_argument('--devices-per-studio', type=int, default=20)
+    parser.add_argument('--years', type=int, default=1, help='Years of pre-existing history in the dataset')
+    parser.add_argument('--alerts-per-studio', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--db-path', default=os.path.join(tempfile.gettempdir(), 'soulcycle_time_travel.db'))
+    parser.add_argument('--output', help='Write per-run and per-month results as JSON')
+    run(parser.parse_args())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,342 @@
+"""
+Bulk import of equipment, maintenance schedules and maintenance history.
+
+Records arrive as CSV or NDJSON and are processed in chunks: every foreign key
+in a chunk is resolved with one IN query per referenced table, valid rows are
+written with a single executemany INSERT, and each chunk commits on its own so
+a bad row never costs more than its chunk. Every rejected row is reported with
+its line number.
+
+Every row carries the same columns: fields a record leaves out or blank are
+filled from the column's default (or left NULL), so one chunk's executemany
+never drops or trips over a key the first row happened not to have.
+"""
+import io
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+from datetime import datetime, date, time, timedelta
+from itertools import islice
+
+from sqlalchemy import insert
+from sqlalchemy.exc import StatementError
+from src.models.maintenance import db, Studio, Equipment, MaintenanceTask, MaintenanceSchedule, MaintenanceHistory, TaskStatus, Priority
+
+# Keeps IN lists and executemany batches well under SQLite's bound-parameter limit
+DEFAULT_CHUNK_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+
+TRUE_VALUES = {'1', 'true', 't', 'yes', 'y'}
+SKIPPED_COLUMNS = {'id', 'created_at', 'updated_at'}
+
+
+def parse_import_records(request):
+    """
+    Yield (line_number, record, error) from a CSV or NDJSON request body.
+
+    The body is read as a stream so large uploads are never held in memory.
+    A plain JSON array is accepted too for small payloads.
+    """
+    content_type = (request.mimetype or '').lower()
+
+    if content_type in ('text/csv', 'application/csv'):
+        stream = io.TextIOWrapper(request.stream, encoding='utf-8-sig', newline='')
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record, None
+        return
+
+    if content_type == 'application/json':
+        payload = request.get_json(silent=True)
+        if not isinstance(payload, list):
+            yield 1, None, 'Expected a JSON array of records'
+            return
+        for index, record in enumerate(payload, start=1):
+            yield index, record, None if isinstance(record, dict) else 'Record must be a JSON object'
+        return
+
+    # Default to NDJSON (application/x-ndjson, application/jsonl, ...)
+    for line_number, line in enumerate(io.TextIOWrapper(request.stream, encoding='utf-8'), start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, f'Invalid JSON: {e}'
+            continue
+        yield line_number, record, None if isinstance(record, dict) else 'Record must be a JSON object'
+
+
+def _coerce(column, value):
+    """Convert a raw CSV/JSON value into the Python type expected by ``column``"""
+    if value is None or (isinstance(value, str) and value.strip() == ''):
+        return None
+
+    column_type = column.type
+    enum_class = getattr(column_type, 'enum_class', None)
+    if enum_class is not None:
+        try:
+            return enum_class(value)
+        except ValueError:
+            raise ValueError(f'Invalid {column.name}: {value}')
+
+    try:
+        python_type = column_type.python_type
+    except NotImplementedError:
+        return value
+
+    if isinstance(value, (dict, list)):
+        if python_type is str:
+            return json.dumps(value)
+        raise ValueError(f'Invalid value for {column.name}')
+
+    try:
+        if python_type is bool:
+            return value if isinstance(value, bool) else str(value).strip().lower() in TRUE_VALUES
+        if python_type is int:
+            return int(value)
+        if python_type is float:
+            return float(value)
+        if python_type is Decimal:
+            return Decimal(str(value))
+        if python_type is datetime:
+            return datetime.fromisoformat(str(value))
+        if python_type is date:
+            return datetime.strptime(str(value), '%Y-%m-%d').date()
+        if python_type is time:
+            return datetime.strptime(str(value), '%H:%M').time()
+    except (ValueError, InvalidOperation):
+        raise ValueError(f'Invalid value for {column.name}: {value}')
+
+    return str(value) if python_type is str else value
+
+
+def _to_row(model, record, required):
+    """Map a raw record onto the model's columns, coercing types"""
+    missing = [field for field in required if record.get(field) in (None, '')]
+    if missing:
+        raise ValueError(f'Missing required field: {missing[0]}')
+
+    row = {}
+    for column in model.__table__.columns:
+        if column.name not in SKIPPED_COLUMNS:
+            row[column.name] = _coerce(column, record.get(column.name))
+    return row
+
+
+def _fill_defaults(model, row):
+    """
+    Replace None with the column's Python default. Columns with only a server
+    default are dropped instead, so the database fills them in.
+    """
+    for column in model.__table__.columns:
+        if column.name not in row or row[column.name] is not None:
+            continue
+        default = column.default
+        if default is not None and default.is_scalar:
+            row[column.name] = default.arg
+        elif default is not None and default.is_callable:
+            row[column.name] = default.arg(None)
+        elif column.server_default is not None:
+            del row[column.name]
+    return row
+
+
+def _set_default(row, field, value):
+    if row.get(field) is None:
+        row[field] = value
+
+
+class ImportSpec:
+    """Describes how raw records become rows of one table"""
+
+    model = None
+    required = ()
+    # field name -> model whose ids must exist
+    foreign_keys = {}
+
+    def lookup(self, field, ids):
+        """Return {id: row} for the referenced ids that exist (one IN query)"""
+        target = self.foreign_keys[field]
+        return {row.id: row for row in db.session.query(target.id).filter(target.id.in_(ids))}
+
+    def prepare_chunk(self, records):
+        """Hook for per-chunk lookups beyond plain foreign keys"""
+        return {}
+
+    def build(self, record, lookups, extra):
+        row = _to_row(self.model, record, self.required)
+        for field in self.foreign_keys:
+            if row.get(field) is not None and row[field] not in lookups[field]:
+                raise ValueError(f'{self.foreign_keys[field].__name__} {row[field]} not found')
+        return _fill_defaults(self.model, self.finalize(row, lookups, extra))
+
+    def finalize(self, row, lookups, extra):
+        return row
+
+
+class EquipmentImport(ImportSpec):
+    model = Equipment
+    required = ('studio_id', 'name', 'category')
+    foreign_keys = {'studio_id': Studio}
+
+    def prepare_chunk(self, records):
+        serials = {str(r['serial_number']) for r in records if r.get('serial_number')}
+        if not serials:
+            return {'serials': set()}
+        existing = db.session.query(Equipment.serial_number).filter(Equipment.serial_number.in_(serials))
+        return {'serials': {serial for serial, in existing}}
+
+    def finalize(self, row, lookups, extra):
+        serial = row.get('serial_number')
+        if serial:
+            if serial in extra['serials']:
+                raise ValueError(f'Duplicate serial_number: {serial}')
+            extra['serials'].add(serial)
+
+        _set_default(row, 'maintenance_interval_days', 90)
+        _set_default(row, 'is_active', True)
+        # Same rule as create_equipment: installation counts as the last maintenance
+        if not row.get('last_maintenance') and row.get('installation_date'):
+            row['last_maintenance'] = row['installation_date']
+        if row.get('last_maintenance') and not row.get('next_maintenance'):
+            row['next_maintenance'] = row['last_maintenance'] + timedelta(days=row['maintenance_interval_days'] or 90)
+        return row
+
+
+class ScheduleImport(ImportSpec):
+    model = MaintenanceSchedule
+    required = ('studio_id', 'equipment_id', 'task_id', 'scheduled_date')
+    foreign_keys = {'studio_id': Studio, 'equipment_id': Equipment, 'task_id': MaintenanceTask}
+
+    def lookup(self, field, ids):
+        if field != 'task_id':
+            return super().lookup(field, ids)
+        rows = db.session.query(
+            MaintenanceTask.id, MaintenanceTask.estimated_duration_minutes, MaintenanceTask.frequency_days
+        ).filter(MaintenanceTask.id.in_(ids))
+        return {row.id: row for row in rows}
+
+    def finalize(self, row, lookups, extra):
+        task = lookups['task_id'][row['task_id']]
+        _set_default(row, 'priority', Priority.MEDIUM)
+        _set_default(row, 'status', TaskStatus.SCHEDULED)
+        _set_default(row, 'is_recurring', True)
+        if row.get('estimated_duration_minutes') is None:
+            row['estimated_duration_minutes'] = task.estimated_duration_minutes
+        # Same rule as create_maintenance_schedule for recurring work
+        if row['is_recurring'] and task.frequency_days and not row.get('next_occurrence'):
+            row['next_occurrence'] = row['scheduled_date'] + timedelta(days=task.frequency_days)
+        return row
+
+
+class HistoryImport(ImportSpec):
+    model = MaintenanceHistory
+    required = ('equipment_id', 'maintenance_date', 'maintenance_type')
+    foreign_keys = {'equipment_id': Equipment}
+
+
+def _error_message(error):
+    return str(error.orig) if getattr(error, 'orig', None) is not None else str(error)
+
+
+def _insert_chunk(model, rows):
+    """Insert one chunk; if the database rejects it, retry row by row to pinpoint the bad rows"""
+    table = model.__table__
+    # Rows only differ in key set where a server default fills a column in
+    batches = {}
+    for _, row in rows:
+        batches.setdefault(tuple(row), []).append(row)
+    try:
+        for batch in batches.values():
+            db.session.execute(insert(table), batch)
+        db.session.commit()
+        return len(rows), []
+    except StatementError:
+        db.session.rollback()
+
+    inserted, errors = 0, []
+    for line_number, row in rows:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(table), row)
+            inserted += 1
+        except StatementError as e:
+            errors.append({'line': line_number, 'error': _error_message(e)})
+    db.session.commit()
+    return inserted, errors
+
+
+def import_records(spec, records, chunk_size=DEFAULT_CHUNK_SIZE, dry_run=False):
+    """
+    Validate and insert ``records`` (from parse_import_records) in chunks.
+
+    Returns a report with processed/inserted/failed counts and per-line errors.
+    With ``dry_run`` nothing is written but every row is still validated.
+    """
+    if chunk_size < 1:
+        raise ValueError('chunk_size must be at least 1')
+    report = {'processed': 0, 'inserted': 0, 'failed': 0, 'errors': [], 'dry_run': dry_run}
+
+    def add_error(line_number, message):
+        report['failed'] += 1
+        if len(report['errors']) < MAX_REPORTED_ERRORS:
+            report['errors'].append({'line': line_number, 'error': message})
+
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            break
+        report['processed'] += len(chunk)
+
+        parsed = []
+        for line_number, record, error in chunk:
+            if error:
+                add_error(line_number, error)
+            else:
+                parsed.append((line_number, record))
+
+        # One IN query per referenced table for the whole chunk
+        lookups = {}
+        for field in spec.foreign_keys:
+            ids = set()
+            for _, record in parsed:
+                try:
+                    if record.get(field) not in (None, ''):
+                        ids.add(int(record[field]))
+                except (TypeError, ValueError):
+                    pass
+            lookups[field] = spec.lookup(field, ids) if ids else {}
+        extra = spec.prepare_chunk([record for _, record in parsed])
+
+        rows = []
+        for line_number, record in parsed:
+            try:
+                rows.append((line_number, spec.build(record, lookups, extra)))
+            except ValueError as e:
+                add_error(line_number, str(e))
+
+        if dry_run or not rows:
+            db.session.rollback()
+            continue
+
+        inserted, errors = _insert_chunk(spec.model, rows)
+        report['inserted'] += inserted
+        for error in errors:
+            add_error(error['line'], error['error'])
+
+    report['errors_truncated'] = report['failed'] > len(report['errors'])
+    return report
+
+
+def import_equipment(records, **kwargs):
+    return import_records(EquipmentImport(), records, **kwargs)
+
+
+def import_schedules(records, **kwargs):
+    return import_records(ScheduleImport(), records, **kwargs)
+
+
+def import_history(records, **kwargs):
+    return import_records(HistoryImport(), records, **kwargs)
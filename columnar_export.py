@@ -0,0 +1,213 @@
+"""
+Columnar Parquet export of maintenance history, schedules and alerts.
+
+Rows are read from a server-side cursor (yield_per) in row-group sized
+partitions and each partition is written as one Parquet row group, so an
+export of any length runs in constant memory and an HTTP download starts
+with the first row group. Text and enum columns are dictionary-encoded and
+every column is compressed (zstd by default).
+
+The Arrow schema is derived from the table definition, so every column of the
+live table is exported. export_partitioned() writes one file per year or month
+under hive-style directories (e.g. history/month=2024-03/part-0.parquet) for
+offline tools that prune by date.
+"""
+import os
+import json
+from datetime import datetime, date, timedelta
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import select, func, types as sqltypes
+from src.models.maintenance import db, MaintenanceHistory, MaintenanceSchedule, Alert
+
+DEFAULT_ROW_GROUP_SIZE = 50000
+DEFAULT_COMPRESSION = 'zstd'
+COMPRESSIONS = ('zstd', 'snappy', 'gzip', 'none')
+PARTITIONS = ('none', 'year', 'month')
+
+# dataset -> (model, column used for date ranges and partitioning)
+DATASETS = {
+    'history': (MaintenanceHistory, 'maintenance_date'),
+    'schedules': (MaintenanceSchedule, 'scheduled_date'),
+    'alerts': (Alert, 'created_at'),
+}
+
+
+def _enum_value(value):
+    return value.value if hasattr(value, 'value') else value
+
+
+def _json_value(value):
+    return value if value is None or isinstance(value, str) else json.dumps(value, default=str)
+
+
+def _column_spec(column):
+    """(arrow type, value converter or None, dictionary-encode?) for a table column"""
+    column_type = column.type
+    if isinstance(column_type, sqltypes.Boolean):
+        return pa.bool_(), None, False
+    if isinstance(column_type, sqltypes.Integer):
+        return pa.int64(), None, False
+    if isinstance(column_type, (sqltypes.Float, sqltypes.Numeric)):
+        return pa.float64(), lambda value: float(value) if value is not None else None, False
+    if isinstance(column_type, sqltypes.DateTime):
+        return pa.timestamp('us'), None, False
+    if isinstance(column_type, sqltypes.Date):
+        return pa.date32(), None, False
+    if isinstance(column_type, sqltypes.LargeBinary):
+        return pa.binary(), None, False
+    if isinstance(column_type, sqltypes.Enum):
+        return pa.string(), _enum_value, True
+    if isinstance(column_type, sqltypes.String):
+        return pa.string(), None, True
+    return pa.string(), _json_value, True
+
+
+def dataset_schema(dataset):
+    model, _ = DATASETS[dataset]
+    columns = list(model.__table__.c)
+    specs = [_column_spec(column) for column in columns]
+    schema = pa.schema([pa.field(column.name, arrow_type) for column, (arrow_type, _, _) in zip(columns, specs)])
+    return columns, specs, schema
+
+
+def _range_bounds(dataset, start, end):
+    """WHERE conditions for start <= date column < end (either bound optional)"""
+    model, date_field = DATASETS[dataset]
+    column = model.__table__.c[date_field]
+    as_datetime = isinstance(column.type, sqltypes.DateTime)
+    conditions = []
+    for bound, compare in ((start, column.__ge__), (end, column.__lt__)):
+        if bound is not None:
+            conditions.append(compare(datetime.combine(bound, datetime.min.time()) if as_datetime else bound))
+    return column, conditions
+
+
+def _batches(dataset, start, end, row_group_size):
+    """Record batches of up to row_group_size rows, streamed from a server-side cursor"""
+    columns, specs, schema = dataset_schema(dataset)
+    model, _ = DATASETS[dataset]
+    date_column, conditions = _range_bounds(dataset, start, end)
+    statement = select(*columns).where(*conditions).order_by(date_column, model.__table__.c.id)
+
+    result = db.session.execute(statement.execution_options(yield_per=row_group_size))
+    for rows in result.partitions():
+        arrays = []
+        for values, (arrow_type, convert, _) in zip(zip(*rows), specs):
+            if convert:
+                values = [convert(value) for value in values]
+            arrays.append(pa.array(values, type=arrow_type))
+        yield pa.record_batch(arrays, schema=schema)
+
+
+def _writer(sink, schema, specs, compression):
+    dictionary_columns = [field.name for field, (_, _, dictionary) in zip(schema, specs) if dictionary]
+    return pq.ParquetWriter(
+        sink, schema,
+        compression=None if compression == 'none' else compression,
+        use_dictionary=dictionary_columns
+    )
+
+
+def write_parquet(dataset, sink, start=None, end=None, row_group_size=DEFAULT_ROW_GROUP_SIZE,
+                  compression=DEFAULT_COMPRESSION):
+    """Write one Parquet file to ``sink`` (a path or file object); returns the row count"""
+    _, specs, schema = dataset_schema(dataset)
+    rows = 0
+    with _writer(sink, schema, specs, compression) as writer:
+        for batch in _batches(dataset, start, end, row_group_size):
+            writer.write_batch(batch, row_group_size=row_group_size)
+            rows += batch.num_rows
+    return rows
+
+
+class _ChunkSink:
+    """Write-only file object whose bytes are drained after every row group"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_parquet(dataset, start=None, end=None, row_group_size=DEFAULT_ROW_GROUP_SIZE,
+                   compression=DEFAULT_COMPRESSION):
+    """Parquet file as a generator of byte chunks, one per row group plus the footer"""
+    _, specs, schema = dataset_schema(dataset)
+    sink = _ChunkSink()
+    writer = _writer(sink, schema, specs, compression)
+    try:
+        for batch in _batches(dataset, start, end, row_group_size):
+            writer.write_batch(batch, row_group_size=row_group_size)
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def partition_ranges(start, end, partition):
+    """(label, period start, period end) covering [start, end) by year or month"""
+    current = date(start.year, 1, 1) if partition == 'year' else date(start.year, start.month, 1)
+    while current < end:
+        if partition == 'year':
+            following = date(current.year + 1, 1, 1)
+            label = f'year={current.year}'
+        else:
+            following = date(current.year + current.month // 12, current.month % 12 + 1, 1)
+            label = f'month={current.year}-{current.month:02d}'
+        yield label, max(current, start), min(following, end)
+        current = following
+
+
+def export_partitioned(dataset, output_dir, start=None, end=None, partition='month',
+                       row_group_size=DEFAULT_ROW_GROUP_SIZE, compression=DEFAULT_COMPRESSION):
+    """
+    Write ``dataset`` under output_dir/<dataset>/, one file per partition
+    (or a single file for partition='none'). Returns {relative path: rows}.
+    """
+    if partition not in PARTITIONS:
+        raise ValueError(f'Invalid partition: {partition}')
+    date_column, conditions = _range_bounds(dataset, start, end)
+    first, last = db.session.execute(select(func.min(date_column), func.max(date_column)).where(*conditions)).one()
+    if first is None:
+        return {}
+
+    if isinstance(first, datetime):
+        first, last = first.date(), last.date()
+    start = start or first
+    end = end or last + timedelta(days=1)
+
+    ranges = [('', start, end)] if partition == 'none' else partition_ranges(start, end, partition)
+    written = {}
+    for label, period_start, period_end in ranges:
+        directory = os.path.join(output_dir, dataset, label)
+        path = os.path.join(directory, 'part-0.parquet')
+        os.makedirs(directory, exist_ok=True)
+        rows = write_parquet(dataset, path, period_start, period_end, row_group_size, compression)
+        if rows:
+            written[os.path.relpath(path, output_dir)] = rows
+        else:
+            os.remove(path)
+            if label:
+                os.rmdir(directory)
+    return written
@@ -11,8 +11,163 @@ from src.models.maintenance import (
     EquipmentCategory, MaintenanceType, TaskStatus, Priority
 )
 from src.main import app
+from src.recurrence import RecurrenceRule
+from src.search_index import ensure_search_index
 from datetime import datetime, date, timedelta
+from sqlalchemy import insert, event
+import argparse
 import random
+import time
+
+# Maintenance task library shared by the demo and scaled datasets
+TASKS_DATA = [
+    # Amplifier Tasks
+    {
+        'name': 'Amplifier Power Supply Inspection',
+        'description': 'Inspect power supply components, check for overheating, verify voltage levels',
+        'category': EquipmentCategory.AMPLIFIER,
+        'maintenance_type': MaintenanceType.PREVENTIVE,
+        'estimated_duration_minutes': 45,
+        'required_tools': ['Multimeter', 'Thermal camera', 'Screwdriver set'],
+        'required_skills': ['Electrical safety', 'Power electronics'],
+        'safety_requirements': 'Power isolation required. Use lockout/tagout procedures.',
+        'procedure_steps': [
+            'Power down amplifier and disconnect from mains',
+            'Remove amplifier cover',
+            'Visually inspect power supply components',
+            'Check for signs of overheating or component damage',
+            'Measure voltage levels at test points',
+            'Clean dust from cooling fans and heat sinks',
+            'Reassemble and test operation'
+        ],
+        'frequency_days': 90
+    },
+    {
+        'name': 'Amplifier Cooling System Maintenance',
+        'description': 'Clean cooling fans, check thermal management, verify temperature sensors',
+        'category': EquipmentCategory.AMPLIFIER,
+        'maintenance_type': MaintenanceType.PREVENTIVE,
+        'estimated_duration_minutes': 30,
+        'required_tools': ['Compressed air', 'Soft brushes', 'Thermal paste'],
+        'required_skills': ['Thermal management', 'Fan maintenance'],
+        'safety_requirements': 'Ensure amplifier is powered down and cool before maintenance.',
+        'procedure_steps': [
+            'Power down and allow cooling',
+            'Remove protective covers',
+            'Clean fans with compressed air',
+            'Check fan operation and bearing condition',
+            'Clean heat sinks and thermal interfaces',
+            'Verify temperature sensor operation',
+            'Reassemble and test'
+        ],
+        'frequency_days': 60
+    },
+    # Microphone Tasks
+    {
+        'name': 'Wireless Microphone Battery Check',
+        'description': 'Test battery performance, check charging contacts, verify battery life',
+        'category': EquipmentCategory.MICROPHONE,
+        'maintenance_type': MaintenanceType.PREVENTIVE,
+        'estimated_duration_minutes': 20,
+        'required_tools': ['Battery tester', 'Contact cleaner', 'Replacement batteries'],
+        'required_skills': ['Battery maintenance', 'RF systems'],
+        'safety_requirements': 'Handle batteries according to manufacturer guidelines.',
+        'procedure_steps': [
+            'Remove batteries from transmitters',
+            'Test battery capacity and voltage',
+            'Clean battery contacts',
+            'Check charging dock contacts',
+            'Test charging cycle',
+            'Replace batteries if capacity below 80%',
+            'Document battery performance'
+        ],
+        'frequency_days': 30
+    },
+    {
+        'name': 'Microphone RF Performance Test',
+        'description': 'Test RF signal strength, check for interference, verify frequency coordination',
+        'category': EquipmentCategory.MICROPHONE,
+        'maintenance_type': MaintenanceType.PREVENTIVE,
+        'estimated_duration_minutes': 60,
+        'required_tools': ['RF spectrum analyzer', 'Signal generator', 'Antenna analyzer'],
+        'required_skills': ['RF engineering', 'Spectrum analysis'],
+        'safety_requirements': 'Follow FCC regulations for RF testing.',
+        'procedure_steps': [
+            'Set up RF test equipment',
+            'Scan frequency spectrum for interference',
+            'Test transmitter power output',
+            'Verify receiver sensitivity',
+            'Check antenna system performance',
+            'Document frequency coordination',
+            'Update frequency plan if needed'
+        ],
+        'frequency_days': 120
+    },
+    # DSP Tasks
+    {
+        'name': 'DSP Configuration Backup',
+        'description': 'Backup DSP settings, verify configuration integrity, test restore procedures',
+        'category': EquipmentCategory.DSP,
+        'maintenance_type': MaintenanceType.PREVENTIVE,
+        'estimated_duration_minutes': 25,
+        'required_tools': ['Laptop', 'USB cable', 'Configuration software'],
+        'required_skills': ['DSP programming', 'File management'],
+        'safety_requirements': 'Ensure stable power during backup operations.',
+        'procedure_steps': [
+            'Connect to DSP via configuration software',
+            'Verify current configuration status',
+            'Create full configuration backup',
+            'Test backup file integrity',
+            'Store backup in multiple locations',
+            'Document configuration version',
+            'Test restore procedure on test system'
+        ],
+        'frequency_days': 30
+    },
+    {
+        'name': 'DSP Performance Optimization',
+        'description': 'Analyze DSP performance, optimize processing algorithms, update firmware',
+        'category': EquipmentCategory.DSP,
+        'maintenance_type': MaintenanceType.PREVENTIVE,
+        'estimated_duration_minutes': 90,
+        'required_tools': ['Audio analyzer', 'Configuration software', 'Test signals'],
+        'required_skills': ['Audio engineering', 'DSP programming'],
+        'safety_requirements': 'Perform during non-operational hours to avoid audio disruption.',
+        'procedure_steps': [
+            'Analyze current DSP performance metrics',
+            'Check for firmware updates',
+            'Backup current configuration',
+            'Test audio processing quality',
+            'Optimize EQ and dynamics settings',
+            'Update firmware if available',
+            'Verify all functions after update'
+        ],
+        'frequency_days': 180
+    }
+]
+
+def create_maintenance_tasks():
+    """Create the standard maintenance task library and return the tasks"""
+    tasks = []
+    for task_data in TASKS_DATA:
+        task = MaintenanceTask(
+            name=task_data['name'],
+            description=task_data['description'],
+            category=task_data['category'],
+            maintenance_type=task_data['maintenance_type'],
+            estimated_duration_minutes=task_data['estimated_duration_minutes'],
+            safety_requirements=task_data['safety_requirements'],
+            frequency_days=task_data['frequency_days']
+        )
+        task.set_required_tools(task_data['required_tools'])
+        task.set_required_skills(task_data['required_skills'])
+        task.set_procedure_steps(task_data['procedure_steps'])
+        
+        db.session.add(task)
+        tasks.append(task)
+    
+    db.session.commit()
+    return tasks
 
 def create_sample_data():
     """Create comprehensive sample data for demonstration"""
@@ -93,151 +248,7 @@ def create_sample_data():
         print(f"Created {len(studios)} studios")
         
         # Create Maintenance Tasks
-        tasks_data = [
-            # Amplifier Tasks
-            {
-                'name': 'Amplifier Power Supply Inspection',
-                'description': 'Inspect power supply components, check for overheating, verify voltage levels',
-                'category': EquipmentCategory.AMPLIFIER,
-                'maintenance_type': MaintenanceType.PREVENTIVE,
-                'estimated_duration_minutes': 45,
-                'required_tools': ['Multimeter', 'Thermal camera', 'Screwdriver set'],
-                'required_skills': ['Electrical safety', 'Power electronics'],
-                'safety_requirements': 'Power isolation required. Use lockout/tagout procedures.',
-                'procedure_steps': [
-                    'Power down amplifier and disconnect from mains',
-                    'Remove amplifier cover',
-                    'Visually inspect power supply components',
-                    'Check for signs of overheating or component damage',
-                    'Measure voltage levels at test points',
-                    'Clean dust from cooling fans and heat sinks',
-                    'Reassemble and test operation'
-                ],
-                'frequency_days': 90
-            },
-            {
-                'name': 'Amplifier Cooling System Maintenance',
-                'description': 'Clean cooling fans, check thermal management, verify temperature sensors',
-                'category': EquipmentCategory.AMPLIFIER,
-                'maintenance_type': MaintenanceType.PREVENTIVE,
-                'estimated_duration_minutes': 30,
-                'required_tools': ['Compressed air', 'Soft brushes', 'Thermal paste'],
-                'required_skills': ['Thermal management', 'Fan maintenance'],
-                'safety_requirements': 'Ensure amplifier is powered down and cool before maintenance.',
-                'procedure_steps': [
-                    'Power down and allow cooling',
-                    'Remove protective covers',
-                    'Clean fans with compressed air',
-                    'Check fan operation and bearing condition',
-                    'Clean heat sinks and thermal interfaces',
-                    'Verify temperature sensor operation',
-                    'Reassemble and test'
-                ],
-                'frequency_days': 60
-            },
-            # Microphone Tasks
-            {
-                'name': 'Wireless Microphone Battery Check',
-                'description': 'Test battery performance, check charging contacts, verify battery life',
-                'category': EquipmentCategory.MICROPHONE,
-                'maintenance_type': MaintenanceType.PREVENTIVE,
-                'estimated_duration_minutes': 20,
-                'required_tools': ['Battery tester', 'Contact cleaner', 'Replacement batteries'],
-                'required_skills': ['Battery maintenance', 'RF systems'],
-                'safety_requirements': 'Handle batteries according to manufacturer guidelines.',
-                'procedure_steps': [
-                    'Remove batteries from transmitters',
-                    'Test battery capacity and voltage',
-                    'Clean battery contacts',
-                    'Check charging dock contacts',
-                    'Test charging cycle',
-                    'Replace batteries if capacity below 80%',
-                    'Document battery performance'
-                ],
-                'frequency_days': 30
-            },
-            {
-                'name': 'Microphone RF Performance Test',
-                'description': 'Test RF signal strength, check for interference, verify frequency coordination',
-                'category': EquipmentCategory.MICROPHONE,
-                'maintenance_type': MaintenanceType.PREVENTIVE,
-                'estimated_duration_minutes': 60,
-                'required_tools': ['RF spectrum analyzer', 'Signal generator', 'Antenna analyzer'],
-                'required_skills': ['RF engineering', 'Spectrum analysis'],
-                'safety_requirements': 'Follow FCC regulations for RF testing.',
-                'procedure_steps': [
-                    'Set up RF test equipment',
-                    'Scan frequency spectrum for interference',
-                    'Test transmitter power output',
-                    'Verify receiver sensitivity',
-                    'Check antenna system performance',
-                    'Document frequency coordination',
-                    'Update frequency plan if needed'
-                ],
-                'frequency_days': 120
-            },
-            # DSP Tasks
-            {
-                'name': 'DSP Configuration Backup',
-                'description': 'Backup DSP settings, verify configuration integrity, test restore procedures',
-                'category': EquipmentCategory.DSP,
-                'maintenance_type': MaintenanceType.PREVENTIVE,
-                'estimated_duration_minutes': 25,
-                'required_tools': ['Laptop', 'USB cable', 'Configuration software'],
-                'required_skills': ['DSP programming', 'File management'],
-                'safety_requirements': 'Ensure stable power during backup operations.',
-                'procedure_steps': [
-                    'Connect to DSP via configuration software',
-                    'Verify current configuration status',
-                    'Create full configuration backup',
-                    'Test backup file integrity',
-                    'Store backup in multiple locations',
-                    'Document configuration version',
-                    'Test restore procedure on test system'
-                ],
-                'frequency_days': 30
-            },
-            {
-                'name': 'DSP Performance Optimization',
-                'description': 'Analyze DSP performance, optimize processing algorithms, update firmware',
-                'category': EquipmentCategory.DSP,
-                'maintenance_type': MaintenanceType.PREVENTIVE,
-                'estimated_duration_minutes': 90,
-                'required_tools': ['Audio analyzer', 'Configuration software', 'Test signals'],
-                'required_skills': ['Audio engineering', 'DSP programming'],
-                'safety_requirements': 'Perform during non-operational hours to avoid audio disruption.',
-                'procedure_steps': [
-                    'Analyze current DSP performance metrics',
-                    'Check for firmware updates',
-                    'Backup current configuration',
-                    'Test audio processing quality',
-                    'Optimize EQ and dynamics settings',
-                    'Update firmware if available',
-                    'Verify all functions after update'
-                ],
-                'frequency_days': 180
-            }
-        ]
-        
-        tasks = []
-        for task_data in tasks_data:
-            task = MaintenanceTask(
-                name=task_data['name'],
-                description=task_data['description'],
-                category=task_data['category'],
-                maintenance_type=task_data['maintenance_type'],
-                estimated_duration_minutes=task_data['estimated_duration_minutes'],
-                safety_requirements=task_data['safety_requirements'],
-                frequency_days=task_data['frequency_days']
-            )
-            task.set_required_tools(task_data['required_tools'])
-            task.set_required_skills(task_data['required_skills'])
-            task.set_procedure_steps(task_data['procedure_steps'])
-            
-            db.session.add(task)
-            tasks.append(task)
-        
-        db.session.commit()
+        tasks = create_maintenance_tasks()
         print(f"Created {len(tasks)} maintenance tasks")
         
         # Create Equipment
@@ -371,12 +382,27 @@ def create_sample_data():
         
         # Create Maintenance Schedules
         schedules = []
+        rules = []
         for equipment in equipment_list:
             for task in tasks:
                 if task.category == equipment.category:
-                    # Create some past, current, and future schedules
+                    # Future cycles come from a recurrence rule rather than pre-created rows
+                    rule = RecurrenceRule(
+                        studio_id=equipment.studio_id,
+                        equipment_id=equipment.id,
+                        task_id=task.id,
+                        anchor_date=date.today() + timedelta(days=random.randint(0, min(task.frequency_days or 90, 120))),
+                        interval_days=task.frequency_days or equipment.maintenance_interval_days,
+                        priority=Priority.HIGH if equipment.is_critical else Priority.MEDIUM,
+                        estimated_duration_minutes=task.estimated_duration_minutes,
+                        assigned_technician=random.choice(['John Smith', 'Maria Garcia', 'David Wilson', 'Sarah Lee'])
+                    )
+                    db.session.add(rule)
+                    rules.append(rule)
+                    
+                    # Create some past and current schedules
                     for i in range(3):
-                        schedule_date = date.today() + timedelta(days=random.randint(-60, 120))
+                        schedule_date = date.today() + timedelta(days=random.randint(-60, 0))
                         
                         # Determine status based on date
                         if schedule_date < date.today() - timedelta(days=7):
@@ -407,7 +433,7 @@ def create_sample_data():
                         schedules.append(schedule)
         
         db.session.commit()
-        print(f"Created {len(schedules)} maintenance schedules")
+        print(f"Created {len(schedules)} maintenance schedules and {len(rules)} recurrence rules")
         
         # Create some Alerts
         alerts_data = [
@@ -445,6 +471,9 @@ def create_sample_data():
         db.session.commit()
         print(f"Created {len(alerts)} alerts")
         
+        # drop_all took the search index triggers with it; recreate them and reindex
+        ensure_search_index()
+        
         print("\nSample data creation completed successfully!")
         print(f"Total records created:")
         print(f"  - Studios: {len(studios)}")
@@ -453,6 +482,343 @@ def create_sample_data():
         print(f"  - Maintenance Schedules: {len(schedules)}")
         print(f"  - Alerts: {len(alerts)}")
 
+# Reference data for the scaled (--scale) dataset
+SCALE_CITIES = [
+    ('New York', 'NY'), ('Brooklyn', 'NY'), ('Los Angeles', 'CA'), ('West Hollywood', 'CA'),
+    ('San Francisco', 'CA'), ('San Diego', 'CA'), ('Chicago', 'IL'), ('Boston', 'MA'),
+    ('Miami', 'FL'), ('Austin', 'TX'), ('Dallas', 'TX'), ('Houston', 'TX'),
+    ('Seattle', 'WA'), ('Denver', 'CO'), ('Atlanta', 'GA'), ('Washington', 'DC'),
+    ('Philadelphia', 'PA'), ('Scottsdale', 'AZ'), ('Nashville', 'TN'), ('Toronto', 'ON')
+]
+
+SCALE_MODELS = {
+    EquipmentCategory.AMPLIFIER: [('QSC', 'PLD4.5'), ('Crown', 'DCi 8|600N'), ('Powersoft', 'Quattrocanali 4804')],
+    EquipmentCategory.MICROPHONE: [('Shure', 'ULXD4Q'), ('Sennheiser', 'EW-DX SK'), ('Shure', 'QLXD4')],
+    EquipmentCategory.DSP: [('BSS Audio', 'BLU-806'), ('QSC', 'Core 110f'), ('Biamp', 'Tesira FORTE')]
+}
+
+# Share of devices per category and the daily duty cycle relative to classes_per_day
+SCALE_CATEGORY_WEIGHTS = {
+    EquipmentCategory.AMPLIFIER: 0.35,
+    EquipmentCategory.MICROPHONE: 0.40,
+    EquipmentCategory.DSP: 0.25
+}
+
+SCALE_ALERT_TYPES = [
+    ('maintenance_due', 0.30), ('maintenance_overdue', 0.25), ('weekly_summary', 0.15),
+    ('warranty_expiring', 0.08), ('equipment_failure', 0.07), ('monthly_report', 0.05),
+    ('inspection_required', 0.04), ('parts_needed', 0.03), ('technician_required', 0.03)
+]
+
+SCALE_PRIORITIES = [
+    (Priority.MEDIUM, 0.55), (Priority.HIGH, 0.30), (Priority.CRITICAL, 0.05), (Priority.LOW, 0.10)
+]
+
+FIRST_NAMES = ['John', 'Maria', 'David', 'Sarah', 'James', 'Aisha', 'Carlos', 'Emily', 'Wei', 'Priya',
+               'Michael', 'Olivia', 'Daniel', 'Sofia', 'Kevin', 'Hannah']
+LAST_NAMES = ['Smith', 'Garcia', 'Wilson', 'Lee', 'Johnson', 'Khan', 'Rodriguez', 'Chen', 'Patel',
+              'Brown', 'Nguyen', 'Kim', 'Martinez', 'Davis', 'Lopez', 'Clark']
+
+
+class BulkWriter:
+    """Buffer rows for one table and write them with executemany in chunked transactions"""
+
+    def __init__(self, model, chunk_size, depends_on=None):
+        self.table = model.__table__
+        self.chunk_size = chunk_size
+        self.depends_on = depends_on or []
+        self.rows = []
+        self.count = 0
+
+    def add(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        # Parent rows must be written before any child row referencing them
+        for parent in self.depends_on:
+            parent.flush()
+        if not self.rows:
+            return
+        db.session.execute(insert(self.table), self.rows)
+        db.session.commit()
+        self.count += len(self.rows)
+        self.rows = []
+
+
+def _weighted_choice(rng, weighted):
+    """Pick a value from a list of (value, weight) pairs"""
+    return rng.choices([value for value, _ in weighted], weights=[weight for _, weight in weighted])[0]
+
+
+def _tune_sqlite_for_bulk_load():
+    """Trade durability for speed while loading a throwaway dataset into SQLite"""
+    engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA synchronous = OFF')
+        cursor.execute('PRAGMA journal_mode = MEMORY')
+        cursor.execute('PRAGMA cache_size = -200000')
+        cursor.close()
+
+    # Make sure every pooled connection picks up the pragmas
+    engine.dispose()
+
+
+def _build_device_schedules(rng, device, tasks, technicians, history_start, as_of, horizon, next_schedule_id):
+    """Generate the schedule and history rows for one device across the simulated period"""
+    schedule_rows = []
+    history_rows = []
+    last_completed = None
+
+    for task in tasks:
+        frequency = task.frequency_days or device['maintenance_interval_days']
+        current = max(device['installation_date'], history_start) + timedelta(days=rng.randint(0, frequency))
+
+        while current <= horizon:
+            technician = rng.choice(technicians)
+            row = {
+                'id': next_schedule_id,
+                'studio_id': device['studio_id'],
+                'equipment_id': device['id'],
+                'task_id': task.id,
+                'scheduled_date': current,
+                'priority': Priority.HIGH if device['is_critical'] else Priority.MEDIUM,
+                'status': TaskStatus.SCHEDULED,
+                'assigned_technician': technician,
+                'estimated_duration_minutes': task.estimated_duration_minutes,
+                'actual_duration_minutes': None,
+                'completed_date': None,
+                'completed_by': None,
+                'cost': None,
+                'is_recurring': True,
+                'next_occurrence': current + timedelta(days=frequency)
+            }
+
+            if current < as_of:
+                # Older work is almost always closed out; recent work is more often still open
+                completion_odds = 0.95 if current < as_of - timedelta(days=7) else 0.7
+                if rng.random() < completion_odds:
+                    completed_at = datetime.combine(current, datetime.min.time()) + timedelta(hours=rng.randint(6, 20))
+                    duration = max(5, int(rng.gauss(task.estimated_duration_minutes, task.estimated_duration_minutes * 0.25)))
+                    row.update({
+                        'status': TaskStatus.COMPLETED,
+                        'completed_date': completed_at,
+                        'completed_by': technician,
+                        'actual_duration_minutes': duration,
+                        'cost': round(rng.lognormvariate(4.8, 0.5), 2)
+                    })
+                    history_rows.append({
+                        'equipment_id': device['id'],
+                        'maintenance_date': completed_at,
+                        'maintenance_type': task.maintenance_type,
+                        'technician': technician
+                    })
+                    if last_completed is None or current > last_completed:
+                        last_completed = current
+                else:
+                    row['status'] = TaskStatus.OVERDUE
+
+            schedule_rows.append(row)
+            next_schedule_id += 1
+            current += timedelta(days=frequency + rng.randint(-3, 7))
+
+    return schedule_rows, history_rows, last_completed
+
+
+def create_scaled_data(studios=100, devices_per_studio=40, years=3, alerts_per_studio=60,
+                       seed=42, chunk_size=10000, as_of=None, horizon_days=120):
+    """
+    Generate a production-scale synthetic fleet.
+
+    All randomness comes from a single seeded generator so the same arguments always
+    produce the same dataset relative to ``as_of``; future work is scheduled up to
+    ``horizon_days`` ahead. Rows are written through
+    executemany inserts in chunked transactions, so memory stays flat regardless of
+    how many schedule rows are generated.
+    """
+    rng = random.Random(seed)
+    as_of = as_of or date.today()
+    history_start = as_of - timedelta(days=365 * years)
+    horizon = as_of + timedelta(days=horizon_days)
+    started = time.perf_counter()
+
+    with app.app_context():
+        print(f"Creating scaled dataset: {studios} studios x {devices_per_studio} devices, "
+              f"{years} years of history (seed={seed})...")
+
+        db.drop_all()
+        db.create_all()
+        _tune_sqlite_for_bulk_load()
+
+        tasks = create_maintenance_tasks()
+        tasks_by_category = {}
+        for task in tasks:
+            tasks_by_category.setdefault(task.category, []).append(task)
+
+        categories = list(SCALE_CATEGORY_WEIGHTS.items())
+        technicians = [f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+                       for _ in range(max(4, studios // 4))]
+
+        studio_writer = BulkWriter(Studio, chunk_size)
+        equipment_writer = BulkWriter(Equipment, chunk_size, depends_on=[studio_writer])
+        schedule_writer = BulkWriter(MaintenanceSchedule, chunk_size, depends_on=[equipment_writer])
+        history_writer = BulkWriter(MaintenanceHistory, chunk_size, depends_on=[equipment_writer])
+        alert_writer = BulkWriter(Alert, chunk_size, depends_on=[equipment_writer])
+
+        equipment_id = 1
+        schedule_id = 1
+
+        for studio_id in range(1, studios + 1):
+            city, state = SCALE_CITIES[(studio_id - 1) % len(SCALE_CITIES)]
+            classes_per_day = rng.randint(8, 16)
+            studio_writer.add({
+                'id': studio_id,
+                'name': f'SoulCycle {city} {studio_id:04d}',
+                'location': f'{city}, {state}',
+                'city': city,
+                'state': state,
+                'zip_code': f'{rng.randint(10000, 99999)}',
+                'manager_name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                'capacity': rng.randint(40, 65),
+                'classes_per_day': classes_per_day,
+                'is_active': rng.random() > 0.02
+            })
+
+            studio_device_ids = []
+            for index in range(devices_per_studio):
+                category = _weighted_choice(rng, categories)
+                manufacturer, model = rng.choice(SCALE_MODELS[category])
+                # Most of the fleet predates the simulated period; the rest was installed during it
+                if rng.random() < 0.7:
+                    installation_date = history_start - timedelta(days=rng.randint(0, 730))
+                else:
+                    installation_date = as_of - timedelta(days=rng.randint(30, 365 * years))
+                days_in_service = (as_of - installation_date).days
+
+                # DSPs run around the clock; amps and mics follow the class schedule
+                if category == EquipmentCategory.DSP:
+                    hours_per_day, cycles_per_day = 24, 0.02
+                else:
+                    hours_per_day = classes_per_day * rng.uniform(0.6, 1.1)
+                    cycles_per_day = rng.uniform(0.8, 1.5)
+
+                device = {
+                    'id': equipment_id,
+                    'studio_id': studio_id,
+                    'name': f'{category.value.replace("_", " ").title()} {index + 1:03d}',
+                    'category': category,
+                    'manufacturer': manufacturer,
+                    'model': model,
+                    'serial_number': f'{manufacturer[:3].upper()}-{studio_id:05d}-{index:04d}',
+                    'location_in_studio': rng.choice(['Equipment Room A', 'Technical Closet', 'Instructor Station', 'Front Desk']),
+                    'purchase_date': installation_date - timedelta(days=rng.randint(7, 30)),
+                    'installation_date': installation_date,
+                    'warranty_expiry': installation_date + timedelta(days=rng.choice([365, 730, 1095])),
+                    'operating_hours': int(days_in_service * hours_per_day),
+                    'power_cycles': int(days_in_service * cycles_per_day),
+                    'maintenance_interval_days': rng.choice([60, 90, 90, 120]),
+                    'usage_based_maintenance': rng.random() < 0.2,
+                    'usage_threshold_hours': rng.choice([500, 1000, 2000]),
+                    'is_critical': rng.random() < 0.3,
+                    'is_active': rng.random() > 0.03
+                }
+
+                schedule_rows, history_rows, last_completed = _build_device_schedules(
+                    rng, device, tasks_by_category.get(category, []), technicians,
+                    history_start, as_of, horizon, schedule_id
+                )
+                device['last_maintenance'] = last_completed
+                device['next_maintenance'] = (last_completed or installation_date) + \
+                    timedelta(days=device['maintenance_interval_days'])
+
+                equipment_writer.add(device)
+                for row in schedule_rows:
+                    schedule_writer.add(row)
+                for row in history_rows:
+                    history_writer.add(row)
+
+                studio_device_ids.append(equipment_id)
+                schedule_id += len(schedule_rows)
+                equipment_id += 1
+
+            # Alerts arrive roughly uniformly over the period; older ones are mostly closed
+            for _ in range(alerts_per_studio * years):
+                created_at = datetime.combine(history_start, datetime.min.time()) + \
+                    timedelta(seconds=rng.randint(0, 365 * years * 86400))
+                age_days = (as_of - created_at.date()).days
+                alert_type = _weighted_choice(rng, SCALE_ALERT_TYPES)
+                is_read = rng.random() < (0.95 if age_days > 14 else 0.4)
+                is_resolved = rng.random() < (0.85 if age_days > 14 else 0.2)
+                alert_writer.add({
+                    'studio_id': studio_id,
+                    'equipment_id': rng.choice(studio_device_ids) if studio_device_ids and alert_type not in ('weekly_summary', 'monthly_report') else None,
+                    'alert_type': alert_type,
+                    'priority': _weighted_choice(rng, SCALE_PRIORITIES),
+                    'title': f'{alert_type.replace("_", " ").title()} - Studio {studio_id:04d}',
+                    'message': f'Synthetic {alert_type.replace("_", " ")} alert generated for load testing.',
+                    'is_read': is_read,
+                    'read_at': created_at + timedelta(hours=rng.randint(1, 72)) if is_read else None,
+                    'is_resolved': is_resolved,
+                    'resolved_at': created_at + timedelta(hours=rng.randint(2, 240)) if is_resolved else None,
+                    'resolved_by': rng.choice(technicians) if is_resolved else None,
+                    'created_at': created_at
+                })
+
+            if studio_id % 50 == 0:
+                print(f"  ... {studio_id}/{studios} studios, {schedule_id - 1} schedules generated")
+
+        for writer in (studio_writer, equipment_writer, schedule_writer, history_writer, alert_writer):
+            writer.flush()
+        
+        # drop_all took the search index triggers with it; recreate them and reindex
+        ensure_search_index()
+
+        elapsed = time.perf_counter() - started
+        print(f"\nScaled data creation completed in {elapsed:.1f}s")
+        print(f"Total records created:")
+        print(f"  - Studios: {studio_writer.count}")
+        print(f"  - Equipment: {equipment_writer.count}")
+        print(f"  - Maintenance Tasks: {len(tasks)}")
+        print(f"  - Maintenance Schedules: {schedule_writer.count}")
+        print(f"  - Maintenance History: {history_writer.count}")
+        print(f"  - Alerts: {alert_writer.count}")
+
+        return {
+            'studios': studio_writer.count,
+            'equipment': equipment_writer.count,
+            'tasks': len(tasks),
+            'schedules': schedule_writer.count,
+            'history': history_writer.count,
+            'alerts': alert_writer.count
+        }
+
 if __name__ == '__main__':
-    create_sample_data()
+    parser = argparse.ArgumentParser(description='Create sample data for the SoulCycle AV Maintenance System')
+    parser.add_argument('--scale', action='store_true', help='Generate a large synthetic fleet instead of the demo dataset')
+    parser.add_argument('--studios', type=int, default=100, help='Number of studios (scale mode)')
+    parser.add_argument('--devices-per-studio', type=int, default=40, help='Devices per studio (scale mode)')
+    parser.add_argument('--years', type=int, default=3, help='Years of schedule/history to generate (scale mode)')
+    parser.add_argument('--alerts-per-studio', type=int, default=60, help='Alerts per studio per year (scale mode)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for reproducible datasets (scale mode)')
+    parser.add_argument('--chunk-size', type=int, default=10000, help='Rows per executemany batch (scale mode)')
+    parser.add_argument('--as-of', help='Anchor date YYYY-MM-DD for the dataset (scale mode, default today)')
+    args = parser.parse_args()
 
+    if args.scale:
+        create_scaled_data(
+            studios=args.studios,
+            devices_per_studio=args.devices_per_studio,
+            years=args.years,
+            alerts_per_studio=args.alerts_per_studio,
+            seed=args.seed,
+            chunk_size=args.chunk_size,
+            as_of=datetime.strptime(args.as_of, '%Y-%m-%d').date() if args.as_of else None
+        )
+    else:
+        create_sample_data()
@@ -0,0 +1,275 @@
+"""
+Retention for resolved alerts and generated reports.
+
+Rows past their retention age are copied to compressed monthly archives
+(ARCHIVE_DIR/<dataset>/<YYYY-MM>.jsonl.gz, one JSON object per row, by
+creation month) and then deleted, CHUNK_SIZE rows at a time: each chunk is
+appended to its archive as a new gzip member and fsynced before its rows are
+deleted in one DELETE ... WHERE id IN (...) and committed, so a crash can
+duplicate a chunk in the archive (deduplicate on "id") but never lose one.
+A run stops after MAX_CHUNKS_PER_RUN chunks and pauses CHUNK_PAUSE_SECONDS
+between chunks, so the nightly job never holds the database for long; any
+backlog is picked up by the next run. Each run's summary is appended to
+ARCHIVE_DIR/retention_runs.jsonl. On-demand runs go to a background thread
+(start_retention_run) and are reported by retention_status().
+
+A run reports what it archived (row_bytes: size of the rows as archived JSON;
+archived_bytes: compressed size on disk), the report files it removed
+(file_bytes) and, on SQLite, how many bytes of database pages the deletes
+freed (freed_database_bytes, from PRAGMA freelist_count before and after;
+the pages are reused by later writes or returned to the OS by VACUUM).
+"""
+import os
+import gzip
+import json
+import time
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, delete, func, or_, true, text
+from src.models.maintenance import db, Alert
+from src.report_cache import Report, MAX_AGE_HOURS, STALE_JOB_MINUTES
+from src.alert_escalation import discard_pending_notifications
+
+logger = logging.getLogger(__name__)
+
+ALERT_RETENTION_DAYS = 90
+REPORT_RETENTION_HOURS = MAX_AGE_HOURS
+CHUNK_SIZE = 500
+MAX_CHUNKS_PER_RUN = 200
+CHUNK_PAUSE_SECONDS = 0.2
+# Run summaries returned by retention_status()
+STATUS_RUNS = 20
+
+ARCHIVE_DIR = os.environ.get(
+    'ARCHIVE_OUTPUT_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database', 'archive')
+)
+RUN_LOG = 'retention_runs.jsonl'
+
+DATASETS = ('alerts', 'reports')
+
+_run_lock = threading.Lock()
+# Latest on-demand run started in this process
+_background = {'state': 'idle'}
+
+
+class RetentionBusy(Exception):
+    """Raised when a retention run is already in progress in this process"""
+
+
+def _eligible(dataset, now):
+    """(table, creation column, WHERE condition) for rows due for archival"""
+    if dataset == 'alerts':
+        table = Alert.__table__
+        closed = table.c.is_resolved == true()
+        if 'status' in table.c:
+            closed = or_(closed, table.c.status.in_(('resolved', 'dismissed')))
+        closed_at = func.coalesce(table.c.resolved_at, table.c.created_at)
+        return table, table.c.created_at, closed & (closed_at < now - timedelta(days=ALERT_RETENTION_DAYS))
+
+    table = Report.__table__
+    finished = or_(table.c.status != 'generating', table.c.updated_at < now - timedelta(minutes=STALE_JOB_MINUTES))
+    return table, table.c.generated_at, finished & (table.c.generated_at < now - timedelta(hours=REPORT_RETENTION_HOURS))
+
+
+def _json_value(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if hasattr(value, 'value'):
+        return value.value
+    return str(value)
+
+
+def _append_archive(path, lines):
+    """Append lines as one gzip member and fsync; returns compressed bytes written"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'ab') as raw:
+        start = raw.tell()
+        with gzip.GzipFile(fileobj=raw, mode='wb') as archive:
+            archive.write(''.join(lines).encode('utf-8'))
+        raw.flush()
+        os.fsync(raw.fileno())
+        return raw.tell() - start
+
+
+def _archive_chunk(dataset, created_column, rows):
+    """Write a chunk to its monthly archives; returns (row bytes, archived bytes)"""
+    by_month = {}
+    row_bytes = 0
+    for row in rows:
+        line = json.dumps(dict(row._mapping), default=_json_value, separators=(',', ':')) + '\n'
+        row_bytes += len(line)
+        created = row._mapping[created_column.name]
+        month = created.strftime('%Y-%m') if created else 'undated'
+        by_month.setdefault(month, []).append(line)
+
+    archived = 0
+    for month, lines in by_month.items():
+        archived += _append_archive(os.path.join(ARCHIVE_DIR, dataset, f'{month}.jsonl.gz'), lines)
+    return row_bytes, archived
+
+
+def _remove_files(rows):
+    removed = 0
+    for row in rows:
+        file_path = row._mapping.get('file_path')
+        if file_path and os.path.exists(file_path):
+            removed += os.path.getsize(file_path)
+            os.remove(file_path)
+    return removed
+
+
+def archive_dataset(dataset, now=None, chunk_size=CHUNK_SIZE, max_chunks=MAX_CHUNKS_PER_RUN,
+                    pause=CHUNK_PAUSE_SECONDS):
+    """Archive and delete up to max_chunks chunks of ``dataset``; returns counts"""
+    now = now or datetime.utcnow()
+    table, created_column, condition = _eligible(dataset, now)
+    summary = {'rows': 0, 'row_bytes': 0, 'file_bytes': 0, 'archived_bytes': 0, 'chunks': 0, 'complete': False}
+
+    last_id = 0
+    while summary['chunks'] < max_chunks:
+        rows = db.session.execute(
+            select(table).where(condition, table.c.id > last_id).order_by(table.c.id).limit(chunk_size)
+        ).all()
+        if not rows:
+            summary['complete'] = True
+            break
+
+        row_bytes, archived = _archive_chunk(dataset, created_column, rows)
+        ids = [row._mapping['id'] for row in rows]
+        if dataset == 'alerts':
+            discard_pending_notifications(table.c.id.in_(ids))
+        db.session.execute(delete(table).where(table.c.id.in_(ids)))
+        db.session.commit()
+        if dataset == 'reports':
+            summary['file_bytes'] += _remove_files(rows)
+
+        last_id = ids[-1]
+        summary['rows'] += len(rows)
+        summary['row_bytes'] += row_bytes
+        summary['archived_bytes'] += archived
+        summary['chunks'] += 1
+        if len(rows) < chunk_size:
+            summary['complete'] = True
+            break
+        if pause:
+            time.sleep(pause)
+    return summary
+
+
+def _database_free_bytes():
+    """Free pages in a SQLite database file (reusable, or reclaimable with VACUUM)"""
+    if db.engine.dialect.name != 'sqlite':
+        return None
+    free_pages = db.session.execute(text('PRAGMA freelist_count')).scalar()
+    page_size = db.session.execute(text('PRAGMA page_size')).scalar()
+    return free_pages * page_size
+
+
+def _run(now, max_chunks, pause):
+    """One run; the caller holds _run_lock"""
+    started = time.perf_counter()
+    run = {'started_at': datetime.utcnow().isoformat()}
+    free_before = _database_free_bytes()
+    for dataset in DATASETS:
+        run[dataset] = archive_dataset(dataset, now=now, max_chunks=max_chunks, pause=pause)
+    for key in ('rows', 'row_bytes', 'archived_bytes', 'file_bytes'):
+        run[key] = sum(run[dataset][key] for dataset in DATASETS)
+    run['complete'] = all(run[dataset]['complete'] for dataset in DATASETS)
+    run['database_free_bytes'] = _database_free_bytes()
+    run['freed_database_bytes'] = run['database_free_bytes'] - free_before if free_before is not None else None
+    run['elapsed_seconds'] = round(time.perf_counter() - started, 3)
+
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    with open(os.path.join(ARCHIVE_DIR, RUN_LOG), 'a') as f:
+        f.write(json.dumps(run) + '\n')
+    logger.info(
+        f"Retention archived {run['rows']} rows ({run['archived_bytes']} bytes compressed), "
+        f"freed {run['freed_database_bytes']} database bytes and {run['file_bytes']} report file bytes"
+    )
+    return run
+
+
+def run_retention(now=None, max_chunks=MAX_CHUNKS_PER_RUN, pause=CHUNK_PAUSE_SECONDS):
+    """
+    Archive and delete old alerts and reports. Raises RetentionBusy if a run is
+    already in progress; returns the run summary (also appended to the run log).
+    """
+    if not _run_lock.acquire(blocking=False):
+        raise RetentionBusy('A retention run is already in progress')
+    try:
+        return _run(now, max_chunks, pause)
+    finally:
+        _run_lock.release()
+
+
+def start_retention_run(app, max_chunks=MAX_CHUNKS_PER_RUN, pause=CHUNK_PAUSE_SECONDS):
+    """
+    Start a run on a background thread and return its status. Raises
+    RetentionBusy if a run is already in progress.
+    """
+    if not _run_lock.acquire(blocking=False):
+        raise RetentionBusy('A retention run is already in progress')
+    _background.clear()
+    _background.update({'state': 'running', 'started_at': datetime.utcnow().isoformat(), 'max_chunks': max_chunks})
+    try:
+        threading.Thread(
+            target=_run_in_background, args=(app, max_chunks, pause), name='retention-run', daemon=True
+        ).start()
+    except Exception:
+        _background['state'] = 'failed'
+        _run_lock.release()
+        raise
+    return dict(_background)
+
+
+def _run_in_background(app, max_chunks, pause):
+    with app.app_context():
+        try:
+            run = _run(None, max_chunks, pause)
+            _background.update({'state': 'completed', 'run': run})
+        except Exception as e:
+            logger.error(f"Retention run failed: {str(e)}")
+            db.session.rollback()
+            _background.update({'state': 'failed', 'error': str(e)})
+        finally:
+            _background['finished_at'] = datetime.utcnow().isoformat()
+            db.session.remove()
+            _run_lock.release()
+
+
+def retention_status(now=None):
+    """Rows currently due for archival, recent runs and totals over logged runs"""
+    now = now or datetime.utcnow()
+    pending = {}
+    for dataset in DATASETS:
+        table, _, condition = _eligible(dataset, now)
+        pending[dataset] = db.session.execute(select(func.count()).select_from(table).where(condition)).scalar()
+
+    runs = deque(maxlen=STATUS_RUNS)
+    totals = {'runs': 0, 'rows': 0, 'row_bytes': 0, 'archived_bytes': 0, 'file_bytes': 0, 'freed_database_bytes': 0}
+    log_path = os.path.join(ARCHIVE_DIR, RUN_LOG)
+    if os.path.exists(log_path):
+        with open(log_path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                run = json.loads(line)
+                runs.append(run)
+                totals['runs'] += 1
+                for key in totals:
+                    if key != 'runs':
+                        totals[key] += run.get(key) or 0
+
+    return {
+        'pending': pending,
+        'running': _run_lock.locked(),
+        'current_run': dict(_background),
+        'totals': totals,
+        'recent_runs': list(reversed(runs)),
+        'database_free_bytes': _database_free_bytes(),
+        'retention': {'alert_days': ALERT_RETENTION_DAYS, 'report_hours': REPORT_RETENTION_HOURS}
+    }
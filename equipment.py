@@ -2,6 +2,12 @@ from flask import Blueprint, request, jsonify
 from src.models.maintenance import db, Equipment, Studio, EquipmentCategory, MaintenanceSchedule, MaintenanceHistory
 from datetime import datetime, date, timedelta
 from sqlalchemy import func, and_
+from src.bulk_import import parse_import_records, import_equipment, DEFAULT_CHUNK_SIZE
+from src.usage_telemetry import ingest_usage_readings
+from src.usage_series import query_usage_series, append_usage_points
+from src.maintenance_policy import apply_maintenance_policy
+from src.usage_forecast import forecast_usage_maintenance, DEFAULT_WINDOW_DAYS
+from src.equipment_suggest import suggest, suggestion_index, DEFAULT_LIMIT as DEFAULT_SUGGESTION_LIMIT
 
 equipment_bp = Blueprint('equipment', __name__)
 
@@ -17,8 +23,8 @@ def get_equipment():
         manufacturer = request.args.get('manufacturer')
         maintenance_due = request.args.get('maintenance_due', type=bool)
         
-        # Build query
-        query = Equipment.query
+        # Build query; studio names come from the same statement
+        query = db.session.query(Equipment, Studio.name).outerjoin(Studio, Studio.id == Equipment.studio_id)
         
         if studio_id:
             query = query.filter(Equipment.studio_id == studio_id)
@@ -42,9 +48,9 @@ def get_equipment():
         
         # Include studio information
         result = []
-        for eq in equipment:
+        for eq, studio_name in equipment:
             eq_data = eq.to_dict()
-            eq_data['studio_name'] = eq.studio.name if eq.studio else None
+            eq_data['studio_name'] = studio_name
             result.append(eq_data)
         
         return jsonify({
@@ -55,11 +61,36 @@ def get_equipment():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@equipment_bp.route('/equipment/suggest', methods=['GET'])
+def suggest_equipment():
+    """Autocomplete equipment names, serial numbers, models and studio names"""
+    try:
+        query = request.args.get('q', '')
+        limit = request.args.get('limit', default=DEFAULT_SUGGESTION_LIMIT, type=int)
+        kind = request.args.get('type')
+        studio_id = request.args.get('studio_id', type=int)
+        
+        try:
+            suggestions = suggest(query, limit=limit, kind=kind, studio_id=studio_id)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        return jsonify({
+            'success': True,
+            'data': suggestions,
+            'count': len(suggestions)
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @equipment_bp.route('/equipment/<int:equipment_id>', methods=['GET'])
 def get_equipment_detail(equipment_id):
     """Get detailed information about specific equipment"""
     try:
-        equipment = Equipment.query.get_or_404(equipment_id)
+        # Studio name joined in the same statement instead of a lazy load
+        equipment, studio_name = db.session.query(Equipment, Studio.name).outerjoin(
+            Studio, Studio.id == Equipment.studio_id
+        ).filter(Equipment.id == equipment_id).first_or_404()
         
         # Get maintenance history
         history = MaintenanceHistory.query.filter_by(equipment_id=equipment_id)\
@@ -71,7 +102,7 @@ def get_equipment_detail(equipment_id):
             .order_by(MaintenanceSchedule.scheduled_date).limit(5).all()
         
         eq_data = equipment.to_dict()
-        eq_data['studio_name'] = equipment.studio.name if equipment.studio else None
+        eq_data['studio_name'] = studio_name
         eq_data['maintenance_history'] = [h.to_dict() for h in history]
         eq_data['upcoming_maintenance'] = [s.to_dict() for s in upcoming]
         
@@ -160,6 +191,55 @@ def create_equipment():
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@equipment_bp.route('/equipment/bulk', methods=['POST'])
+def bulk_import_equipment():
+    """Bulk import equipment from a CSV or NDJSON body"""
+    try:
+        chunk_size = request.args.get('chunk_size', default=DEFAULT_CHUNK_SIZE, type=int)
+        dry_run = request.args.get('dry_run', 'false').lower() == 'true'
+        
+        try:
+            report = import_equipment(parse_import_records(request), chunk_size=chunk_size, dry_run=dry_run)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        if report['inserted'] and suggestion_index.loaded:
+            # Core inserts bypass the session events; pick them up right away
+            suggestion_index.refresh(force=True)
+        
+        return jsonify({
+            'success': True,
+            'data': report,
+            'message': f"{report['inserted']} equipment imported, {report['failed']} rows rejected"
+        }), 201 if report['inserted'] else 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@equipment_bp.route('/equipment/maintenance-policy', methods=['POST'])
+def update_maintenance_policy():
+    """Apply a maintenance interval policy to all matching equipment"""
+    try:
+        data = request.get_json() or {}
+        
+        try:
+            report = apply_maintenance_policy(
+                data.get('filters', {}),
+                maintenance_interval_days=data.get('maintenance_interval_days'),
+                usage_threshold_hours=data.get('usage_threshold_hours'),
+                dry_run=bool(data.get('dry_run', False))
+            )
+        except (ValueError, TypeError) as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        return jsonify({
+            'success': True,
+            'data': report,
+            'message': f"Maintenance policy applied to {report['matched']} equipment"
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @equipment_bp.route('/equipment/<int:equipment_id>', methods=['PUT'])
 def update_equipment(equipment_id):
     """Update existing equipment"""
@@ -285,6 +365,59 @@ def get_maintenance_due():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@equipment_bp.route('/equipment/usage/batch', methods=['POST'])
+def batch_update_equipment_usage():
+    """Apply a batch of usage readings (JSON array, NDJSON or CSV) from AV controllers"""
+    try:
+        chunk_size = request.args.get('chunk_size', default=DEFAULT_CHUNK_SIZE, type=int)
+        
+        try:
+            report = ingest_usage_readings(parse_import_records(request), chunk_size=chunk_size)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        return jsonify({
+            'success': True,
+            'data': report,
+            'message': f"Usage updated for {report['devices_updated']} equipment, {report['rejected']} readings rejected"
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@equipment_bp.route('/equipment/usage/forecast', methods=['POST'])
+def run_usage_forecast():
+    """Forecast usage-based maintenance dates on demand"""
+    try:
+        data = request.get_json(silent=True) or {}
+        
+        try:
+            window_days = int(data.get('window_days', DEFAULT_WINDOW_DAYS))
+            limit = int(data.get('limit', 100))
+            studio_id = int(data['studio_id']) if data.get('studio_id') is not None else None
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'error': 'window_days, limit and studio_id must be integers'}), 400
+        if window_days < 2:
+            return jsonify({'success': False, 'error': 'window_days must be at least 2'}), 400
+        if limit < 0:
+            return jsonify({'success': False, 'error': 'limit must not be negative'}), 400
+        
+        summary = forecast_usage_maintenance(
+            window_days=window_days,
+            studio_id=studio_id,
+            dry_run=bool(data.get('dry_run', False)),
+            prediction_limit=limit
+        )
+        
+        return jsonify({
+            'success': True,
+            'data': summary,
+            'message': f"{summary['forecast']} devices forecast, {summary['updated']} maintenance dates updated"
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @equipment_bp.route('/equipment/<int:equipment_id>/usage', methods=['POST'])
 def update_equipment_usage(equipment_id):
     """Update equipment usage hours and power cycles"""
@@ -298,6 +431,10 @@ def update_equipment_usage(equipment_id):
         if 'power_cycles' in data:
             equipment.power_cycles = data['power_cycles']
         
+        append_usage_points([(equipment.id, datetime.utcnow().replace(microsecond=0),
+                              data.get('operating_hours'), data.get('power_cycles'))],
+                            fallback={equipment.id: (equipment.operating_hours, equipment.power_cycles)})
+        
         # Recalculate next maintenance based on usage
         if equipment.usage_based_maintenance:
             equipment.next_maintenance = equipment.calculate_next_maintenance()
@@ -314,6 +451,40 @@ def update_equipment_usage(equipment_id):
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@equipment_bp.route('/equipment/<int:equipment_id>/usage', methods=['GET'])
+def get_equipment_usage_series(equipment_id):
+    """Get the usage time series for equipment over a date range"""
+    try:
+        Equipment.query.get_or_404(equipment_id)
+        
+        to_param = request.args.get('to')
+        from_param = request.args.get('from')
+        resolution = request.args.get('resolution')
+        
+        try:
+            end = datetime.fromisoformat(to_param) if to_param else datetime.utcnow()
+            start = datetime.fromisoformat(from_param) if from_param else end - timedelta(days=30)
+        except ValueError:
+            return jsonify({'success': False, 'error': 'from and to must be ISO dates'}), 400
+        # A bare end date covers that whole day
+        if to_param and len(to_param) == 10:
+            end = end + timedelta(days=1) - timedelta(seconds=1)
+        if start > end:
+            return jsonify({'success': False, 'error': 'from must be before to'}), 400
+        
+        try:
+            series = query_usage_series(equipment_id, start, end, resolution)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        return jsonify({
+            'success': True,
+            'data': series,
+            'count': len(series['points'])
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @equipment_bp.route('/equipment/stats', methods=['GET'])
 def get_equipment_stats():
     """Get equipment statistics across all studios"""
@@ -0,0 +1,351 @@
+"""
+In-memory prefix index for equipment and studio autocomplete.
+
+Equipment names, serial numbers and models and studio names are kept as
+lower-cased keys in one sorted list; a lookup is a bisect to the first key
+starting with the typed prefix followed by a short forward scan, so
+suggestions never touch the database. Every word of a name or model is
+indexed as well ("rec" finds "Shure Mic Receiver"), and serial numbers are
+also indexed without separators ("ab12" finds "AB-12-0042").
+
+The index is loaded on first use and kept current incrementally: ORM commits
+in this process are applied from session events, and writes from other
+workers or bulk Core inserts are picked up by a periodic updated_at watermark
+check. Rows whose indexed fields are unchanged are skipped; when more than
+REBUILD_THRESHOLD rows did change (e.g. after a bulk import), the index is
+rebuilt on a background thread and lookups keep using the current one until
+the new one is swapped in. Inactive equipment and studios are not suggested.
+"""
+import re
+import time
+import logging
+import threading
+from bisect import bisect_left
+
+from sqlalchemy import event, select, func
+from sqlalchemy.orm import Session
+from src.models.maintenance import db, Studio, Equipment
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+# Upper bound on keys inspected per lookup; keeps short prefixes cheap
+SCAN_LIMIT = 200
+# How often the database is checked for writes the session events didn't see
+REFRESH_SECONDS = 10
+# Changed rows past which a refresh rebuilds in the background instead of
+# re-inserting each one (every re-insert shifts the sorted list)
+REBUILD_THRESHOLD = 100
+
+KINDS = ('equipment', 'studio')
+
+# Lower rank wins: whole-field matches beat matches on a later word
+_RANK_FIELD, _RANK_WORD = 0, 1
+_WORD = re.compile(r'[^\W_]+')
+_SEPARATORS = re.compile(r'[\s\-_./:]+')
+
+_PENDING_KEY = 'equipment_suggest_changes'
+
+
+def normalize(value):
+    return ' '.join((value or '').casefold().split())
+
+
+def _equipment_record(equipment):
+    return {
+        'id': equipment.id,
+        'name': equipment.name,
+        'serial_number': equipment.serial_number,
+        'model': equipment.model,
+        'manufacturer': equipment.manufacturer,
+        'studio_id': equipment.studio_id,
+        'is_active': equipment.is_active is not False
+    }
+
+
+def _studio_record(studio):
+    return {
+        'id': studio.id,
+        'name': studio.name,
+        'is_active': studio.is_active is not False
+    }
+
+
+SOURCES = (('studio', Studio, _studio_record), ('equipment', Equipment, _equipment_record))
+
+
+def _keys_for(kind, record):
+    """(key, rank, field) tuples a record is findable under"""
+    fields = ('name', 'serial_number', 'model') if kind == 'equipment' else ('name',)
+    keys = set()
+    for field in fields:
+        value = normalize(record.get(field))
+        if not value:
+            continue
+        keys.add((value, _RANK_FIELD, field))
+        if field == 'serial_number':
+            compact = _SEPARATORS.sub('', value)
+            if compact and compact != value:
+                keys.add((compact, _RANK_FIELD, field))
+        else:
+            for match in list(_WORD.finditer(value))[1:]:
+                keys.add((value[match.start():], _RANK_WORD, field))
+    return keys
+
+
+class PrefixIndex:
+    """Sorted (key, rank, kind, id, field) entries searched with bisect"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries = []
+        self._keys = {}
+        self._records = {}
+        self._studio_names = {}
+        self._seen = {kind: set() for kind in KINDS}
+        self._watermarks = {}
+        self._fingerprints = {}
+        self._checked_at = None
+        self._rebuilding = False
+        # Changes committed while a background rebuild runs, replayed onto its result
+        self._replay = {}
+
+    @property
+    def loaded(self):
+        return self._checked_at is not None
+
+    def _remove(self, kind, entity_id):
+        for entry in self._keys.pop((kind, entity_id), ()):
+            position = bisect_left(self._entries, entry)
+            if position < len(self._entries) and self._entries[position] == entry:
+                del self._entries[position]
+        self._records.pop((kind, entity_id), None)
+
+    def _unchanged(self, kind, record):
+        """True if the index already reflects ``record``"""
+        entity_id = record['id']
+        if kind == 'studio' and self._studio_names.get(entity_id) != record['name']:
+            return False
+        if record['is_active']:
+            return self._records.get((kind, entity_id)) == record
+        return entity_id in self._seen[kind] and (kind, entity_id) not in self._records
+
+    def _upsert(self, kind, record, bulk=None):
+        entity_id = record['id']
+        self._seen[kind].add(entity_id)
+        if kind == 'studio':
+            self._studio_names[entity_id] = record['name']
+        if bulk is None:
+            self._remove(kind, entity_id)
+        if not record['is_active']:
+            return
+        entries = [(key, rank, kind, entity_id, field) for key, rank, field in _keys_for(kind, record)]
+        self._keys[(kind, entity_id)] = entries
+        self._records[(kind, entity_id)] = record
+        if bulk is not None:
+            bulk.extend(entries)
+        else:
+            for entry in entries:
+                self._entries.insert(bisect_left(self._entries, entry), entry)
+
+    def apply(self, changes):
+        """Apply committed changes: {(kind, id): record or None for deleted}"""
+        with self._lock:
+            if not self.loaded:
+                return
+            if self._rebuilding:
+                self._replay.update(changes)
+            for (kind, entity_id), record in changes.items():
+                if record is None:
+                    self._remove(kind, entity_id)
+                    self._seen[kind].discard(entity_id)
+                    if kind == 'studio':
+                        self._studio_names.pop(entity_id, None)
+                else:
+                    self._upsert(kind, record)
+
+    def _fingerprint(self, connection, model):
+        table = model.__table__
+        return tuple(connection.execute(select(func.count(), func.max(table.c.updated_at))).one())
+
+    def _rows(self, connection, model, since=None):
+        table = model.__table__
+        fields = ('id', 'name', 'serial_number', 'model', 'manufacturer', 'studio_id', 'is_active') \
+            if model is Equipment else ('id', 'name', 'is_active')
+        query = select(*[table.c[field] for field in fields])
+        if since is not None:
+            query = query.where(table.c.updated_at >= since)
+        return connection.execute(query)
+
+    def _build(self, connection):
+        """A fully loaded index read through ``connection``"""
+        index = PrefixIndex()
+        bulk = []
+        for kind, model, to_record in SOURCES:
+            fingerprint = index._fingerprint(connection, model)
+            for row in index._rows(connection, model):
+                index._upsert(kind, to_record(row), bulk)
+            index._fingerprints[kind] = fingerprint
+            index._watermarks[kind] = fingerprint[1]
+        bulk.sort()
+        index._entries = bulk
+        index._checked_at = time.monotonic()
+        return index
+
+    def _install(self, index):
+        for name in ('_entries', '_keys', '_records', '_studio_names', '_seen', '_watermarks', '_fingerprints', '_checked_at'):
+            setattr(self, name, getattr(index, name))
+
+    def reload(self):
+        """Rebuild the whole index from the database"""
+        with self._lock:
+            self._install(self._build(db.session))
+
+    def _rebuild_in_background(self):
+        """Rebuild on a worker thread; the current index keeps serving lookups meanwhile"""
+        if self._rebuilding:
+            return
+        self._rebuilding = True
+        self._replay = {}
+        threading.Thread(
+            target=self._run_rebuild, args=(db.engine,), name='suggest-rebuild', daemon=True
+        ).start()
+
+    def _run_rebuild(self, engine):
+        try:
+            with engine.connect() as connection:
+                index = self._build(connection)
+            with self._lock:
+                self._install(index)
+                replay, self._replay = self._replay, {}
+                self._rebuilding = False
+                self.apply(replay)
+            logger.info(f"Suggestion index rebuilt ({len(index._entries)} keys)")
+        except Exception as e:
+            logger.error(f"Suggestion index rebuild failed: {str(e)}")
+        finally:
+            with self._lock:
+                self._rebuilding = False
+
+    def refresh(self, force=False):
+        """Load on first use, then pick up writes made outside this process"""
+        with self._lock:
+            if not self.loaded:
+                self.reload()
+                return
+            if not force and time.monotonic() - self._checked_at < REFRESH_SECONDS:
+                return
+            if self._rebuilding:
+                return
+            self._checked_at = time.monotonic()
+            for kind, model, to_record in SOURCES:
+                fingerprint = self._fingerprint(db.session, model)
+                if fingerprint == self._fingerprints.get(kind):
+                    continue
+                changed = []
+                for row in self._rows(db.session, model, self._watermarks.get(kind)):
+                    record = to_record(row)
+                    if not self._unchanged(kind, record):
+                        changed.append(record)
+                        if len(changed) > REBUILD_THRESHOLD:
+                            self._rebuild_in_background()
+                            return
+                for record in changed:
+                    self._upsert(kind, record)
+                if fingerprint[0] != len(self._seen[kind]):
+                    # Rows were hard-deleted or written without updated_at
+                    self._rebuild_in_background()
+                    return
+                self._fingerprints[kind] = fingerprint
+                self._watermarks[kind] = fingerprint[1]
+
+    def suggest(self, query, limit=DEFAULT_LIMIT, kind=None, studio_id=None):
+        """Best matches for a typed prefix, whole-field matches first"""
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        prefixes = {prefix, _SEPARATORS.sub('', prefix)} - {''}
+
+        best = {}
+        with self._lock:
+            for candidate in prefixes:
+                start = bisect_left(self._entries, (candidate,))
+                for key, rank, entry_kind, entity_id, field in self._entries[start:start + SCAN_LIMIT]:
+                    if not key.startswith(candidate):
+                        break
+                    record = self._records[(entry_kind, entity_id)]
+                    if kind and entry_kind != kind:
+                        continue
+                    if studio_id and (record['id'] if entry_kind == 'studio' else record['studio_id']) != studio_id:
+                        continue
+                    score = (rank, key != candidate, len(key), key)
+                    current = best.get((entry_kind, entity_id))
+                    if current is None or score < current[0]:
+                        best[(entry_kind, entity_id)] = (score, field, record)
+
+            ranked = sorted(best.items(), key=lambda item: item[1][0])[:limit]
+            suggestions = []
+            for (entry_kind, entity_id), (score, field, record) in ranked:
+                suggestion = {key: value for key, value in record.items() if key != 'is_active'}
+                suggestion['type'] = entry_kind
+                suggestion['matched_field'] = field
+                if entry_kind == 'equipment':
+                    suggestion['studio_name'] = self._studio_names.get(record['studio_id'])
+                suggestions.append(suggestion)
+        return suggestions
+
+    def stats(self):
+        with self._lock:
+            return {
+                'keys': len(self._entries),
+                'equipment': sum(1 for kind, _ in self._records if kind == 'equipment'),
+                'studios': sum(1 for kind, _ in self._records if kind == 'studio')
+            }
+
+
+suggestion_index = PrefixIndex()
+
+
+def suggest(query, limit=DEFAULT_LIMIT, kind=None, studio_id=None):
+    if kind and kind not in KINDS:
+        raise ValueError(f'Invalid suggestion type: {kind}')
+    limit = max(1, min(int(limit), MAX_LIMIT))
+    suggestion_index.refresh()
+    return suggestion_index.suggest(query, limit=limit, kind=kind, studio_id=studio_id)
+
+
+def _snapshot(instance):
+    if isinstance(instance, Equipment):
+        return 'equipment', _equipment_record(instance)
+    if isinstance(instance, Studio):
+        return 'studio', _studio_record(instance)
+    return None, None
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changes(session, flush_context):
+    """Snapshot flushed equipment and studios; applied only once the transaction commits"""
+    if not suggestion_index.loaded:
+        return
+    pending = session.info.setdefault(_PENDING_KEY, {})
+    for instance in list(session.new) + list(session.dirty):
+        kind, record = _snapshot(instance)
+        if kind:
+            pending[(kind, record['id'])] = record
+    for instance in session.deleted:
+        kind, record = _snapshot(instance)
+        if kind:
+            pending[(kind, record['id'])] = None
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_changes(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        suggestion_index.apply(pending)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,45 @@
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from src.columnar_export import (
+    stream_parquet, DATASETS, COMPRESSIONS, DEFAULT_ROW_GROUP_SIZE, DEFAULT_COMPRESSION
+)
+from datetime import datetime, date, timedelta
+
+export_bp = Blueprint('export', __name__)
+
+# Upper bound on rows buffered per row group by a single download
+MAX_ROW_GROUP_SIZE = 200000
+
+@export_bp.route('/export/<dataset>.parquet', methods=['GET'])
+def export_parquet(dataset):
+    """Stream maintenance history, schedules or alerts as a Parquet file"""
+    try:
+        if dataset not in DATASETS:
+            return jsonify({'success': False, 'error': f'Invalid dataset: {dataset}'}), 404
+        
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+        row_group_size = request.args.get('row_group_size', default=DEFAULT_ROW_GROUP_SIZE, type=int)
+        compression = request.args.get('compression', DEFAULT_COMPRESSION)
+        
+        try:
+            start = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else None
+            end = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else None
+        except ValueError:
+            return jsonify({'success': False, 'error': 'Dates must be YYYY-MM-DD'}), 400
+        if compression not in COMPRESSIONS:
+            return jsonify({'success': False, 'error': f'Invalid compression: {compression}'}), 400
+        row_group_size = max(1000, min(row_group_size, MAX_ROW_GROUP_SIZE))
+        
+        # end_date is inclusive for callers; the export range is half-open
+        if end:
+            end += timedelta(days=1)
+        
+        filename = f"{dataset}_{start_date or 'all'}_{end_date or date.today().isoformat()}.parquet"
+        response = Response(
+            stream_with_context(stream_parquet(dataset, start, end, row_group_size, compression)),
+            mimetype='application/vnd.apache.parquet'
+        )
+        response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+        return response
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Export maintenance history, schedules and alerts to Parquet for offline analytics.
+
+Writes hive-style partitioned files (e.g. exports/history/month=2024-03/part-0.parquet)
+straight from the database, without going through the API.
+
+Usage:
+    python export_parquet.py --output-dir exports
+    python export_parquet.py --dataset history --start-date 2023-01-01 --partition year
+"""
+import os
+import sys
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.main import app
+from src.columnar_export import (
+    export_partitioned, DATASETS, PARTITIONS, COMPRESSIONS, DEFAULT_ROW_GROUP_SIZE, DEFAULT_COMPRESSION
+)
+from datetime import datetime, timedelta
+import argparse
+import time
+
+
+def parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Export maintenance data to partitioned Parquet files')
+    parser.add_argument('--dataset', choices=list(DATASETS) + ['all'], default='all')
+    parser.add_argument('--output-dir', default='exports', help='Directory to write <dataset>/<partition>/ files under')
+    parser.add_argument('--start-date', type=parse_date, help='First date to export (YYYY-MM-DD)')
+    parser.add_argument('--end-date', type=parse_date, help='Last date to export, inclusive (YYYY-MM-DD)')
+    parser.add_argument('--partition', choices=PARTITIONS, default='month')
+    parser.add_argument('--row-group-size', type=int, default=DEFAULT_ROW_GROUP_SIZE)
+    parser.add_argument('--compression', choices=COMPRESSIONS, default=DEFAULT_COMPRESSION)
+    args = parser.parse_args()
+
+    end = args.end_date + timedelta(days=1) if args.end_date else None
+    datasets = list(DATASETS) if args.dataset == 'all' else [args.dataset]
+
+    with app.app_context():
+        for dataset in datasets:
+            started = time.perf_counter()
+            written = export_partitioned(
+                dataset, args.output_dir, args.start_date, end, args.partition,
+                row_group_size=args.row_group_size, compression=args.compression
+            )
+            elapsed = time.perf_counter() - started
+            print(f"{dataset}: {sum(written.values())} rows in {len(written)} files ({elapsed:.1f}s)")
+            for path, rows in sorted(written.items()):
+                print(f"  {path}: {rows}")
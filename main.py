@@ -11,6 +11,13 @@ from src.routes.studios import studios_bp
 from src.routes.equipment import equipment_bp
 from src.routes.alerts import alerts_bp
 from src.routes.reports import reports_bp
+from src.routes.search import search_bp
+from src.routes.export import export_bp
+from src.routes.retention import retention_bp
+from src.search_index import ensure_search_index
+from src.alert_severity import ensure_priority_score
+from src.alert_escalation import ensure_escalation_columns
+from src.report_cache import ensure_report_cache
 from src.scheduler import maintenance_scheduler
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
@@ -25,13 +32,23 @@ app.register_blueprint(studios_bp, url_prefix='/api')
 app.register_blueprint(equipment_bp, url_prefix='/api')
 app.register_blueprint(alerts_bp, url_prefix='/api')
 app.register_blueprint(reports_bp, url_prefix='/api')
+app.register_blueprint(search_bp, url_prefix='/api')
+app.register_blueprint(export_bp, url_prefix='/api')
+app.register_blueprint(retention_bp, url_prefix='/api')
 
 # uncomment if you need to use database
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get(
+    'DATABASE_URL',
+    f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+)
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db.init_app(app)
 with app.app_context():
     db.create_all()
+    ensure_search_index()
+    ensure_priority_score()
+    ensure_escalation_columns()
+    ensure_report_cache()
 
 # Initialize and start the maintenance scheduler
 maintenance_scheduler.init_app(app)
@@ -1,10 +1,20 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from src.models.maintenance import (
     db, MaintenanceTask, MaintenanceSchedule, MaintenanceHistory, Equipment, Studio,
     EquipmentCategory, MaintenanceType, TaskStatus, Priority
 )
+import hmac
 from datetime import datetime, date, timedelta
 from sqlalchemy import func, and_, or_
+from src.bulk_import import parse_import_records, import_schedules, import_history, DEFAULT_CHUNK_SIZE
+from src.recurrence import (
+    RecurrenceRule, ensure_rule, rule_for_schedule, materialize_occurrence, expand_virtual_occurrences
+)
+from src.maintenance_calendar import get_calendar, DEFAULT_ITEMS_PER_BUCKET
+from src.technician_assignment import (
+    parse_technicians, load_open_jobs, plan_assignments, describe_plan, plan_token, validate_changes, apply_assignments,
+    DEFAULT_HORIZON_DAYS, DEFAULT_TIME_LIMIT
+)
 
 maintenance_bp = Blueprint('maintenance', __name__)
 
@@ -151,8 +161,31 @@ def get_maintenance_schedules():
             schedule_data['equipment_name'] = schedule.equipment.name if schedule.equipment else None
             schedule_data['task_name'] = schedule.task.name if schedule.task else None
             schedule_data['is_overdue'] = schedule.is_overdue()
+            schedule_data['virtual'] = False
+            # ISO dates, the same format as virtual occurrences, so both sort together
+            schedule_data['scheduled_date'] = schedule.scheduled_date.isoformat() if schedule.scheduled_date else None
+            schedule_data['next_occurrence'] = schedule.next_occurrence.isoformat() if schedule.next_occurrence else None
             result.append(schedule_data)
         
+        # Forward-looking ranges also show future cycles of recurrence rules
+        expand_recurring = request.args.get('expand_recurring', 'true').lower() == 'true'
+        if end_date and expand_recurring and (not status or status == TaskStatus.SCHEDULED.value):
+            range_start = start if start_date else date.today()
+            try:
+                virtual = expand_virtual_occurrences(
+                    range_start, end,
+                    studio_id=studio_id,
+                    equipment_id=equipment_id,
+                    priority=Priority(priority) if priority else None,
+                    assigned_technician=assigned_technician,
+                    real_keys={(s.equipment_id, s.task_id, s.scheduled_date) for s in schedules}
+                )
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+            if virtual:
+                result.extend(virtual)
+                result.sort(key=lambda item: item['scheduled_date'] or '')
+        
         return jsonify({
             'success': True,
             'data': result,
@@ -235,6 +268,12 @@ def create_maintenance_schedule():
             schedule.next_occurrence = scheduled_date + timedelta(days=task.frequency_days)
         
         db.session.add(schedule)
+        db.session.flush()
+        
+        # Later cycles come from the equipment x task recurrence rule, not extra rows
+        if schedule.is_recurring:
+            ensure_rule(schedule, task)
+        
         db.session.commit()
         
         return jsonify({
@@ -246,6 +285,27 @@ def create_maintenance_schedule():
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@maintenance_bp.route('/maintenance/schedules/bulk', methods=['POST'])
+def bulk_import_maintenance_schedules():
+    """Bulk import maintenance schedules from a CSV or NDJSON body"""
+    try:
+        chunk_size = request.args.get('chunk_size', default=DEFAULT_CHUNK_SIZE, type=int)
+        dry_run = request.args.get('dry_run', 'false').lower() == 'true'
+        
+        try:
+            report = import_schedules(parse_import_records(request), chunk_size=chunk_size, dry_run=dry_run)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        return jsonify({
+            'success': True,
+            'data': report,
+            'message': f"{report['inserted']} maintenance schedules imported, {report['failed']} rows rejected"
+        }), 201 if report['inserted'] else 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @maintenance_bp.route('/maintenance/schedules/<int:schedule_id>', methods=['PUT'])
 def update_maintenance_schedule(schedule_id):
     """Update a maintenance schedule"""
@@ -279,25 +339,10 @@ def update_maintenance_schedule(schedule_id):
                     equipment.last_maintenance = schedule.scheduled_date
                     equipment.next_maintenance = equipment.calculate_next_maintenance()
                     
-                    # Create next recurring schedule if applicable
-                    if schedule.is_recurring and schedule.next_occurrence:
-                        next_schedule = MaintenanceSchedule(
-                            studio_id=schedule.studio_id,
-                            equipment_id=schedule.equipment_id,
-                            task_id=schedule.task_id,
-                            scheduled_date=schedule.next_occurrence,
-                            priority=schedule.priority,
-                            status=TaskStatus.SCHEDULED,
-                            estimated_duration_minutes=schedule.estimated_duration_minutes,
-                            is_recurring=True
-                        )
-                        
-                        # Calculate next occurrence
-                        task = schedule.task
-                        if task.frequency_days:
-                            next_schedule.next_occurrence = schedule.next_occurrence + timedelta(days=task.frequency_days)
-                        
-                        db.session.add(next_schedule)
+                    # The next cycle stays virtual under the recurrence rule; schedules
+                    # created before rules existed get one anchored at their next occurrence
+                    if schedule.is_recurring and schedule.next_occurrence and not rule_for_schedule(schedule):
+                        ensure_rule(schedule, schedule.task, anchor_date=schedule.next_occurrence)
                 
             except ValueError:
                 return jsonify({'success': False, 'error': f'Invalid status: {data["status"]}'}), 400
@@ -338,6 +383,285 @@ def update_maintenance_schedule(schedule_id):
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@maintenance_bp.route('/maintenance/calendar', methods=['GET'])
+def get_maintenance_calendar():
+    """Get per-day or per-week schedule buckets for a calendar view"""
+    try:
+        month = request.args.get('month')
+        start_date = request.args.get('start')
+        end_date = request.args.get('end')
+        studio_id = request.args.get('studio_id', type=int)
+        granularity = request.args.get('granularity', 'day')
+        limit = request.args.get('limit', default=DEFAULT_ITEMS_PER_BUCKET, type=int)
+        expand_recurring = request.args.get('expand_recurring', 'true').lower() == 'true'
+        
+        # month=YYYY-MM gives one canonical, cacheable URL per month view
+        try:
+            if month or not (start_date or end_date):
+                first = datetime.strptime(month, '%Y-%m').date() if month else date.today().replace(day=1)
+                start = first
+                end = (first + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+            else:
+                start = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else date.today()
+                end = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else start + timedelta(days=30)
+        except ValueError:
+            return jsonify({'success': False, 'error': 'Use month=YYYY-MM or start/end as YYYY-MM-DD'}), 400
+        
+        try:
+            calendar, etag = get_calendar(start, end, studio_id, granularity, limit, expand_recurring)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        response = jsonify({
+            'success': True,
+            'data': calendar
+        })
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response.make_conditional(request)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+# Recurrence Rules Routes
+@maintenance_bp.route('/maintenance/recurrence-rules', methods=['GET'])
+def get_recurrence_rules():
+    """Get recurrence rules with filtering"""
+    try:
+        studio_id = request.args.get('studio_id', type=int)
+        equipment_id = request.args.get('equipment_id', type=int)
+        include_inactive = request.args.get('include_inactive', 'false').lower() == 'true'
+        
+        query = RecurrenceRule.query
+        if studio_id:
+            query = query.filter(RecurrenceRule.studio_id == studio_id)
+        if equipment_id:
+            query = query.filter(RecurrenceRule.equipment_id == equipment_id)
+        if not include_inactive:
+            query = query.filter(RecurrenceRule.is_active == True)
+        
+        rules = query.order_by(RecurrenceRule.equipment_id, RecurrenceRule.task_id).all()
+        
+        return jsonify({
+            'success': True,
+            'data': [rule.to_dict() for rule in rules],
+            'count': len(rules)
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+def _apply_rule_fields(rule, data):
+    """Validate and copy editable recurrence rule fields from request JSON"""
+    if data.get('anchor_date'):
+        try:
+            rule.anchor_date = datetime.strptime(data['anchor_date'], '%Y-%m-%d').date()
+        except ValueError:
+            return 'Invalid anchor_date format. Use YYYY-MM-DD'
+    if 'until_date' in data:
+        try:
+            rule.until_date = datetime.strptime(data['until_date'], '%Y-%m-%d').date() if data['until_date'] else None
+        except ValueError:
+            return 'Invalid until_date format. Use YYYY-MM-DD'
+    if 'interval_days' in data:
+        if not isinstance(data['interval_days'], int) or data['interval_days'] <= 0:
+            return 'interval_days must be a positive integer'
+        rule.interval_days = data['interval_days']
+    if data.get('priority'):
+        try:
+            rule.priority = Priority(data['priority'])
+        except ValueError:
+            return f'Invalid priority: {data["priority"]}'
+    for field in ['assigned_technician', 'estimated_duration_minutes', 'is_active']:
+        if field in data:
+            setattr(rule, field, data[field])
+    return None
+
+@maintenance_bp.route('/maintenance/recurrence-rules', methods=['POST'])
+def create_recurrence_rule():
+    """Create a recurrence rule for an equipment x task pair"""
+    try:
+        data = request.get_json()
+        
+        required_fields = ['equipment_id', 'task_id', 'anchor_date']
+        for field in required_fields:
+            if field not in data:
+                return jsonify({'success': False, 'error': f'Missing required field: {field}'}), 400
+        
+        equipment = Equipment.query.get(data['equipment_id'])
+        task = MaintenanceTask.query.get(data['task_id'])
+        if not equipment:
+            return jsonify({'success': False, 'error': 'Equipment not found'}), 404
+        if not task:
+            return jsonify({'success': False, 'error': 'Maintenance task not found'}), 404
+        
+        if RecurrenceRule.query.filter_by(equipment_id=equipment.id, task_id=task.id).first():
+            return jsonify({'success': False, 'error': 'A recurrence rule already exists for this equipment and task'}), 409
+        
+        rule = RecurrenceRule(
+            studio_id=equipment.studio_id,
+            equipment_id=equipment.id,
+            task_id=task.id,
+            interval_days=task.frequency_days,
+            priority=Priority.HIGH if equipment.is_critical else Priority.MEDIUM,
+            estimated_duration_minutes=task.estimated_duration_minutes
+        )
+        error = _apply_rule_fields(rule, data)
+        if error:
+            return jsonify({'success': False, 'error': error}), 400
+        if not rule.interval_days:
+            return jsonify({'success': False, 'error': 'interval_days is required when the task has no frequency'}), 400
+        
+        db.session.add(rule)
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'data': rule.to_dict(),
+            'message': 'Recurrence rule created successfully'
+        }), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@maintenance_bp.route('/maintenance/recurrence-rules/<int:rule_id>', methods=['PUT'])
+def update_recurrence_rule(rule_id):
+    """Update a recurrence rule; future virtual occurrences follow immediately"""
+    try:
+        rule = RecurrenceRule.query.get_or_404(rule_id)
+        data = request.get_json()
+        
+        error = _apply_rule_fields(rule, data)
+        if error:
+            return jsonify({'success': False, 'error': error}), 400
+        
+        rule.updated_at = datetime.utcnow()
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'data': rule.to_dict(),
+            'message': 'Recurrence rule updated successfully'
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@maintenance_bp.route('/maintenance/recurrence-rules/<int:rule_id>/occurrences/<occurrence_date>', methods=['PUT'])
+def update_recurrence_occurrence(rule_id, occurrence_date):
+    """Start or edit work on a virtual occurrence, materializing its schedule row"""
+    try:
+        rule = RecurrenceRule.query.get_or_404(rule_id)
+        try:
+            day = datetime.strptime(occurrence_date, '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({'success': False, 'error': 'Invalid occurrence date format. Use YYYY-MM-DD'}), 400
+        
+        try:
+            schedule = materialize_occurrence(rule, day)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        # The regular schedule update applies the edit and commits both together
+        return update_maintenance_schedule(schedule.id)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+def _assignment_inputs(data):
+    """Technicians, horizon and start date for an assignments request body"""
+    technicians = parse_technicians(data.get('technicians'))
+    horizon_days = int(data.get('horizon_days', DEFAULT_HORIZON_DAYS))
+    if horizon_days < 1 or horizon_days > 90:
+        raise ValueError('horizon_days must be between 1 and 90')
+    return technicians, horizon_days, date.today()
+
+def _plan_from_request(data):
+    """Run the assignment solver for an assignments request body"""
+    technicians, horizon_days, start = _assignment_inputs(data)
+    
+    jobs, result = plan_assignments(
+        technicians,
+        start=start,
+        horizon_days=horizon_days,
+        studio_id=data.get('studio_id'),
+        keep_existing=bool(data.get('keep_existing', True)),
+        time_limit=min(float(data.get('time_limit', DEFAULT_TIME_LIMIT)), 10.0)
+    )
+    changes = describe_plan(jobs, technicians, result, start)
+    summary = {
+        'schedules': len(jobs),
+        'technicians': len(technicians),
+        'horizon_days': horizon_days,
+        'changes': len(changes),
+        'unassigned_schedule_ids': [jobs[j].id for j in result['unassigned']],
+        'greedy': result['greedy'],
+        'final': result['final'],
+        'elapsed_seconds': result['elapsed_seconds']
+    }
+    return changes, summary, plan_token(current_app.config['SECRET_KEY'], start, technicians, jobs, changes)
+
+@maintenance_bp.route('/maintenance/assignments/preview', methods=['POST'])
+def preview_technician_assignments():
+    """Preview balanced technician assignments for open maintenance work"""
+    try:
+        data = request.get_json() or {}
+        
+        try:
+            changes, summary, token = _plan_from_request(data)
+        except (ValueError, TypeError) as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        return jsonify({
+            'success': True,
+            'data': {'summary': summary, 'assignments': changes, 'plan_token': token},
+            'count': len(changes)
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@maintenance_bp.route('/maintenance/assignments/apply', methods=['POST'])
+def apply_technician_assignments():
+    """
+    Save a previewed assignment plan. The body repeats the preview request plus
+    its plan_token and assignments; the plan is rejected if the open work
+    changed since the preview.
+    """
+    try:
+        data = request.get_json() or {}
+        
+        try:
+            technicians, horizon_days, start = _assignment_inputs(data)
+            changes = data.get('assignments')
+            token = data.get('plan_token')
+            if not token or not isinstance(changes, list):
+                raise ValueError('plan_token and assignments from /maintenance/assignments/preview are required')
+        except (ValueError, TypeError) as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        jobs = load_open_jobs(start, horizon_days, data.get('studio_id'))
+        expected = plan_token(current_app.config['SECRET_KEY'], start, technicians, jobs, changes)
+        if not hmac.compare_digest(expected, str(token)):
+            return jsonify({
+                'success': False,
+                'error': 'Open maintenance work changed since the preview; preview the assignments again'
+            }), 409
+        
+        try:
+            changes = validate_changes(changes, jobs, technicians, start, horizon_days)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        applied = apply_assignments(changes, start, reschedule=bool(data.get('reschedule', False)))
+        summary = {'schedules': len(jobs), 'technicians': len(technicians), 'changes': len(changes), **applied}
+        
+        return jsonify({
+            'success': True,
+            'data': {'summary': summary, 'assignments': changes},
+            'message': f"{applied['assigned']} schedules assigned, {applied['rescheduled']} rescheduled"
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @maintenance_bp.route('/maintenance/schedules/overdue', methods=['GET'])
 def get_overdue_maintenance():
     """Get overdue maintenance schedules"""
@@ -435,6 +759,27 @@ def get_maintenance_history():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@maintenance_bp.route('/maintenance/history/bulk', methods=['POST'])
+def bulk_import_maintenance_history():
+    """Bulk import maintenance history records from a CSV or NDJSON body"""
+    try:
+        chunk_size = request.args.get('chunk_size', default=DEFAULT_CHUNK_SIZE, type=int)
+        dry_run = request.args.get('dry_run', 'false').lower() == 'true'
+        
+        try:
+            report = import_history(parse_import_records(request), chunk_size=chunk_size, dry_run=dry_run)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        return jsonify({
+            'success': True,
+            'data': report,
+            'message': f"{report['inserted']} maintenance history records imported, {report['failed']} rows rejected"
+        }), 201 if report['inserted'] else 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @maintenance_bp.route('/maintenance/stats', methods=['GET'])
 def get_maintenance_stats():
     """Get maintenance statistics"""
@@ -0,0 +1,216 @@
+"""
+Calendar view of maintenance schedules.
+
+Per-day or per-week buckets for a date range: counts by status and priority
+come from one GROUP BY over the bucket expression, and the first N schedules of
+every bucket from one ROW_NUMBER() window query. Future cycles of recurrence
+rules are merged in as virtual occurrences.
+
+Results are memoized per (range, filters) against a fingerprint of the
+schedules and rules in range, which doubles as the response ETag so month
+views can be revalidated cheaply.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+
+from sqlalchemy import select, func, case, and_
+from src.models.maintenance import db, Studio, Equipment, MaintenanceTask, MaintenanceSchedule, Priority
+from src.recurrence import RecurrenceRule, expand_virtual_occurrences
+
+GRANULARITIES = ('day', 'week')
+DEFAULT_ITEMS_PER_BUCKET = 3
+MAX_ITEMS_PER_BUCKET = 20
+MAX_RANGE_DAYS = 366
+CACHE_SIZE = 256
+
+PRIORITY_RANK = {Priority.CRITICAL: 0, Priority.HIGH: 1, Priority.MEDIUM: 2, Priority.LOW: 3}
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _bucket_expression(granularity):
+    """SQL expression mapping scheduled_date to its bucket start date"""
+    column = MaintenanceSchedule.__table__.c.scheduled_date
+    dialect = db.engine.dialect.name
+    if granularity == 'day':
+        return func.date(column)
+    if dialect == 'sqlite':
+        # Monday of the week: the coming Sunday (or today), minus six days
+        return func.date(column, 'weekday 0', '-6 days')
+    if dialect == 'postgresql':
+        return func.date(func.date_trunc('week', column))
+    if dialect in ('mysql', 'mariadb'):
+        return func.subdate(column, func.weekday(column))
+    raise NotImplementedError(f'Week buckets not supported for {dialect}')
+
+
+def bucket_start(day, granularity):
+    return day - timedelta(days=day.weekday()) if granularity == 'week' else day
+
+
+def _bucket_key(value):
+    return str(value)[:10]
+
+
+def _conditions(start, end, studio_id):
+    table = MaintenanceSchedule.__table__
+    conditions = [table.c.scheduled_date >= start, table.c.scheduled_date <= end]
+    if studio_id:
+        conditions.append(table.c.studio_id == studio_id)
+    return and_(*conditions)
+
+
+def calendar_fingerprint(start, end, studio_id=None, expand_recurring=True):
+    """Cheap hash that changes whenever anything shown in the range changes"""
+    table = MaintenanceSchedule.__table__
+    parts = list(db.session.execute(
+        select(func.count(), func.max(table.c.id), func.max(table.c.updated_at)).where(_conditions(start, end, studio_id))
+    ).one())
+    if expand_recurring:
+        rules = select(func.count(), func.max(RecurrenceRule.updated_at))
+        if studio_id:
+            rules = rules.where(RecurrenceRule.studio_id == studio_id)
+        parts.extend(db.session.execute(rules).one())
+    # is_overdue depends on today
+    parts.append(date.today())
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def build_calendar(start, end, studio_id=None, granularity='day', limit=DEFAULT_ITEMS_PER_BUCKET, expand_recurring=True):
+    """Bucketed counts and top items for [start, end]"""
+    table = MaintenanceSchedule.__table__
+    where = _conditions(start, end, studio_id)
+    bucket = _bucket_expression(granularity)
+
+    buckets = OrderedDict()
+    day = bucket_start(start, granularity)
+    step = timedelta(days=7 if granularity == 'week' else 1)
+    while day <= end:
+        buckets[day.isoformat()] = {
+            'start': day.isoformat(), 'total': 0, 'by_status': {}, 'by_priority': {}, 'items': []
+        }
+        day += step
+
+    def count(entry, status, priority, amount):
+        entry['total'] += amount
+        entry['by_status'][status] = entry['by_status'].get(status, 0) + amount
+        if priority:
+            entry['by_priority'][priority] = entry['by_priority'].get(priority, 0) + amount
+
+    # Counts per bucket x status x priority in one GROUP BY
+    grouped = db.session.execute(
+        select(bucket.label('bucket'), table.c.status, table.c.priority, func.count())
+        .where(where)
+        .group_by(bucket, table.c.status, table.c.priority)
+    )
+    for bucket_value, status, priority, amount in grouped:
+        entry = buckets.get(_bucket_key(bucket_value))
+        if entry is not None:
+            count(entry, status.value if status else None, priority.value if priority else None, amount)
+
+    # First N schedules per bucket, most urgent first
+    ranked = select(
+        table.c.id,
+        bucket.label('bucket'),
+        func.row_number().over(
+            partition_by=bucket,
+            order_by=(case(PRIORITY_RANK, value=table.c.priority, else_=len(PRIORITY_RANK)),
+                      table.c.scheduled_date, table.c.scheduled_time, table.c.id)
+        ).label('position')
+    ).where(where).subquery()
+
+    items = db.session.query(
+        MaintenanceSchedule, ranked.c.bucket, Studio.name, Equipment.name, MaintenanceTask.name
+    ).join(
+        ranked, ranked.c.id == MaintenanceSchedule.id
+    ).outerjoin(
+        Studio, Studio.id == MaintenanceSchedule.studio_id
+    ).outerjoin(
+        Equipment, Equipment.id == MaintenanceSchedule.equipment_id
+    ).outerjoin(
+        MaintenanceTask, MaintenanceTask.id == MaintenanceSchedule.task_id
+    ).filter(ranked.c.position <= limit).order_by(ranked.c.bucket, ranked.c.position)
+
+    for schedule, bucket_value, studio_name, equipment_name, task_name in items:
+        entry = buckets.get(_bucket_key(bucket_value))
+        if entry is None:
+            continue
+        entry['items'].append({
+            'id': schedule.id,
+            'virtual': False,
+            'scheduled_date': schedule.scheduled_date.isoformat(),
+            'scheduled_time': schedule.scheduled_time.strftime('%H:%M') if schedule.scheduled_time else None,
+            'status': schedule.status.value if schedule.status else None,
+            'priority': schedule.priority.value if schedule.priority else None,
+            'assigned_technician': schedule.assigned_technician,
+            'studio_name': studio_name,
+            'equipment_name': equipment_name,
+            'task_name': task_name,
+            'is_overdue': schedule.is_overdue()
+        })
+
+    if expand_recurring:
+        real_keys = set(db.session.execute(
+            select(table.c.equipment_id, table.c.task_id, table.c.scheduled_date).where(where)
+        ).all())
+        virtual = expand_virtual_occurrences(start, end, studio_id=studio_id, real_keys=real_keys)
+        rank = {priority.value: position for priority, position in PRIORITY_RANK.items()}
+        touched = set()
+        for occurrence in virtual:
+            key = bucket_start(date.fromisoformat(occurrence['scheduled_date']), granularity).isoformat()
+            entry = buckets.get(key)
+            if entry is None:
+                continue
+            count(entry, occurrence['status'], occurrence['priority'], 1)
+            entry['items'].append({
+                field: occurrence[field] for field in (
+                    'id', 'virtual', 'rule_id', 'scheduled_date', 'scheduled_time', 'status', 'priority',
+                    'assigned_technician', 'studio_name', 'equipment_name', 'task_name', 'is_overdue'
+                )
+            })
+            touched.add(key)
+        for key in touched:
+            items_list = buckets[key]['items']
+            items_list.sort(key=lambda item: (rank.get(item['priority'], len(rank)), item['scheduled_date'],
+                                              item['scheduled_time'] or '', item['id'] or 0))
+            del items_list[limit:]
+
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'granularity': granularity,
+        'studio_id': studio_id,
+        'items_per_bucket': limit,
+        'total': sum(entry['total'] for entry in buckets.values()),
+        'buckets': list(buckets.values())
+    }
+
+
+def get_calendar(start, end, studio_id=None, granularity='day', limit=DEFAULT_ITEMS_PER_BUCKET, expand_recurring=True):
+    """Memoized build_calendar; returns (calendar, etag)"""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f'Invalid granularity: {granularity}')
+    if end < start:
+        raise ValueError('end must not be before start')
+    if (end - start).days > MAX_RANGE_DAYS:
+        raise ValueError(f'Calendar range is limited to {MAX_RANGE_DAYS} days')
+    limit = max(0, min(int(limit), MAX_ITEMS_PER_BUCKET))
+
+    fingerprint = calendar_fingerprint(start, end, studio_id, expand_recurring)
+    key = (start, end, studio_id, granularity, limit, expand_recurring)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached and cached[0] == fingerprint:
+            _cache.move_to_end(key)
+            return cached[1], fingerprint
+
+    calendar = build_calendar(start, end, studio_id, granularity, limit, expand_recurring)
+    with _cache_lock:
+        _cache[key] = (fingerprint, calendar)
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return calendar, fingerprint
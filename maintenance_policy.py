@@ -0,0 +1,131 @@
+"""
+Fleet-wide maintenance interval policies.
+
+Changing the interval for a category or manufacturer used to mean loading and
+saving every device so calculate_next_maintenance() could run per object. Here
+the new policy and the recomputed next_maintenance (last maintenance plus the
+interval, the same rule create_equipment and bulk import apply) are written by
+one UPDATE statement in a single transaction.
+"""
+from datetime import datetime, date
+
+from sqlalchemy import update, select, func, case, and_, literal
+from src.models.maintenance import db, Equipment, EquipmentCategory
+
+
+def _flag(filters, field):
+    """A boolean filter value; only a real JSON boolean is accepted"""
+    value = filters.get(field)
+    if value is not None and not isinstance(value, bool):
+        raise ValueError(f'{field} must be true or false')
+    return value
+
+
+def _policy_conditions(filters):
+    """Translate a filter spec into WHERE conditions on the equipment table"""
+    if not isinstance(filters, dict):
+        raise ValueError('filters must be an object')
+    table = Equipment.__table__
+    conditions = []
+    flags = {field: _flag(filters, field) for field in ('is_critical', 'usage_based_maintenance', 'all', 'include_inactive')}
+
+    if filters.get('studio_id') is not None:
+        conditions.append(table.c.studio_id == int(filters['studio_id']))
+    if filters.get('category'):
+        try:
+            conditions.append(table.c.category == EquipmentCategory(filters['category']))
+        except ValueError:
+            raise ValueError(f"Invalid category: {filters['category']}")
+    if filters.get('manufacturer'):
+        conditions.append(func.lower(table.c.manufacturer) == filters['manufacturer'].lower())
+    if filters.get('model'):
+        conditions.append(func.lower(table.c.model) == filters['model'].lower())
+    if flags['is_critical'] is not None:
+        conditions.append(table.c.is_critical == flags['is_critical'])
+    if flags['usage_based_maintenance'] is not None:
+        conditions.append(table.c.usage_based_maintenance == flags['usage_based_maintenance'])
+
+    if not conditions and not flags['all']:
+        raise ValueError('Specify at least one filter, or "all": true to apply the policy fleet-wide')
+
+    if not flags['include_inactive']:
+        conditions.append(table.c.is_active.is_(True))
+    return conditions
+
+
+def _next_maintenance_expression(interval):
+    """SQL for last_maintenance + ``interval`` days in the bound engine's dialect"""
+    table = Equipment.__table__
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        return func.date(table.c.last_maintenance, func.printf('+%d days', interval))
+    if dialect == 'postgresql':
+        return table.c.last_maintenance + interval
+    if dialect in ('mysql', 'mariadb'):
+        return func.adddate(table.c.last_maintenance, interval)
+    raise NotImplementedError(f'Date arithmetic not supported for {dialect}')
+
+
+def apply_maintenance_policy(filters, maintenance_interval_days=None, usage_threshold_hours=None, dry_run=False):
+    """
+    Apply a policy to every matching device and recompute next_maintenance.
+
+    With ``dry_run`` the statement still runs, so the counts are exact, but the
+    transaction is rolled back. Returns the affected counts.
+    """
+    if maintenance_interval_days is not None and int(maintenance_interval_days) <= 0:
+        raise ValueError('maintenance_interval_days must be positive')
+    if usage_threshold_hours is not None and int(usage_threshold_hours) <= 0:
+        raise ValueError('usage_threshold_hours must be positive')
+
+    table = Equipment.__table__
+    conditions = _policy_conditions(filters)
+    where = and_(*conditions)
+
+    interval = literal(int(maintenance_interval_days)) if maintenance_interval_days is not None else table.c.maintenance_interval_days
+    values = {
+        # Devices never maintained have nothing to count from; leave their due date alone
+        'next_maintenance': case(
+            (table.c.last_maintenance.is_(None), table.c.next_maintenance),
+            else_=_next_maintenance_expression(interval)
+        ),
+        'updated_at': datetime.utcnow()
+    }
+    if maintenance_interval_days is not None:
+        values['maintenance_interval_days'] = int(maintenance_interval_days)
+    if usage_threshold_hours is not None:
+        values['usage_threshold_hours'] = int(usage_threshold_hours)
+
+    today = date.today()
+    try:
+        due_before = db.session.execute(
+            select(func.count()).select_from(table).where(where, table.c.next_maintenance <= today)
+        ).scalar()
+
+        matched = db.session.execute(update(table).where(where).values(**values)).rowcount
+
+        totals = db.session.execute(
+            select(
+                func.count(),
+                func.sum(case((table.c.last_maintenance.is_(None), 1), else_=0)),
+                func.sum(case((table.c.next_maintenance <= today, 1), else_=0))
+            ).select_from(table).where(where)
+        ).one()
+
+        if dry_run:
+            db.session.rollback()
+        else:
+            db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    without_history = int(totals[1] or 0)
+    return {
+        'matched': matched,
+        'rescheduled': matched - without_history,
+        'without_last_maintenance': without_history,
+        'due_before': due_before,
+        'due_after': int(totals[2] or 0),
+        'dry_run': dry_run
+    }
@@ -0,0 +1,341 @@
+"""
+Rule-based recurrence for maintenance schedules.
+
+A RecurrenceRule is stored once per equipment x task and describes every future
+cycle (anchor date plus a fixed interval). Range queries expand the rules
+lazily into virtual occurrences and merge them with real MaintenanceSchedule
+rows. A real row is only materialized when work on an occurrence is started or
+edited, or by the scheduler once the occurrence comes due (DUE_WINDOW_DAYS
+ahead), so due/overdue tracking and alerts always have a row to point at;
+RecurrenceOccurrence links it back to the rule so the occurrence is not
+expanded again. Forward-looking counts and lists beyond the due window merge
+virtual occurrences in with real rows.
+"""
+from collections import Counter
+from datetime import datetime, date, timedelta
+
+from sqlalchemy import or_, select
+from src.models.maintenance import db, Studio, Equipment, MaintenanceTask, MaintenanceSchedule, TaskStatus, Priority
+
+# Longest range a single query may expand
+MAX_EXPANSION_DAYS = 366
+# Occurrences are materialized this many days before they are due...
+DUE_WINDOW_DAYS = 7
+# ...and missed ones (e.g. while the scheduler was down) up to this far back
+MISSED_LOOKBACK_DAYS = 30
+
+
+class RecurrenceRule(db.Model):
+    __tablename__ = 'maintenance_recurrence_rules'
+    __table_args__ = (
+        db.UniqueConstraint('equipment_id', 'task_id', name='uq_recurrence_equipment_task'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    studio_id = db.Column(db.Integer, db.ForeignKey(f'{Studio.__tablename__}.id'), nullable=False, index=True)
+    equipment_id = db.Column(db.Integer, db.ForeignKey(f'{Equipment.__tablename__}.id'), nullable=False)
+    task_id = db.Column(db.Integer, db.ForeignKey(f'{MaintenanceTask.__tablename__}.id'), nullable=False)
+    anchor_date = db.Column(db.Date, nullable=False)
+    interval_days = db.Column(db.Integer, nullable=False)
+    until_date = db.Column(db.Date)
+    priority = db.Column(db.Enum(Priority), default=Priority.MEDIUM)
+    estimated_duration_minutes = db.Column(db.Integer)
+    assigned_technician = db.Column(db.String(100))
+    is_active = db.Column(db.Boolean, default=True, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def occurrence_dates(self, start, end):
+        """Occurrence dates of this rule falling within [start, end]"""
+        if self.interval_days <= 0:
+            return []
+        last = min(end, self.until_date) if self.until_date else end
+        first_index = max(0, -(-(start - self.anchor_date).days // self.interval_days))
+        current = self.anchor_date + timedelta(days=first_index * self.interval_days)
+        dates = []
+        while current <= last:
+            dates.append(current)
+            current += timedelta(days=self.interval_days)
+        return dates
+
+    def is_occurrence(self, day):
+        offset = (day - self.anchor_date).days
+        return offset >= 0 and offset % self.interval_days == 0 and (not self.until_date or day <= self.until_date)
+
+    def next_occurrence_after(self, day):
+        """First occurrence strictly after ``day``, or None once the rule has ended"""
+        if day < self.anchor_date:
+            candidate = self.anchor_date
+        else:
+            cycles = (day - self.anchor_date).days // self.interval_days + 1
+            candidate = self.anchor_date + timedelta(days=cycles * self.interval_days)
+        return candidate if not self.until_date or candidate <= self.until_date else None
+
+    def to_dict(self):
+        next_date = self.next_occurrence_after(date.today() - timedelta(days=1))
+        return {
+            'id': self.id,
+            'studio_id': self.studio_id,
+            'equipment_id': self.equipment_id,
+            'task_id': self.task_id,
+            'anchor_date': self.anchor_date.isoformat() if self.anchor_date else None,
+            'interval_days': self.interval_days,
+            'until_date': self.until_date.isoformat() if self.until_date else None,
+            'priority': self.priority.value if self.priority else None,
+            'estimated_duration_minutes': self.estimated_duration_minutes,
+            'assigned_technician': self.assigned_technician,
+            'is_active': self.is_active,
+            'next_occurrence': next_date.isoformat() if next_date else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+
+class RecurrenceOccurrence(db.Model):
+    """Links a materialized occurrence of a rule to its schedule row"""
+    __tablename__ = 'maintenance_recurrence_occurrences'
+    __table_args__ = (
+        db.UniqueConstraint('rule_id', 'occurrence_date', name='uq_recurrence_occurrence'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    rule_id = db.Column(db.Integer, db.ForeignKey('maintenance_recurrence_rules.id'), nullable=False)
+    occurrence_date = db.Column(db.Date, nullable=False)
+    schedule_id = db.Column(db.Integer, db.ForeignKey(f'{MaintenanceSchedule.__tablename__}.id'), nullable=False, unique=True)
+
+
+def rule_for_schedule(schedule):
+    """The rule a schedule row was materialized from, if any"""
+    link = RecurrenceOccurrence.query.filter_by(schedule_id=schedule.id).first()
+    return RecurrenceRule.query.get(link.rule_id) if link else None
+
+
+def ensure_rule(schedule, task, anchor_date=None):
+    """
+    Get or create the rule for the schedule's equipment x task, anchored at
+    ``anchor_date`` (default the schedule's date), and link the schedule to
+    it when it falls on an occurrence. The caller commits.
+    """
+    if not task.frequency_days:
+        return None
+    rule = RecurrenceRule.query.filter_by(equipment_id=schedule.equipment_id, task_id=schedule.task_id).first()
+    if rule is None:
+        rule = RecurrenceRule(
+            studio_id=schedule.studio_id,
+            equipment_id=schedule.equipment_id,
+            task_id=schedule.task_id,
+            anchor_date=anchor_date or schedule.scheduled_date,
+            interval_days=task.frequency_days,
+            priority=schedule.priority,
+            estimated_duration_minutes=schedule.estimated_duration_minutes,
+            assigned_technician=schedule.assigned_technician
+        )
+        db.session.add(rule)
+        db.session.flush()
+    elif not rule.is_active:
+        rule.is_active = True
+        rule.anchor_date = anchor_date or schedule.scheduled_date
+
+    if rule.is_occurrence(schedule.scheduled_date) and not RecurrenceOccurrence.query.filter_by(
+        rule_id=rule.id, occurrence_date=schedule.scheduled_date
+    ).first():
+        db.session.add(RecurrenceOccurrence(rule_id=rule.id, occurrence_date=schedule.scheduled_date, schedule_id=schedule.id))
+    return rule
+
+
+def materialize_occurrence(rule, occurrence_date):
+    """
+    Return the real schedule row for an occurrence, inserting it (and its
+    link) if this is the first time work on it is started or edited.
+    """
+    link = RecurrenceOccurrence.query.filter_by(rule_id=rule.id, occurrence_date=occurrence_date).first()
+    if link:
+        return MaintenanceSchedule.query.get(link.schedule_id)
+
+    if not rule.is_occurrence(occurrence_date):
+        raise ValueError(f'{occurrence_date.isoformat()} is not an occurrence of rule {rule.id}')
+
+    # Rows materialized before the rule existed are adopted instead of duplicated
+    schedule = MaintenanceSchedule.query.filter_by(
+        equipment_id=rule.equipment_id, task_id=rule.task_id, scheduled_date=occurrence_date
+    ).first()
+    if schedule is None:
+        schedule = MaintenanceSchedule(
+            studio_id=rule.studio_id,
+            equipment_id=rule.equipment_id,
+            task_id=rule.task_id,
+            scheduled_date=occurrence_date,
+            priority=rule.priority,
+            status=TaskStatus.SCHEDULED,
+            assigned_technician=rule.assigned_technician,
+            estimated_duration_minutes=rule.estimated_duration_minutes,
+            is_recurring=True,
+            next_occurrence=rule.next_occurrence_after(occurrence_date)
+        )
+        db.session.add(schedule)
+        db.session.flush()
+
+    db.session.add(RecurrenceOccurrence(rule_id=rule.id, occurrence_date=occurrence_date, schedule_id=schedule.id))
+    return schedule
+
+
+def expand_virtual_occurrences(start, end, studio_id=None, equipment_id=None, priority=None,
+                               assigned_technician=None, real_keys=None):
+    """
+    Virtual occurrences of active rules within [start, end] as schedule dicts.
+
+    Occurrences already materialized, or matching a real row in ``real_keys``
+    ((equipment_id, task_id, scheduled_date) tuples), are skipped.
+    """
+    if (end - start).days > MAX_EXPANSION_DAYS:
+        raise ValueError(f'Recurring schedules can be expanded over at most {MAX_EXPANSION_DAYS} days')
+
+    query = db.session.query(RecurrenceRule, Studio.name, Equipment.name, MaintenanceTask.name).join(
+        Studio, Studio.id == RecurrenceRule.studio_id
+    ).join(
+        Equipment, Equipment.id == RecurrenceRule.equipment_id
+    ).join(
+        MaintenanceTask, MaintenanceTask.id == RecurrenceRule.task_id
+    ).filter(
+        RecurrenceRule.is_active == True,
+        Equipment.is_active == True,
+        RecurrenceRule.anchor_date <= end,
+        or_(RecurrenceRule.until_date.is_(None), RecurrenceRule.until_date >= start)
+    )
+    if studio_id:
+        query = query.filter(RecurrenceRule.studio_id == studio_id)
+    if equipment_id:
+        query = query.filter(RecurrenceRule.equipment_id == equipment_id)
+    if priority:
+        query = query.filter(RecurrenceRule.priority == priority)
+    if assigned_technician:
+        query = query.filter(RecurrenceRule.assigned_technician.ilike(f'%{assigned_technician}%'))
+    rules = query.all()
+    if not rules:
+        return []
+
+    # One query for every materialized occurrence in range
+    materialized = {
+        (link.rule_id, link.occurrence_date) for link in db.session.query(
+            RecurrenceOccurrence.rule_id, RecurrenceOccurrence.occurrence_date
+        ).filter(
+            RecurrenceOccurrence.rule_id.in_(query.with_entities(RecurrenceRule.id).scalar_subquery()),
+            RecurrenceOccurrence.occurrence_date.between(start, end)
+        )
+    }
+    real_keys = real_keys or set()
+    today = date.today()
+
+    occurrences = []
+    for rule, studio_name, equipment_name, task_name in rules:
+        for occurrence_date in rule.occurrence_dates(start, end):
+            if (rule.id, occurrence_date) in materialized or (rule.equipment_id, rule.task_id, occurrence_date) in real_keys:
+                continue
+            occurrences.append({
+                'id': None,
+                'virtual': True,
+                'rule_id': rule.id,
+                'occurrence_date': occurrence_date.isoformat(),
+                'studio_id': rule.studio_id,
+                'equipment_id': rule.equipment_id,
+                'task_id': rule.task_id,
+                'scheduled_date': occurrence_date.isoformat(),
+                'scheduled_time': None,
+                'priority': rule.priority.value if rule.priority else None,
+                'status': TaskStatus.SCHEDULED.value,
+                'assigned_technician': rule.assigned_technician,
+                'estimated_duration_minutes': rule.estimated_duration_minutes,
+                'is_recurring': True,
+                'next_occurrence': (occurrence_date + timedelta(days=rule.interval_days)).isoformat(),
+                'studio_name': studio_name,
+                'equipment_name': equipment_name,
+                'task_name': task_name,
+                'is_overdue': occurrence_date < today
+            })
+    return occurrences
+
+
+def schedule_keys(start, end, studio_id=None):
+    """(equipment_id, task_id, scheduled_date) of every real schedule row in [start, end]"""
+    table = MaintenanceSchedule.__table__
+    query = select(table.c.equipment_id, table.c.task_id, table.c.scheduled_date).where(
+        table.c.scheduled_date >= start, table.c.scheduled_date <= end
+    )
+    if studio_id:
+        query = query.where(table.c.studio_id == studio_id)
+    return set(db.session.execute(query).all())
+
+
+def count_virtual_occurrences(start, end, studio_id=None):
+    """Virtual occurrences in [start, end] not covered by a real row, per studio_id"""
+    occurrences = expand_virtual_occurrences(start, end, studio_id=studio_id, real_keys=schedule_keys(start, end, studio_id))
+    return Counter(occurrence['studio_id'] for occurrence in occurrences)
+
+
+def _schedule_ids(start, end):
+    """{(equipment_id, task_id, scheduled_date): schedule id} for real rows in [start, end]"""
+    table = MaintenanceSchedule.__table__
+    rows = db.session.execute(
+        select(table.c.id, table.c.equipment_id, table.c.task_id, table.c.scheduled_date).where(
+            table.c.scheduled_date >= start, table.c.scheduled_date <= end
+        ).order_by(table.c.id.desc())
+    )
+    # Lowest id wins where duplicates exist
+    return {(row.equipment_id, row.task_id, row.scheduled_date): row.id for row in rows}
+
+
+def materialize_due_occurrences(today):
+    """
+    Materialize every virtual occurrence from MISSED_LOOKBACK_DAYS before
+    ``today`` through DUE_WINDOW_DAYS after it, set-based: existing rows in
+    the window are loaded once and adopted, missing rows and every link are
+    written with one executemany INSERT each. The caller commits; returns the
+    number of occurrences materialized.
+    """
+    start = today - timedelta(days=MISSED_LOOKBACK_DAYS)
+    end = today + timedelta(days=DUE_WINDOW_DAYS)
+    occurrences = expand_virtual_occurrences(start, end)
+    if not occurrences:
+        return 0
+    rules = {
+        rule.id: rule for rule in RecurrenceRule.query.filter(
+            RecurrenceRule.id.in_({occurrence['rule_id'] for occurrence in occurrences})
+        )
+    }
+
+    keys = []
+    for occurrence in occurrences:
+        rule = rules[occurrence['rule_id']]
+        keys.append((rule, date.fromisoformat(occurrence['occurrence_date'])))
+
+    existing = _schedule_ids(start, end)
+    # Rows materialized before the rule existed are adopted instead of duplicated
+    missing = [
+        {
+            'studio_id': rule.studio_id,
+            'equipment_id': rule.equipment_id,
+            'task_id': rule.task_id,
+            'scheduled_date': occurrence_date,
+            'priority': rule.priority,
+            'status': TaskStatus.SCHEDULED,
+            'assigned_technician': rule.assigned_technician,
+            'estimated_duration_minutes': rule.estimated_duration_minutes,
+            'is_recurring': True,
+            'next_occurrence': rule.next_occurrence_after(occurrence_date)
+        }
+        for rule, occurrence_date in keys
+        if (rule.equipment_id, rule.task_id, occurrence_date) not in existing
+    ]
+    if missing:
+        db.session.execute(MaintenanceSchedule.__table__.insert(), missing)
+        existing = _schedule_ids(start, end)
+
+    db.session.execute(RecurrenceOccurrence.__table__.insert(), [
+        {
+            'rule_id': rule.id,
+            'occurrence_date': occurrence_date,
+            'schedule_id': existing[(rule.equipment_id, rule.task_id, occurrence_date)]
+        }
+        for rule, occurrence_date in keys
+    ])
+    return len(keys)
@@ -0,0 +1,306 @@
+"""
+Persisted report results.
+
+Generated reports are stored as Report rows keyed by a hash of the report
+type, its parameters and the version of every source table it reads, plus the
+current date since overdue/upcoming figures depend on it. A table's version is
+a counter in report_source_versions that session events bump in the same
+transaction as any ORM flush or bulk statement writing to it, so a cache
+lookup reads a few primary-key rows instead of scanning the source tables. An
+identical request is served from the stored copy; any write to a source table
+changes the key, and the superseded copy for the same parameters is dropped
+when the report is next generated. Entries are evicted by age and by total
+stored size, least recently used first.
+
+Report extends the existing reports table; ensure_report_cache() adds the
+cache columns to an existing database and seeds the version rows.
+"""
+import os
+import json
+import hashlib
+import logging
+from datetime import datetime, date, timedelta
+
+from itertools import chain
+
+from sqlalchemy import event, inspect, select, update, insert, func, delete, or_, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from src.models.maintenance import db, Studio, Equipment, MaintenanceTask, MaintenanceSchedule, MaintenanceHistory, Alert
+
+logger = logging.getLogger(__name__)
+
+MAX_AGE_HOURS = 24
+MAX_TOTAL_BYTES = 64 * 1024 * 1024
+# Rows left 'generating' this long (e.g. by a restart) no longer count as in flight
+STALE_JOB_MINUTES = 30
+
+_EVICTED_FILES_KEY = 'report_cache_evicted_files'
+_TOUCHED_KEY = 'report_cache_touched_tables'
+
+# Tables each report type reads; a write to any of them invalidates it
+REPORT_SOURCES = {
+    'maintenance_summary': (Studio, Equipment, MaintenanceTask, MaintenanceSchedule, MaintenanceHistory, Alert),
+    'equipment_status': (Studio, Equipment, MaintenanceHistory),
+}
+
+SOURCE_TABLES = {model.__table__.name for models in REPORT_SOURCES.values() for model in models}
+
+REPORT_TITLES = {
+    'maintenance_summary': 'Maintenance Summary',
+    'equipment_status': 'Equipment Status',
+}
+
+
+class Report(db.Model):
+    __tablename__ = 'reports'
+
+    id = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String(200), nullable=False)
+    report_type = db.Column(db.String(50), nullable=False)
+    studio_id = db.Column(db.Integer, db.ForeignKey(f'{Studio.__tablename__}.id'))
+    generated_by = db.Column(db.String(100))
+
+    cache_key = db.Column(db.String(64), unique=True, index=True)
+    parameters_hash = db.Column(db.String(64), index=True)
+    parameters = db.Column(db.Text)
+    source_versions = db.Column(db.Text)
+    data = db.Column(db.Text)
+    data_size = db.Column(db.Integer, default=0)
+
+    generated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    status = db.Column(db.String(20), default='completed', nullable=False)  # generating, completed, failed
+    error_message = db.Column(db.Text)
+
+    file_path = db.Column(db.String(500))
+    file_format = db.Column(db.String(20))
+    file_size = db.Column(db.Integer)
+
+    access_count = db.Column(db.Integer, default=0)
+    last_accessed = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def get_report_data(self):
+        return json.loads(self.data) if self.data else None
+
+    def set_report_data(self, data):
+        self.data = json.dumps(data, default=str)
+        self.data_size = len(self.data)
+
+    def get_parameters_data(self):
+        return json.loads(self.parameters) if self.parameters else {}
+
+    def record_access(self):
+        self.access_count = (self.access_count or 0) + 1
+        self.last_accessed = datetime.utcnow()
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'title': self.title,
+            'report_type': self.report_type,
+            'studio_id': self.studio_id,
+            'generated_by': self.generated_by,
+            'parameters': self.get_parameters_data(),
+            'status': self.status,
+            'error_message': self.error_message,
+            'generated_at': self.generated_at.isoformat() if self.generated_at else None,
+            'data_size': self.data_size,
+            'file_format': self.file_format,
+            'file_size': self.file_size,
+            'access_count': self.access_count,
+            'last_accessed': self.last_accessed.isoformat() if self.last_accessed else None
+        }
+
+    @classmethod
+    def cleanup_old_reports(cls, max_age_hours=MAX_AGE_HOURS, max_total_bytes=MAX_TOTAL_BYTES):
+        """
+        Delete entries older than max_age_hours (unless None), then least
+        recently used ones until stored data and rendered files fit in
+        max_total_bytes. Rendered files are removed once the caller's
+        transaction commits, so a rollback never leaves rows without files.
+        """
+        now = datetime.utcnow()
+        cutoff = now - timedelta(hours=max_age_hours) if max_age_hours is not None else None
+        rows = db.session.execute(
+            select(
+                cls.id, func.coalesce(cls.data_size, 0) + func.coalesce(cls.file_size, 0), cls.file_path, cls.generated_at
+            ).where(
+                or_(cls.status != 'generating', cls.updated_at < now - timedelta(minutes=STALE_JOB_MINUTES))
+            ).order_by(func.coalesce(cls.last_accessed, cls.generated_at).desc())
+        ).all()
+
+        # Most recently used first; everything past the size budget goes
+        total, evicted = 0, []
+        for report_id, size, file_path, generated_at in rows:
+            total += size or 0
+            if (cutoff and generated_at < cutoff) or total > max_total_bytes:
+                evicted.append((report_id, file_path))
+        if not evicted:
+            return 0
+
+        db.session.execute(delete(cls).where(cls.id.in_([report_id for report_id, _ in evicted])))
+        db.session.info.setdefault(_EVICTED_FILES_KEY, []).extend(
+            file_path for _, file_path in evicted if file_path
+        )
+        return len(evicted)
+
+
+class ReportSourceVersion(db.Model):
+    """Write counter per report source table"""
+    __tablename__ = 'report_source_versions'
+
+    table_name = db.Column(db.String(100), primary_key=True)
+    version = db.Column(db.Integer, default=0, nullable=False)
+
+
+def ensure_report_cache():
+    """Add the cache columns and indexes to an existing reports table and seed the version rows"""
+    table = Report.__table__
+    with db.engine.begin() as connection:
+        existing = {column['name'] for column in inspect(connection).get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            logger.info(f"Adding {table.name}.{column.name}")
+            column_type = column.type.compile(dialect=connection.dialect)
+            connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+            # Rows from before the cache are finished reports
+            if column.name == 'status':
+                connection.execute(text(f"UPDATE {table.name} SET status = 'completed'"))
+            elif column.name == 'generated_at':
+                connection.execute(text(f"UPDATE {table.name} SET generated_at = CURRENT_TIMESTAMP"))
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+        versions = ReportSourceVersion.__table__
+        seeded = set(connection.execute(select(versions.c.table_name)).scalars())
+        missing = sorted(SOURCE_TABLES - seeded)
+        if missing:
+            connection.execute(insert(versions), [{'table_name': name, 'version': 0} for name in missing])
+
+
+def _digest(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def source_versions(report_type):
+    """Version counter of every source table (primary-key lookups) plus today's date"""
+    names = [model.__table__.name for model in REPORT_SOURCES[report_type]]
+    table = ReportSourceVersion.__table__
+    versions = dict(db.session.execute(
+        select(table.c.table_name, table.c.version).where(table.c.table_name.in_(names))
+    ).all())
+    return [versions.get(name, 0) for name in names] + [date.today().isoformat()]
+
+
+def report_parameters_hash(report_type, parameters):
+    return _digest({'report_type': report_type, 'parameters': parameters})
+
+
+def report_cache_key(parameters_hash, versions):
+    return _digest({'parameters_hash': parameters_hash, 'versions': versions})
+
+
+def get_cached_report(report_type, parameters, builder, refresh=False):
+    """
+    Return (report_data, cached) for ``report_type`` with ``parameters``,
+    calling ``builder()`` and storing its result on a miss.
+    """
+    parameters_hash = report_parameters_hash(report_type, parameters)
+    versions = source_versions(report_type)
+    cache_key = report_cache_key(parameters_hash, versions)
+
+    if not refresh:
+        report = Report.query.filter_by(cache_key=cache_key, status='completed').first()
+        if report:
+            report.record_access()
+            db.session.commit()
+            return report.get_report_data(), True
+
+    report_data = builder()
+
+    # Copies for the same parameters built from older table versions are stale
+    db.session.execute(delete(Report).where(
+        Report.report_type == report_type, Report.parameters_hash == parameters_hash
+    ))
+    report = Report(
+        title=REPORT_TITLES.get(report_type, report_type),
+        report_type=report_type,
+        studio_id=parameters.get('studio_id'),
+        cache_key=cache_key,
+        parameters_hash=parameters_hash,
+        parameters=json.dumps(parameters, default=str),
+        source_versions=json.dumps(versions),
+        status='completed',
+        file_format='json'
+    )
+    report.set_report_data(report_data)
+    db.session.add(report)
+    try:
+        # Expired entries are archived by the retention job; only enforce the size budget here
+        Report.cleanup_old_reports(max_age_hours=None)
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent request stored the same report first
+        db.session.rollback()
+    return report_data, False
+
+
+def _touch(session, table):
+    name = getattr(table, 'name', None)
+    if name in SOURCE_TABLES:
+        session.info.setdefault(_TOUCHED_KEY, set()).add(name)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_flushed_sources(session, flush_context):
+    for instance in chain(session.new, session.deleted):
+        _touch(session, getattr(instance, '__table__', None))
+    for instance in session.dirty:
+        if session.is_modified(instance, include_collections=False):
+            _touch(session, getattr(instance, '__table__', None))
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _collect_bulk_sources(orm_execute_state):
+    """Bulk DML isn't seen by the flush events"""
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _touch(orm_execute_state.session, getattr(orm_execute_state.statement, 'table', None))
+
+
+@event.listens_for(Session, 'before_commit')
+def _bump_source_versions(session):
+    """Bump the version of every source table written in this transaction, just before it commits"""
+    # Flush now so this commit's final flush is counted too
+    session.flush()
+    touched = sorted(session.info.pop(_TOUCHED_KEY, ()))
+    if not touched:
+        return
+    table = ReportSourceVersion.__table__
+    connection = session.connection()
+    # Sorted, so concurrent writers lock the rows in the same order
+    bumped = connection.execute(
+        update(table).where(table.c.table_name.in_(touched)).values(version=table.c.version + 1)
+    ).rowcount
+    if bumped < len(touched):
+        # Only before ensure_report_cache() has seeded the rows
+        seeded = set(connection.execute(select(table.c.table_name).where(table.c.table_name.in_(touched))).scalars())
+        connection.execute(insert(table), [{'table_name': name, 'version': 1} for name in touched if name not in seeded])
+
+
+@event.listens_for(Session, 'after_commit')
+def _remove_evicted_files(session):
+    for file_path in session.info.pop(_EVICTED_FILES_KEY, ()):
+        try:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        except OSError as e:
+            logger.warning(f"Could not remove evicted report file {file_path}: {str(e)}")
+
+
+@event.listens_for(Session, 'after_rollback')
+def _keep_evicted_files(session):
+    session.info.pop(_EVICTED_FILES_KEY, None)
+    session.info.pop(_TOUCHED_KEY, None)
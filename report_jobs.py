@@ -0,0 +1,131 @@
+"""
+Background report generation.
+
+A job is a Report row created with status 'generating' and handed to a small
+bounded thread pool; the worker renders the report inside an app context,
+writes it under REPORT_DIR and records file_path/file_size before marking the
+row completed (or failed, with the error). A request identical to one still
+generating (same type, format and parameters) gets the existing job back, and
+one whose source tables haven't changed since a completed job gets that job.
+"""
+import os
+import json
+import logging
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from src.models.maintenance import db
+from src.report_cache import (
+    Report, REPORT_TITLES, STALE_JOB_MINUTES, source_versions, report_parameters_hash, report_cache_key
+)
+
+logger = logging.getLogger(__name__)
+
+MAX_WORKERS = 2
+# Jobs queued or running in this process before new ones are refused
+MAX_PENDING_JOBS = 16
+REPORT_DIR = os.environ.get(
+    'REPORT_OUTPUT_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database', 'reports')
+)
+
+MIMETYPES = {'json': 'application/json', 'csv': 'text/csv', 'html': 'text/html'}
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='report-job')
+_lock = threading.Lock()
+_pending = set()
+
+
+class ReportQueueFull(Exception):
+    """Raised when MAX_PENDING_JOBS jobs are already queued or running"""
+
+
+def submit_report_job(app, report_type, file_format, parameters, render, generated_by=None):
+    """
+    Queue a report job; returns (report, deduplicated).
+
+    ``render(report_type, file_format, parameters)`` is called on a worker
+    thread inside an app context and returns the rendered bytes or an
+    iterable of byte chunks.
+    """
+    parameters = dict(parameters, format=file_format)
+    parameters_hash = report_parameters_hash(report_type, parameters)
+    cache_key = report_cache_key(parameters_hash, source_versions(report_type))
+
+    with _lock:
+        existing = Report.query.filter(
+            Report.report_type == report_type,
+            Report.parameters_hash == parameters_hash,
+            Report.status == 'generating',
+            Report.updated_at >= datetime.utcnow() - timedelta(minutes=STALE_JOB_MINUTES)
+        ).order_by(Report.id.desc()).first()
+        if existing is None:
+            existing = Report.query.filter_by(cache_key=cache_key, status='completed').first()
+            if existing and not (existing.file_path and os.path.exists(existing.file_path)):
+                existing = None
+        if existing:
+            return existing, True
+
+        if len(_pending) >= MAX_PENDING_JOBS:
+            raise ReportQueueFull(f'{MAX_PENDING_JOBS} report jobs are already pending; try again shortly')
+
+        # A failed or evicted job may still hold the key
+        Report.query.filter_by(cache_key=cache_key).update({'cache_key': None})
+        report = Report(
+            title=REPORT_TITLES.get(report_type, report_type),
+            report_type=report_type,
+            studio_id=parameters.get('studio_id'),
+            generated_by=generated_by,
+            cache_key=cache_key,
+            parameters_hash=parameters_hash,
+            parameters=json.dumps(parameters, default=str),
+            status='generating',
+            file_format=file_format
+        )
+        db.session.add(report)
+        db.session.commit()
+        _pending.add(report.id)
+
+    _executor.submit(_run_job, app, report.id, render)
+    return report, False
+
+
+def _run_job(app, report_id, render):
+    with app.app_context():
+        try:
+            report = Report.query.get(report_id)
+            content = render(report.report_type, report.file_format, report.get_parameters_data())
+            if isinstance(content, bytes):
+                content = [content]
+
+            # Streamed renders are written chunk by chunk
+            os.makedirs(REPORT_DIR, exist_ok=True)
+            file_path = os.path.join(REPORT_DIR, f'{report.report_type}_{report.id}.{report.file_format}')
+            file_size = 0
+            with open(file_path + '.tmp', 'wb') as f:
+                for chunk in content:
+                    f.write(chunk)
+                    file_size += len(chunk)
+            os.replace(file_path + '.tmp', file_path)
+
+            report.file_path = file_path
+            report.file_size = file_size
+            report.status = 'completed'
+            report.generated_at = datetime.utcnow()
+            db.session.commit()
+            logger.info(f"Report job {report_id} completed ({file_size} bytes)")
+        except Exception as e:
+            logger.error(f"Report job {report_id} failed: {str(e)}")
+            db.session.rollback()
+            report = Report.query.get(report_id)
+            if report:
+                report.status = 'failed'
+                report.error_message = str(e)
+                report.cache_key = None
+                db.session.commit()
+        finally:
+            with _lock:
+                _pending.discard(report_id)
+            db.session.remove()
+
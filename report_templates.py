@@ -0,0 +1,52 @@
+"""
+Jinja2 rendering for HTML reports and emailed digests.
+
+Templates live in templates/reports and are compiled once per process: the
+environment never re-checks the files (auto_reload off) and every template is
+loaded at import, so a request only pays for rendering. Pages are produced
+with Template.stream() in buffered chunks, so a large report renders in linear
+time and the first bytes can be sent before the last row is rendered. Values
+are HTML-escaped by autoescape.
+"""
+import os
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+# Template fragments joined into one chunk before it is yielded
+STREAM_BUFFER_SIZE = 64
+
+MAINTENANCE_SUMMARY = 'reports/maintenance_summary.html'
+MAINTENANCE_DIGEST = 'reports/maintenance_digest.html'
+# Rows per section kept in an emailed digest
+DIGEST_ITEM_LIMIT = 25
+
+environment = Environment(
+    loader=FileSystemLoader(TEMPLATE_DIR),
+    autoescape=select_autoescape(['html']),
+    auto_reload=False,
+    trim_blocks=True,
+    lstrip_blocks=True
+)
+
+# Compile every template, partials included, up front
+_templates = {name: environment.get_template(name) for name in environment.list_templates(extensions=['html'])}
+
+
+def stream_template(name, **context):
+    """Rendered template as a generator of UTF-8 chunks"""
+    stream = _templates[name].stream(**context)
+    stream.enable_buffering(STREAM_BUFFER_SIZE)
+    for chunk in stream:
+        yield chunk.encode('utf-8')
+
+
+def stream_maintenance_report(report_data):
+    return stream_template(MAINTENANCE_SUMMARY, report=report_data, info=report_data['report_info'])
+
+
+def render_maintenance_digest(report_data, report_url=None, item_limit=DIGEST_ITEM_LIMIT):
+    """Maintenance summary condensed into an HTML email body"""
+    return _templates[MAINTENANCE_DIGEST].render(
+        report=report_data, info=report_data['report_info'], report_url=report_url, item_limit=item_limit
+    )
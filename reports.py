@@ -1,16 +1,25 @@
-from flask import Blueprint, request, jsonify, make_response
+from flask import Blueprint, request, jsonify, current_app, send_file, Response, stream_with_context
 from src.models.maintenance import (
     db, Studio, Equipment, MaintenanceSchedule, MaintenanceHistory, 
     MaintenanceTask, Alert, EquipmentCategory, MaintenanceType, TaskStatus
 )
 from datetime import datetime, date, timedelta
-from sqlalchemy import func, and_, or_
+import os
+from sqlalchemy import select, func, and_, or_
 import json
 from io import StringIO
 import csv
+from src.report_cache import get_cached_report, Report
+from src.report_jobs import submit_report_job, ReportQueueFull, MIMETYPES
+from src.report_templates import stream_maintenance_report
+from src.recurrence import expand_virtual_occurrences, count_virtual_occurrences, schedule_keys
 
 reports_bp = Blueprint('reports', __name__)
 
+# Streamed CSV exports: rows per chunk sent to the client, and per database fetch
+CSV_FLUSH_ROWS = 500
+CSV_FETCH_ROWS = 1000
+
 @reports_bp.route('/reports/maintenance-summary', methods=['GET'])
 def generate_maintenance_summary():
     """Generate a comprehensive maintenance summary report"""
@@ -27,236 +36,15 @@ def generate_maintenance_summary():
         if not end_date:
             end_date = date.today().isoformat()
         
-        start = datetime.strptime(start_date, '%Y-%m-%d').date()
-        end = datetime.strptime(end_date, '%Y-%m-%d').date()
-        
-        # Build base queries
-        equipment_query = Equipment.query.filter(Equipment.is_active == True)
-        schedule_query = MaintenanceSchedule.query.filter(
-            and_(
-                MaintenanceSchedule.scheduled_date >= start,
-                MaintenanceSchedule.scheduled_date <= end
-            )
-        )
-        history_query = MaintenanceHistory.query.filter(
-            and_(
-                MaintenanceHistory.maintenance_date >= datetime.combine(start, datetime.min.time()),
-                MaintenanceHistory.maintenance_date <= datetime.combine(end, datetime.max.time())
-            )
-        )
-        
-        if studio_id:
-            equipment_query = equipment_query.filter(Equipment.studio_id == studio_id)
-            schedule_query = schedule_query.filter(MaintenanceSchedule.studio_id == studio_id)
-            history_query = history_query.join(Equipment).filter(Equipment.studio_id == studio_id)
-        
-        # Gather report data
-        report_data = {
-            'report_info': {
-                'generated_at': datetime.utcnow().isoformat(),
-                'period_start': start_date,
-                'period_end': end_date,
-                'studio_id': studio_id,
-                'studio_name': None
-            },
-            'summary': {},
-            'equipment_stats': {},
-            'maintenance_performance': {},
-            'upcoming_maintenance': [],
-            'overdue_maintenance': [],
-            'recent_completions': [],
-            'alerts_summary': {},
-            'recommendations': []
-        }
-        
-        # Studio information
-        if studio_id:
-            studio = Studio.query.get(studio_id)
-            if studio:
-                report_data['report_info']['studio_name'] = studio.name
-        
-        # Equipment statistics
-        total_equipment = equipment_query.count()
-        critical_equipment = equipment_query.filter(Equipment.is_critical == True).count()
+        refresh = request.args.get('refresh', 'false').lower() == 'true'
         
-        # Equipment by category
-        equipment_by_category = db.session.query(
-            Equipment.category,
-            func.count(Equipment.id).label('count')
-        ).filter(Equipment.is_active == True)
-        
-        if studio_id:
-            equipment_by_category = equipment_by_category.filter(Equipment.studio_id == studio_id)
-        
-        equipment_by_category = equipment_by_category.group_by(Equipment.category).all()
-        category_stats = {cat.value: count for cat, count in equipment_by_category}
-        
-        report_data['equipment_stats'] = {
-            'total_equipment': total_equipment,
-            'critical_equipment': critical_equipment,
-            'by_category': category_stats
-        }
-        
-        # Maintenance performance
-        scheduled_maintenance = schedule_query.count()
-        completed_maintenance = schedule_query.filter(MaintenanceSchedule.status == TaskStatus.COMPLETED).count()
-        overdue_count = schedule_query.filter(
-            and_(
-                MaintenanceSchedule.scheduled_date < date.today(),
-                MaintenanceSchedule.status == TaskStatus.SCHEDULED
-            )
-        ).count()
-        
-        completion_rate = (completed_maintenance / scheduled_maintenance * 100) if scheduled_maintenance > 0 else 0
-        
-        # Average completion time
-        avg_duration = db.session.query(
-            func.avg(MaintenanceSchedule.actual_duration_minutes)
-        ).filter(
-            and_(
-                MaintenanceSchedule.status == TaskStatus.COMPLETED,
-                MaintenanceSchedule.actual_duration_minutes.isnot(None),
-                MaintenanceSchedule.scheduled_date >= start,
-                MaintenanceSchedule.scheduled_date <= end
-            )
+        report_data, cached = get_cached_report(
+            'maintenance_summary',
+            {'studio_id': studio_id, 'start_date': start_date, 'end_date': end_date},
+            lambda: build_maintenance_summary(studio_id, start_date, end_date),
+            refresh=refresh
         )
         
-        if studio_id:
-            avg_duration = avg_duration.filter(MaintenanceSchedule.studio_id == studio_id)
-        
-        avg_duration = avg_duration.scalar() or 0
-        
-        report_data['maintenance_performance'] = {
-            'scheduled_tasks': scheduled_maintenance,
-            'completed_tasks': completed_maintenance,
-            'overdue_tasks': overdue_count,
-            'completion_rate': round(completion_rate, 2),
-            'avg_duration_minutes': round(avg_duration, 2)
-        }
-        
-        # Upcoming maintenance (next 30 days)
-        upcoming_cutoff = date.today() + timedelta(days=30)
-        upcoming_query = MaintenanceSchedule.query.filter(
-            and_(
-                MaintenanceSchedule.scheduled_date >= date.today(),
-                MaintenanceSchedule.scheduled_date <= upcoming_cutoff,
-                MaintenanceSchedule.status == TaskStatus.SCHEDULED
-            )
-        )
-        
-        if studio_id:
-            upcoming_query = upcoming_query.filter(MaintenanceSchedule.studio_id == studio_id)
-        
-        upcoming_schedules = upcoming_query.order_by(MaintenanceSchedule.scheduled_date).all()
-        
-        for schedule in upcoming_schedules:
-            report_data['upcoming_maintenance'].append({
-                'id': schedule.id,
-                'equipment_name': schedule.equipment.name,
-                'studio_name': schedule.studio.name,
-                'task_name': schedule.task.name,
-                'scheduled_date': schedule.scheduled_date.isoformat(),
-                'priority': schedule.priority.value,
-                'days_until': (schedule.scheduled_date - date.today()).days
-            })
-        
-        # Overdue maintenance
-        overdue_query = MaintenanceSchedule.query.filter(
-            and_(
-                MaintenanceSchedule.scheduled_date < date.today(),
-                MaintenanceSchedule.status == TaskStatus.SCHEDULED
-            )
-        )
-        
-        if studio_id:
-            overdue_query = overdue_query.filter(MaintenanceSchedule.studio_id == studio_id)
-        
-        overdue_schedules = overdue_query.order_by(MaintenanceSchedule.scheduled_date).all()
-        
-        for schedule in overdue_schedules:
-            report_data['overdue_maintenance'].append({
-                'id': schedule.id,
-                'equipment_name': schedule.equipment.name,
-                'studio_name': schedule.studio.name,
-                'task_name': schedule.task.name,
-                'scheduled_date': schedule.scheduled_date.isoformat(),
-                'priority': schedule.priority.value,
-                'days_overdue': (date.today() - schedule.scheduled_date).days
-            })
-        
-        # Recent completions
-        recent_completions = schedule_query.filter(
-            MaintenanceSchedule.status == TaskStatus.COMPLETED
-        ).order_by(MaintenanceSchedule.completed_date.desc()).limit(10).all()
-        
-        for schedule in recent_completions:
-            report_data['recent_completions'].append({
-                'id': schedule.id,
-                'equipment_name': schedule.equipment.name,
-                'studio_name': schedule.studio.name,
-                'task_name': schedule.task.name,
-                'completed_date': schedule.completed_date.isoformat() if schedule.completed_date else None,
-                'completed_by': schedule.completed_by,
-                'duration_minutes': schedule.actual_duration_minutes,
-                'cost': float(schedule.cost) if schedule.cost else None
-            })
-        
-        # Alerts summary
-        alert_query = Alert.query.filter(Alert.is_resolved == False)
-        if studio_id:
-            alert_query = alert_query.filter(Alert.studio_id == studio_id)
-        
-        total_alerts = alert_query.count()
-        critical_alerts = alert_query.filter(Alert.priority.in_(['high', 'critical'])).count()
-        
-        report_data['alerts_summary'] = {
-            'total_unresolved': total_alerts,
-            'critical_alerts': critical_alerts
-        }
-        
-        # Generate recommendations
-        recommendations = []
-        
-        if overdue_count > 0:
-            recommendations.append({
-                'type': 'urgent',
-                'title': 'Address Overdue Maintenance',
-                'description': f'{overdue_count} maintenance tasks are overdue and require immediate attention.'
-            })
-        
-        if completion_rate < 80:
-            recommendations.append({
-                'type': 'improvement',
-                'title': 'Improve Maintenance Completion Rate',
-                'description': f'Current completion rate is {completion_rate:.1f}%. Consider reviewing scheduling and resource allocation.'
-            })
-        
-        if critical_alerts > 0:
-            recommendations.append({
-                'type': 'urgent',
-                'title': 'Critical Alerts Require Attention',
-                'description': f'{critical_alerts} critical alerts need immediate resolution.'
-            })
-        
-        if len(upcoming_schedules) > 20:
-            recommendations.append({
-                'type': 'planning',
-                'title': 'Heavy Maintenance Schedule Ahead',
-                'description': f'{len(upcoming_schedules)} maintenance tasks scheduled in the next 30 days. Ensure adequate resources.'
-            })
-        
-        report_data['recommendations'] = recommendations
-        
-        # Summary statistics
-        report_data['summary'] = {
-            'total_equipment': total_equipment,
-            'maintenance_completion_rate': round(completion_rate, 2),
-            'overdue_tasks': overdue_count,
-            'upcoming_tasks': len(upcoming_schedules),
-            'critical_alerts': critical_alerts,
-            'avg_task_duration': round(avg_duration, 2)
-        }
-        
         # Return based on format
         if format_type == 'csv':
             return generate_csv_report(report_data)
@@ -265,217 +53,341 @@ def generate_maintenance_summary():
         else:
             return jsonify({
                 'success': True,
-                'data': report_data
+                'data': report_data,
+                'cached': cached
             })
             
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-def generate_csv_report(report_data):
-    """Generate CSV format report"""
-    output = StringIO()
-    writer = csv.writer(output)
+def build_maintenance_summary(studio_id, start_date, end_date):
+    """Collect the maintenance summary report data"""
+    start = datetime.strptime(start_date, '%Y-%m-%d').date()
+    end = datetime.strptime(end_date, '%Y-%m-%d').date()
+    
+    # Build base queries
+    equipment_query = Equipment.query.filter(Equipment.is_active == True)
+    schedule_query = MaintenanceSchedule.query.filter(
+        and_(
+            MaintenanceSchedule.scheduled_date >= start,
+            MaintenanceSchedule.scheduled_date <= end
+        )
+    )
+    history_query = MaintenanceHistory.query.filter(
+        and_(
+            MaintenanceHistory.maintenance_date >= datetime.combine(start, datetime.min.time()),
+            MaintenanceHistory.maintenance_date <= datetime.combine(end, datetime.max.time())
+        )
+    )
+    
+    if studio_id:
+        equipment_query = equipment_query.filter(Equipment.studio_id == studio_id)
+        schedule_query = schedule_query.filter(MaintenanceSchedule.studio_id == studio_id)
+        history_query = history_query.join(Equipment).filter(Equipment.studio_id == studio_id)
+    
+    # Gather report data
+    report_data = {
+        'report_info': {
+            'generated_at': datetime.utcnow().isoformat(),
+            'period_start': start_date,
+            'period_end': end_date,
+            'studio_id': studio_id,
+            'studio_name': None
+        },
+        'summary': {},
+        'equipment_stats': {},
+        'maintenance_performance': {},
+        'upcoming_maintenance': [],
+        'overdue_maintenance': [],
+        'recent_completions': [],
+        'alerts_summary': {},
+        'recommendations': []
+    }
+    
+    # Studio information
+    if studio_id:
+        studio = Studio.query.get(studio_id)
+        if studio:
+            report_data['report_info']['studio_name'] = studio.name
+    
+    # Equipment statistics
+    total_equipment = equipment_query.count()
+    critical_equipment = equipment_query.filter(Equipment.is_critical == True).count()
+    
+    # Equipment by category
+    equipment_by_category = db.session.query(
+        Equipment.category,
+        func.count(Equipment.id).label('count')
+    ).filter(Equipment.is_active == True)
+    
+    if studio_id:
+        equipment_by_category = equipment_by_category.filter(Equipment.studio_id == studio_id)
+    
+    equipment_by_category = equipment_by_category.group_by(Equipment.category).all()
+    category_stats = {cat.value: count for cat, count in equipment_by_category}
+    
+    report_data['equipment_stats'] = {
+        'total_equipment': total_equipment,
+        'critical_equipment': critical_equipment,
+        'by_category': category_stats
+    }
+    
+    # Maintenance performance
+    scheduled_maintenance = schedule_query.count()
+    completed_maintenance = schedule_query.filter(MaintenanceSchedule.status == TaskStatus.COMPLETED).count()
+    overdue_count = schedule_query.filter(
+        and_(
+            MaintenanceSchedule.scheduled_date < date.today(),
+            MaintenanceSchedule.status == TaskStatus.SCHEDULED
+        )
+    ).count()
+    
+    completion_rate = (completed_maintenance / scheduled_maintenance * 100) if scheduled_maintenance > 0 else 0
+    
+    # Average completion time
+    avg_duration = db.session.query(
+        func.avg(MaintenanceSchedule.actual_duration_minutes)
+    ).filter(
+        and_(
+            MaintenanceSchedule.status == TaskStatus.COMPLETED,
+            MaintenanceSchedule.actual_duration_minutes.isnot(None),
+            MaintenanceSchedule.scheduled_date >= start,
+            MaintenanceSchedule.scheduled_date <= end
+        )
+    )
     
+    if studio_id:
+        avg_duration = avg_duration.filter(MaintenanceSchedule.studio_id == studio_id)
+    
+    avg_duration = avg_duration.scalar() or 0
+    
+    report_data['maintenance_performance'] = {
+        'scheduled_tasks': scheduled_maintenance,
+        'completed_tasks': completed_maintenance,
+        'overdue_tasks': overdue_count,
+        'completion_rate': round(completion_rate, 2),
+        'avg_duration_minutes': round(avg_duration, 2)
+    }
+    
+    # Upcoming maintenance (next 30 days)
+    upcoming_cutoff = date.today() + timedelta(days=30)
+    upcoming_query = MaintenanceSchedule.query.filter(
+        and_(
+            MaintenanceSchedule.scheduled_date >= date.today(),
+            MaintenanceSchedule.scheduled_date <= upcoming_cutoff,
+            MaintenanceSchedule.status == TaskStatus.SCHEDULED
+        )
+    )
+    
+    if studio_id:
+        upcoming_query = upcoming_query.filter(MaintenanceSchedule.studio_id == studio_id)
+    
+    upcoming_schedules = upcoming_query.order_by(MaintenanceSchedule.scheduled_date).all()
+    
+    for schedule in upcoming_schedules:
+        report_data['upcoming_maintenance'].append({
+            'id': schedule.id,
+            'equipment_name': schedule.equipment.name,
+            'studio_name': schedule.studio.name,
+            'task_name': schedule.task.name,
+            'scheduled_date': schedule.scheduled_date.isoformat(),
+            'priority': schedule.priority.value,
+            'days_until': (schedule.scheduled_date - date.today()).days
+        })
+    
+    # Future cycles of recurrence rules that have no row yet
+    virtual_upcoming = expand_virtual_occurrences(
+        date.today(), upcoming_cutoff, studio_id=studio_id,
+        real_keys=schedule_keys(date.today(), upcoming_cutoff, studio_id)
+    )
+    for occurrence in virtual_upcoming:
+        report_data['upcoming_maintenance'].append({
+            'id': None,
+            'rule_id': occurrence['rule_id'],
+            'equipment_name': occurrence['equipment_name'],
+            'studio_name': occurrence['studio_name'],
+            'task_name': occurrence['task_name'],
+            'scheduled_date': occurrence['scheduled_date'],
+            'priority': occurrence['priority'],
+            'days_until': (date.fromisoformat(occurrence['scheduled_date']) - date.today()).days
+        })
+    if virtual_upcoming:
+        report_data['upcoming_maintenance'].sort(key=lambda item: item['scheduled_date'])
+    upcoming_count = len(report_data['upcoming_maintenance'])
+    
+    # Overdue maintenance
+    overdue_query = MaintenanceSchedule.query.filter(
+        and_(
+            MaintenanceSchedule.scheduled_date < date.today(),
+            MaintenanceSchedule.status == TaskStatus.SCHEDULED
+        )
+    )
+    
+    if studio_id:
+        overdue_query = overdue_query.filter(MaintenanceSchedule.studio_id == studio_id)
+    
+    overdue_schedules = overdue_query.order_by(MaintenanceSchedule.scheduled_date).all()
+    
+    for schedule in overdue_schedules:
+        report_data['overdue_maintenance'].append({
+            'id': schedule.id,
+            'equipment_name': schedule.equipment.name,
+            'studio_name': schedule.studio.name,
+            'task_name': schedule.task.name,
+            'scheduled_date': schedule.scheduled_date.isoformat(),
+            'priority': schedule.priority.value,
+            'days_overdue': (date.today() - schedule.scheduled_date).days
+        })
+    
+    # Recent completions
+    recent_completions = schedule_query.filter(
+        MaintenanceSchedule.status == TaskStatus.COMPLETED
+    ).order_by(MaintenanceSchedule.completed_date.desc()).limit(10).all()
+    
+    for schedule in recent_completions:
+        report_data['recent_completions'].append({
+            'id': schedule.id,
+            'equipment_name': schedule.equipment.name,
+            'studio_name': schedule.studio.name,
+            'task_name': schedule.task.name,
+            'completed_date': schedule.completed_date.isoformat() if schedule.completed_date else None,
+            'completed_by': schedule.completed_by,
+            'duration_minutes': schedule.actual_duration_minutes,
+            'cost': float(schedule.cost) if schedule.cost else None
+        })
+    
+    # Alerts summary
+    alert_query = Alert.query.filter(Alert.is_resolved == False)
+    if studio_id:
+        alert_query = alert_query.filter(Alert.studio_id == studio_id)
+    
+    total_alerts = alert_query.count()
+    critical_alerts = alert_query.filter(Alert.priority.in_(['high', 'critical'])).count()
+    
+    report_data['alerts_summary'] = {
+        'total_unresolved': total_alerts,
+        'critical_alerts': critical_alerts
+    }
+    
+    # Generate recommendations
+    recommendations = []
+    
+    if overdue_count > 0:
+        recommendations.append({
+            'type': 'urgent',
+            'title': 'Address Overdue Maintenance',
+            'description': f'{overdue_count} maintenance tasks are overdue and require immediate attention.'
+        })
+    
+    if completion_rate < 80:
+        recommendations.append({
+            'type': 'improvement',
+            'title': 'Improve Maintenance Completion Rate',
+            'description': f'Current completion rate is {completion_rate:.1f}%. Consider reviewing scheduling and resource allocation.'
+        })
+    
+    if critical_alerts > 0:
+        recommendations.append({
+            'type': 'urgent',
+            'title': 'Critical Alerts Require Attention',
+            'description': f'{critical_alerts} critical alerts need immediate resolution.'
+        })
+    
+    if upcoming_count > 20:
+        recommendations.append({
+            'type': 'planning',
+            'title': 'Heavy Maintenance Schedule Ahead',
+            'description': f'{upcoming_count} maintenance tasks scheduled in the next 30 days. Ensure adequate resources.'
+        })
+    
+    report_data['recommendations'] = recommendations
+    
+    # Summary statistics
+    report_data['summary'] = {
+        'total_equipment': total_equipment,
+        'maintenance_completion_rate': round(completion_rate, 2),
+        'overdue_tasks': overdue_count,
+        'upcoming_tasks': upcoming_count,
+        'critical_alerts': critical_alerts,
+        'avg_task_duration': round(avg_duration, 2)
+    }
+    
+    return report_data
+
+def _csv_stream(rows):
+    """Encode CSV rows incrementally, yielding a chunk every CSV_FLUSH_ROWS rows"""
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= CSV_FLUSH_ROWS:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if pending:
+        yield buffer.getvalue().encode('utf-8')
+
+def _csv_response(chunks, filename):
+    response = Response(chunks, mimetype='text/csv')
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    return response
+
+def maintenance_csv_rows(report_data):
+    """Rows of the maintenance summary CSV"""
     # Header
-    writer.writerow(['SoulCycle AV Maintenance Report'])
-    writer.writerow(['Generated:', report_data['report_info']['generated_at']])
-    writer.writerow(['Period:', f"{report_data['report_info']['period_start']} to {report_data['report_info']['period_end']}"])
-    writer.writerow([])
+    yield ['SoulCycle AV Maintenance Report']
+    yield ['Generated:', report_data['report_info']['generated_at']]
+    yield ['Period:', f"{report_data['report_info']['period_start']} to {report_data['report_info']['period_end']}"]
+    yield []
     
     # Summary
-    writer.writerow(['SUMMARY'])
+    yield ['SUMMARY']
     for key, value in report_data['summary'].items():
-        writer.writerow([key.replace('_', ' ').title(), value])
-    writer.writerow([])
+        yield [key.replace('_', ' ').title(), value]
+    yield []
     
     # Overdue Maintenance
     if report_data['overdue_maintenance']:
-        writer.writerow(['OVERDUE MAINTENANCE'])
-        writer.writerow(['Equipment', 'Studio', 'Task', 'Scheduled Date', 'Days Overdue', 'Priority'])
+        yield ['OVERDUE MAINTENANCE']
+        yield ['Equipment', 'Studio', 'Task', 'Scheduled Date', 'Days Overdue', 'Priority']
         for item in report_data['overdue_maintenance']:
-            writer.writerow([
+            yield [
                 item['equipment_name'],
                 item['studio_name'],
                 item['task_name'],
                 item['scheduled_date'],
                 item['days_overdue'],
                 item['priority']
-            ])
-        writer.writerow([])
+            ]
+        yield []
     
     # Upcoming Maintenance
     if report_data['upcoming_maintenance']:
-        writer.writerow(['UPCOMING MAINTENANCE (Next 30 Days)'])
-        writer.writerow(['Equipment', 'Studio', 'Task', 'Scheduled Date', 'Days Until', 'Priority'])
+        yield ['UPCOMING MAINTENANCE (Next 30 Days)']
+        yield ['Equipment', 'Studio', 'Task', 'Scheduled Date', 'Days Until', 'Priority']
         for item in report_data['upcoming_maintenance']:
-            writer.writerow([
+            yield [
                 item['equipment_name'],
                 item['studio_name'],
                 item['task_name'],
                 item['scheduled_date'],
                 item['days_until'],
                 item['priority']
-            ])
-    
-    response = make_response(output.getvalue())
-    response.headers['Content-Type'] = 'text/csv'
-    response.headers['Content-Disposition'] = f'attachment; filename=maintenance_report_{date.today().isoformat()}.csv'
-    return response
+            ]
+
+def generate_csv_report(report_data):
+    """Generate CSV format report"""
+    return _csv_response(
+        _csv_stream(maintenance_csv_rows(report_data)),
+        f'maintenance_report_{date.today().isoformat()}.csv'
+    )
 
 def generate_html_report(report_data):
-    """Generate HTML format report for printing"""
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>SoulCycle AV Maintenance Report</title>
-        <style>
-            body {{ font-family: Arial, sans-serif; margin: 20px; }}
-            .header {{ text-align: center; margin-bottom: 30px; }}
-            .logo {{ color: #f59e0b; font-size: 24px; font-weight: bold; }}
-            .summary {{ background: #f3f4f6; padding: 20px; border-radius: 8px; margin-bottom: 20px; }}
-            .section {{ margin-bottom: 30px; }}
-            .section h2 {{ color: #374151; border-bottom: 2px solid #e5e7eb; padding-bottom: 10px; }}
-            table {{ width: 100%; border-collapse: collapse; margin-bottom: 20px; }}
-            th, td {{ border: 1px solid #d1d5db; padding: 8px; text-align: left; }}
-            th {{ background-color: #f9fafb; font-weight: bold; }}
-            .urgent {{ color: #dc2626; font-weight: bold; }}
-            .warning {{ color: #d97706; }}
-            .success {{ color: #059669; }}
-            .recommendations {{ background: #fef3c7; padding: 15px; border-radius: 8px; }}
-            @media print {{
-                body {{ margin: 0; }}
-                .no-print {{ display: none; }}
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="header">
-            <div class="logo">SoulCycle AV Maintenance System</div>
-            <h1>Maintenance Report</h1>
-            <p>Generated: {report_data['report_info']['generated_at']}</p>
-            <p>Period: {report_data['report_info']['period_start']} to {report_data['report_info']['period_end']}</p>
-            {f"<p>Studio: {report_data['report_info']['studio_name']}</p>" if report_data['report_info']['studio_name'] else ""}
-        </div>
-        
-        <div class="summary">
-            <h2>Executive Summary</h2>
-            <div style="display: grid; grid-template-columns: repeat(3, 1fr); gap: 20px;">
-                <div>
-                    <strong>Total Equipment:</strong> {report_data['summary']['total_equipment']}<br>
-                    <strong>Completion Rate:</strong> {report_data['summary']['maintenance_completion_rate']}%
-                </div>
-                <div>
-                    <strong>Overdue Tasks:</strong> <span class="{'urgent' if report_data['summary']['overdue_tasks'] > 0 else 'success'}">{report_data['summary']['overdue_tasks']}</span><br>
-                    <strong>Upcoming Tasks:</strong> {report_data['summary']['upcoming_tasks']}
-                </div>
-                <div>
-                    <strong>Critical Alerts:</strong> <span class="{'urgent' if report_data['summary']['critical_alerts'] > 0 else 'success'}">{report_data['summary']['critical_alerts']}</span><br>
-                    <strong>Avg Task Duration:</strong> {report_data['summary']['avg_task_duration']} min
-                </div>
-            </div>
-        </div>
-    """
-    
-    # Overdue Maintenance Section
-    if report_data['overdue_maintenance']:
-        html_content += """
-        <div class="section">
-            <h2 class="urgent">⚠️ Overdue Maintenance (Immediate Action Required)</h2>
-            <table>
-                <tr>
-                    <th>Equipment</th>
-                    <th>Studio</th>
-                    <th>Task</th>
-                    <th>Scheduled Date</th>
-                    <th>Days Overdue</th>
-                    <th>Priority</th>
-                </tr>
-        """
-        for item in report_data['overdue_maintenance']:
-            html_content += f"""
-                <tr>
-                    <td>{item['equipment_name']}</td>
-                    <td>{item['studio_name']}</td>
-                    <td>{item['task_name']}</td>
-                    <td>{item['scheduled_date']}</td>
-                    <td class="urgent">{item['days_overdue']}</td>
-                    <td>{item['priority'].title()}</td>
-                </tr>
-            """
-        html_content += "</table></div>"
-    
-    # Upcoming Maintenance Section
-    if report_data['upcoming_maintenance']:
-        html_content += """
-        <div class="section">
-            <h2>📅 Upcoming Maintenance (Next 30 Days)</h2>
-            <table>
-                <tr>
-                    <th>Equipment</th>
-                    <th>Studio</th>
-                    <th>Task</th>
-                    <th>Scheduled Date</th>
-                    <th>Days Until</th>
-                    <th>Priority</th>
-                </tr>
-        """
-        for item in report_data['upcoming_maintenance']:
-            html_content += f"""
-                <tr>
-                    <td>{item['equipment_name']}</td>
-                    <td>{item['studio_name']}</td>
-                    <td>{item['task_name']}</td>
-                    <td>{item['scheduled_date']}</td>
-                    <td>{item['days_until']}</td>
-                    <td>{item['priority'].title()}</td>
-                </tr>
-            """
-        html_content += "</table></div>"
-    
-    # Equipment Statistics
-    html_content += f"""
-        <div class="section">
-            <h2>📊 Equipment Statistics</h2>
-            <p><strong>Total Equipment:</strong> {report_data['equipment_stats']['total_equipment']}</p>
-            <p><strong>Critical Equipment:</strong> {report_data['equipment_stats']['critical_equipment']}</p>
-            <h3>Equipment by Category:</h3>
-            <ul>
-    """
-    for category, count in report_data['equipment_stats']['by_category'].items():
-        html_content += f"<li>{category.replace('_', ' ').title()}: {count}</li>"
-    
-    html_content += "</ul></div>"
-    
-    # Recommendations
-    if report_data['recommendations']:
-        html_content += """
-        <div class="section">
-            <h2>💡 Recommendations</h2>
-            <div class="recommendations">
-        """
-        for rec in report_data['recommendations']:
-            icon = "🚨" if rec['type'] == 'urgent' else "📈" if rec['type'] == 'improvement' else "📋"
-            html_content += f"""
-                <div style="margin-bottom: 15px;">
-                    <strong>{icon} {rec['title']}</strong><br>
-                    {rec['description']}
-                </div>
-            """
-        html_content += "</div></div>"
-    
-    html_content += """
-        <div class="section" style="margin-top: 40px; text-align: center; color: #6b7280;">
-            <p>This report was automatically generated by the SoulCycle AV Maintenance System</p>
-            <p>For questions or support, contact your IT administrator</p>
-        </div>
-    </body>
-    </html>
-    """
-    
-    response = make_response(html_content)
-    response.headers['Content-Type'] = 'text/html'
-    return response
+    """Generate HTML format report for printing, streamed from the compiled template"""
+    return Response(stream_maintenance_report(report_data), mimetype='text/html')
 
 @reports_bp.route('/reports/equipment-status', methods=['GET'])
 def generate_equipment_status_report():
@@ -485,117 +397,306 @@ def generate_equipment_status_report():
         category = request.args.get('category')
         format_type = request.args.get('format', 'json')
         
-        query = Equipment.query.filter(Equipment.is_active == True)
-        
-        if studio_id:
-            query = query.filter(Equipment.studio_id == studio_id)
+        refresh = request.args.get('refresh', 'false').lower() == 'true'
         
-        if category:
-            try:
-                cat_enum = EquipmentCategory(category)
-                query = query.filter(Equipment.category == cat_enum)
-            except ValueError:
-                return jsonify({'success': False, 'error': f'Invalid category: {category}'}), 400
-        
-        equipment = query.all()
-        
-        report_data = {
-            'report_info': {
-                'generated_at': datetime.utcnow().isoformat(),
-                'studio_id': studio_id,
-                'category_filter': category
-            },
-            'equipment': []
-        }
-        
-        for eq in equipment:
-            # Calculate maintenance status
-            maintenance_status = 'up_to_date'
-            if eq.next_maintenance and eq.next_maintenance < date.today():
-                maintenance_status = 'overdue'
-            elif eq.next_maintenance and eq.next_maintenance <= date.today() + timedelta(days=30):
-                maintenance_status = 'due_soon'
-            
-            # Get recent maintenance history
-            recent_maintenance = MaintenanceHistory.query.filter_by(equipment_id=eq.id)\
-                .order_by(MaintenanceHistory.maintenance_date.desc()).first()
-            
-            equipment_data = {
-                'id': eq.id,
-                'name': eq.name,
-                'category': eq.category.value,
-                'manufacturer': eq.manufacturer,
-                'model': eq.model,
-                'serial_number': eq.serial_number,
-                'studio_name': eq.studio.name if eq.studio else None,
-                'location_in_studio': eq.location_in_studio,
-                'is_critical': eq.is_critical,
-                'operating_hours': eq.operating_hours,
-                'power_cycles': eq.power_cycles,
-                'last_maintenance': eq.last_maintenance.isoformat() if eq.last_maintenance else None,
-                'next_maintenance': eq.next_maintenance.isoformat() if eq.next_maintenance else None,
-                'maintenance_status': maintenance_status,
-                'failure_count': eq.failure_count,
-                'warranty_expiry': eq.warranty_expiry.isoformat() if eq.warranty_expiry else None,
-                'recent_maintenance': {
-                    'date': recent_maintenance.maintenance_date.isoformat() if recent_maintenance else None,
-                    'type': recent_maintenance.maintenance_type.value if recent_maintenance else None,
-                    'technician': recent_maintenance.technician if recent_maintenance else None
-                } if recent_maintenance else None
-            }
+        try:
+            if format_type == 'csv':
+                # Streamed straight from the database; validated before the first byte is sent
+                return generate_equipment_csv(studio_id, _equipment_category(category))
             
-            report_data['equipment'].append(equipment_data)
+            report_data, cached = get_cached_report(
+                'equipment_status',
+                {'studio_id': studio_id, 'category': category},
+                lambda: build_equipment_status_report(studio_id, category),
+                refresh=refresh
+            )
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         
-        if format_type == 'csv':
-            return generate_equipment_csv(report_data)
-        else:
-            return jsonify({
-                'success': True,
-                'data': report_data
-            })
+        return jsonify({
+            'success': True,
+            'data': report_data,
+            'cached': cached
+        })
             
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-def generate_equipment_csv(report_data):
-    """Generate CSV format equipment report"""
-    output = StringIO()
-    writer = csv.writer(output)
+def _equipment_category(category):
+    if not category:
+        return None
+    try:
+        return EquipmentCategory(category)
+    except ValueError:
+        raise ValueError(f'Invalid category: {category}')
+
+def _maintenance_status(next_maintenance, today):
+    if next_maintenance and next_maintenance < today:
+        return 'overdue'
+    if next_maintenance and next_maintenance <= today + timedelta(days=30):
+        return 'due_soon'
+    return 'up_to_date'
+
+def latest_history_subquery(*equipment_conditions):
+    """
+    Most recent history row per equipment (position == 1), ranked with
+    ROW_NUMBER() so it joins in the same statement instead of one query per
+    device. ``equipment_conditions`` narrow the window to the equipment in scope.
+    """
+    history = MaintenanceHistory.__table__
+    ranked = select(
+        history.c.equipment_id,
+        history.c.maintenance_date,
+        history.c.maintenance_type,
+        history.c.technician,
+        func.row_number().over(
+            partition_by=history.c.equipment_id,
+            order_by=(history.c.maintenance_date.desc(), history.c.id.desc())
+        ).label('position')
+    )
+    if equipment_conditions:
+        ranked = ranked.where(history.c.equipment_id.in_(select(Equipment.id).where(*equipment_conditions)))
+    return ranked.subquery('latest_history')
+
+def build_equipment_status_report(studio_id, category):
+    """Collect the equipment status report data"""
+    conditions = [Equipment.is_active == True]
+    
+    if studio_id:
+        conditions.append(Equipment.studio_id == studio_id)
+    
+    if category:
+        conditions.append(Equipment.category == _equipment_category(category))
+    
+    # Equipment, studio name and latest maintenance in one statement
+    latest = latest_history_subquery(*conditions)
+    rows = db.session.query(
+        Equipment, Studio.name, latest.c.maintenance_date, latest.c.maintenance_type, latest.c.technician
+    ).outerjoin(
+        Studio, Studio.id == Equipment.studio_id
+    ).outerjoin(
+        latest, and_(latest.c.equipment_id == Equipment.id, latest.c.position == 1)
+    ).filter(*conditions).order_by(Equipment.id).all()
+    
+    report_data = {
+        'report_info': {
+            'generated_at': datetime.utcnow().isoformat(),
+            'studio_id': studio_id,
+            'category_filter': category
+        },
+        'equipment': []
+    }
+    
+    today = date.today()
+    for eq, studio_name, recent_date, recent_type, recent_technician in rows:
+        # Calculate maintenance status
+        maintenance_status = _maintenance_status(eq.next_maintenance, today)
+        
+        equipment_data = {
+            'id': eq.id,
+            'name': eq.name,
+            'category': eq.category.value,
+            'manufacturer': eq.manufacturer,
+            'model': eq.model,
+            'serial_number': eq.serial_number,
+            'studio_name': studio_name,
+            'location_in_studio': eq.location_in_studio,
+            'is_critical': eq.is_critical,
+            'operating_hours': eq.operating_hours,
+            'power_cycles': eq.power_cycles,
+            'last_maintenance': eq.last_maintenance.isoformat() if eq.last_maintenance else None,
+            'next_maintenance': eq.next_maintenance.isoformat() if eq.next_maintenance else None,
+            'maintenance_status': maintenance_status,
+            'failure_count': eq.failure_count,
+            'warranty_expiry': eq.warranty_expiry.isoformat() if eq.warranty_expiry else None,
+            'recent_maintenance': {
+                'date': recent_date.isoformat(),
+                'type': recent_type.value if recent_type else None,
+                'technician': recent_technician
+            } if recent_date else None
+        }
+        
+        report_data['equipment'].append(equipment_data)
+    
+    return report_data
+
+def equipment_csv_rows(studio_id=None, category=None):
+    """Rows of the equipment status CSV, read from the database in CSV_FETCH_ROWS chunks"""
+    today = date.today()
     
     # Header
-    writer.writerow(['SoulCycle Equipment Status Report'])
-    writer.writerow(['Generated:', report_data['report_info']['generated_at']])
-    writer.writerow([])
+    yield ['SoulCycle Equipment Status Report']
+    yield ['Generated:', datetime.utcnow().isoformat()]
+    yield []
     
     # Equipment data
-    writer.writerow([
+    yield [
         'Equipment Name', 'Category', 'Manufacturer', 'Model', 'Serial Number',
         'Studio', 'Location', 'Critical', 'Operating Hours', 'Power Cycles',
         'Last Maintenance', 'Next Maintenance', 'Status', 'Failure Count'
-    ])
-    
-    for eq in report_data['equipment']:
-        writer.writerow([
-            eq['name'],
-            eq['category'],
-            eq['manufacturer'] or '',
-            eq['model'] or '',
-            eq['serial_number'] or '',
-            eq['studio_name'] or '',
-            eq['location_in_studio'] or '',
-            'Yes' if eq['is_critical'] else 'No',
-            eq['operating_hours'],
-            eq['power_cycles'],
-            eq['last_maintenance'] or '',
-            eq['next_maintenance'] or '',
-            eq['maintenance_status'].replace('_', ' ').title(),
-            eq['failure_count']
-        ])
-    
-    response = make_response(output.getvalue())
-    response.headers['Content-Type'] = 'text/csv'
-    response.headers['Content-Disposition'] = f'attachment; filename=equipment_status_{date.today().isoformat()}.csv'
-    return response
+    ]
+    
+    query = db.session.query(
+        Equipment.name, Equipment.category, Equipment.manufacturer, Equipment.model, Equipment.serial_number,
+        Studio.name, Equipment.location_in_studio, Equipment.is_critical, Equipment.operating_hours,
+        Equipment.power_cycles, Equipment.last_maintenance, Equipment.next_maintenance, Equipment.failure_count
+    ).outerjoin(Studio, Studio.id == Equipment.studio_id).filter(Equipment.is_active == True)
+    
+    if studio_id:
+        query = query.filter(Equipment.studio_id == studio_id)
+    if category:
+        query = query.filter(Equipment.category == category)
+    
+    for (name, eq_category, manufacturer, model, serial_number, studio_name, location, is_critical, operating_hours,
+         power_cycles, last_maintenance, next_maintenance, failure_count) in query.order_by(Equipment.id).yield_per(CSV_FETCH_ROWS):
+        yield [
+            name,
+            eq_category.value,
+            manufacturer or '',
+            model or '',
+            serial_number or '',
+            studio_name or '',
+            location or '',
+            'Yes' if is_critical else 'No',
+            operating_hours,
+            power_cycles,
+            last_maintenance.isoformat() if last_maintenance else '',
+            next_maintenance.isoformat() if next_maintenance else '',
+            _maintenance_status(next_maintenance, today).replace('_', ' ').title(),
+            failure_count
+        ]
+
+def generate_equipment_csv(studio_id=None, category=None):
+    """Generate CSV format equipment report, streamed in constant memory"""
+    return _csv_response(
+        stream_with_context(_csv_stream(equipment_csv_rows(studio_id, category))),
+        f'equipment_status_{date.today().isoformat()}.csv'
+    )
+
+# Formats each report type can be rendered to by a job
+JOB_FORMATS = {
+    'maintenance_summary': ('json', 'csv', 'html'),
+    'equipment_status': ('json', 'csv'),
+}
+
+def _job_parameters(report_type, data):
+    """Normalized job parameters; defaults are resolved now so duplicates match"""
+    studio_id = data.get('studio_id')
+    studio_id = int(studio_id) if studio_id else None
+    if report_type == 'maintenance_summary':
+        start_date = data.get('start_date') or (date.today() - timedelta(days=30)).isoformat()
+        end_date = data.get('end_date') or date.today().isoformat()
+        # Validate early rather than on the worker
+        datetime.strptime(start_date, '%Y-%m-%d')
+        datetime.strptime(end_date, '%Y-%m-%d')
+        return {'studio_id': studio_id, 'start_date': start_date, 'end_date': end_date}
+    category = data.get('category')
+    if category:
+        try:
+            EquipmentCategory(category)
+        except ValueError:
+            raise ValueError(f'Invalid category: {category}')
+    return {'studio_id': studio_id, 'category': category}
+
+def render_report(report_type, file_format, parameters):
+    """Render a report for a background job, as bytes or an iterable of byte chunks"""
+    if report_type == 'maintenance_summary':
+        report_data, _ = get_cached_report(
+            'maintenance_summary',
+            {key: parameters[key] for key in ('studio_id', 'start_date', 'end_date')},
+            lambda: build_maintenance_summary(parameters['studio_id'], parameters['start_date'], parameters['end_date'])
+        )
+        if file_format == 'csv':
+            return _csv_stream(maintenance_csv_rows(report_data))
+        if file_format == 'html':
+            return stream_maintenance_report(report_data)
+    else:
+        if file_format == 'csv':
+            return _csv_stream(equipment_csv_rows(parameters['studio_id'], _equipment_category(parameters['category'])))
+        report_data, _ = get_cached_report(
+            'equipment_status',
+            {key: parameters[key] for key in ('studio_id', 'category')},
+            lambda: build_equipment_status_report(parameters['studio_id'], parameters['category'])
+        )
+    return json.dumps(report_data, default=str).encode()
+
+def _job_dict(report):
+    job = report.to_dict()
+    job['download_url'] = f'/api/reports/jobs/{report.id}/download' if report.status == 'completed' else None
+    return job
+
+@reports_bp.route('/reports/jobs', methods=['POST'])
+def create_report_job():
+    """Queue a report for background generation"""
+    try:
+        data = request.get_json() or {}
+        report_type = data.get('report_type')
+        file_format = data.get('format', 'json')
+        
+        if report_type not in JOB_FORMATS:
+            return jsonify({'success': False, 'error': f'Invalid report type: {report_type}'}), 400
+        if file_format not in JOB_FORMATS[report_type]:
+            return jsonify({'success': False, 'error': f'Invalid format for {report_type}: {file_format}'}), 400
+        
+        try:
+            parameters = _job_parameters(report_type, data.get('parameters') or {})
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        try:
+            report, deduplicated = submit_report_job(
+                current_app._get_current_object(), report_type, file_format, parameters, render_report,
+                generated_by=data.get('generated_by')
+            )
+        except ReportQueueFull as e:
+            return jsonify({'success': False, 'error': str(e)}), 503
+        
+        return jsonify({
+            'success': True,
+            'data': _job_dict(report),
+            'deduplicated': deduplicated,
+            'message': 'Report job queued' if not deduplicated else 'Matching report job already exists'
+        }), 202 if report.status == 'generating' else 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@reports_bp.route('/reports/jobs/<int:report_id>', methods=['GET'])
+def get_report_job(report_id):
+    """Get the status of a report job"""
+    try:
+        report = Report.query.get_or_404(report_id)
+        
+        return jsonify({
+            'success': True,
+            'data': _job_dict(report)
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@reports_bp.route('/reports/jobs/<int:report_id>/download', methods=['GET'])
+def download_report_job(report_id):
+    """Download the rendered output of a completed report job"""
+    try:
+        report = Report.query.get_or_404(report_id)
+        
+        if report.status != 'completed':
+            return jsonify({'success': False, 'error': f'Report is {report.status}'}), 409
+        if not report.file_path or not os.path.exists(report.file_path):
+            return jsonify({'success': False, 'error': 'Report file is no longer available'}), 410
+        
+        report.record_access()
+        db.session.commit()
+        
+        return send_file(
+            report.file_path,
+            mimetype=MIMETYPES.get(report.file_format),
+            as_attachment=True,
+            download_name=f'{report.report_type}_{report.generated_at.date().isoformat()}.{report.file_format}'
+        )
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
 
 @reports_bp.route('/reports/monthly-summary', methods=['GET'])
 def generate_monthly_summary():
@@ -614,6 +715,11 @@ def generate_monthly_summary():
         # Get all studios for the summary
         studios = Studio.query.filter(Studio.is_active == True).all()
         
+        # Upcoming window (next month); future recurring cycles are counted from their rules
+        next_month_start = end_date + timedelta(days=1)
+        next_month_end = next_month_start + timedelta(days=30)
+        virtual_upcoming = count_virtual_occurrences(next_month_start, next_month_end)
+        
         monthly_data = {
             'report_info': {
                 'month': month,
@@ -648,9 +754,6 @@ def generate_monthly_summary():
             ).count()
             
             # Upcoming maintenance (next month)
-            next_month_start = end_date + timedelta(days=1)
-            next_month_end = next_month_start + timedelta(days=30)
-            
             upcoming_maintenance = MaintenanceSchedule.query.filter(
                 and_(
                     MaintenanceSchedule.studio_id == studio.id,
@@ -658,7 +761,7 @@ def generate_monthly_summary():
                     MaintenanceSchedule.scheduled_date <= next_month_end,
                     MaintenanceSchedule.status == TaskStatus.SCHEDULED
                 )
-            ).count()
+            ).count() + virtual_upcoming[studio.id]
             
             # Current overdue
             overdue_maintenance = MaintenanceSchedule.query.filter(
@@ -0,0 +1,37 @@
+from flask import Blueprint, request, jsonify, current_app
+from src.models.maintenance import db
+from src.data_retention import start_retention_run, retention_status, RetentionBusy, MAX_CHUNKS_PER_RUN
+
+retention_bp = Blueprint('retention', __name__)
+
+@retention_bp.route('/retention', methods=['GET'])
+def get_retention_status():
+    """Rows due for archival, the current or latest on-demand run, and totals from recent runs"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': retention_status()
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@retention_bp.route('/retention/run', methods=['POST'])
+def run_retention_now():
+    """Start archiving old resolved alerts and reports in the background; poll GET /retention"""
+    try:
+        max_chunks = request.args.get('max_chunks', default=MAX_CHUNKS_PER_RUN, type=int)
+        max_chunks = max(1, min(max_chunks, MAX_CHUNKS_PER_RUN))
+        
+        try:
+            status = start_retention_run(current_app._get_current_object(), max_chunks=max_chunks)
+        except RetentionBusy as e:
+            return jsonify({'success': False, 'error': str(e)}), 409
+        
+        return jsonify({
+            'success': True,
+            'data': status,
+            'message': 'Retention run started; GET /retention reports its progress'
+        }), 202
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
@@ -4,18 +4,51 @@ Scheduler system for automated maintenance alerts and tasks
 import schedule
 import time
 import threading
+from math import gcd
 from datetime import datetime, date, timedelta
 from src.models.maintenance import db, Alert, MaintenanceSchedule, Equipment, Studio, Priority, TaskStatus
 from sqlalchemy import and_
+from src.usage_forecast import forecast_usage_maintenance
+from src.usage_series import compact_usage_blocks
+from src.data_retention import run_retention, CHUNK_PAUSE_SECONDS
+from src.alert_severity import refresh_priority_scores, REFRESH_MINUTES
+from src.alert_escalation import escalate_overdue_alerts, dispatch_notifications, ESCALATION_MINUTES
+from src.recurrence import materialize_due_occurrences, count_virtual_occurrences, DUE_WINDOW_DAYS
 import logging
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class SystemClock:
+    """Wall-clock time source used in production"""
+    
+    def today(self):
+        return date.today()
+        
+    def now(self):
+        return datetime.utcnow()
+
+class SimulatedClock:
+    """Manually advanced time source for running months of jobs in seconds"""
+    
+    def __init__(self, start):
+        self.current = start
+        
+    def today(self):
+        return self.current.date()
+        
+    def now(self):
+        return self.current
+        
+    def advance(self, delta):
+        self.current += delta
+        return self.current
+
 class MaintenanceScheduler:
-    def __init__(self, app=None):
+    def __init__(self, app=None, clock=None):
         self.app = app
+        self.clock = clock or SystemClock()
         self.running = False
         self.scheduler_thread = None
         
@@ -48,12 +81,20 @@ class MaintenanceScheduler:
         schedule.every().monday.at("08:00").do(self.weekly_maintenance_summary)
         schedule.every().day.at("01:00").do(self.monthly_maintenance_report)  # Run daily but check if it's first of month
         schedule.every(6).hours.do(self.check_overdue_maintenance)
+        schedule.every().day.at("02:00").do(self.forecast_usage_maintenance)
+        schedule.every().day.at("03:00").do(self.archive_old_records)
+        schedule.every(REFRESH_MINUTES).minutes.do(self.refresh_alert_scores)
+        schedule.every(ESCALATION_MINUTES).minutes.do(self.escalate_overdue_alerts)
         
         logger.info("Scheduled jobs configured:")
         logger.info("- Daily maintenance check: 09:00")
         logger.info("- Weekly summary: Monday 08:00")
         logger.info("- Monthly report: 1st of each month")
         logger.info("- Overdue check: Every 6 hours")
+        logger.info("- Usage forecast: 02:00")
+        logger.info("- Retention archival: 03:00")
+        logger.info(f"- Alert severity refresh: Every {REFRESH_MINUTES} minutes")
+        logger.info(f"- Alert escalation: Every {ESCALATION_MINUTES} minutes")
         
         while self.running:
             try:
@@ -63,6 +104,51 @@ class MaintenanceScheduler:
                 logger.error(f"Scheduler error: {str(e)}")
                 time.sleep(60)
                 
+    def run_simulated(self, end, step=None, on_job=None):
+        """
+        Advance a SimulatedClock to ``end``, firing jobs on the same cadence as
+        _run_scheduler: daily and hourly jobs on the hour, the alert severity
+        refresh every REFRESH_MINUTES and escalation every ESCALATION_MINUTES.
+        ``step`` defaults to the largest step that lands on both and must
+        divide them; the clock should start on a multiple of it.
+        ``on_job(name, simulated_time, duration_seconds)`` is called after
+        every job run.
+        """
+        if not isinstance(self.clock, SimulatedClock):
+            raise RuntimeError("run_simulated requires a SimulatedClock")
+            
+        step = step or timedelta(minutes=gcd(REFRESH_MINUTES, ESCALATION_MINUTES))
+        if step <= timedelta(0) or any(timedelta(minutes=minutes) % step for minutes in (REFRESH_MINUTES, ESCALATION_MINUTES)):
+            raise ValueError(f"step must divide {REFRESH_MINUTES} and {ESCALATION_MINUTES} minutes")
+            
+        def every(minutes):
+            return lambda t: (t.hour * 60 + t.minute) % minutes == 0
+            
+        cadence = [
+            ('daily_maintenance_check', self.daily_maintenance_check, lambda t: t.hour == 9),
+            ('weekly_maintenance_summary', self.weekly_maintenance_summary, lambda t: t.weekday() == 0 and t.hour == 8),
+            ('monthly_maintenance_report', self.monthly_maintenance_report, lambda t: t.hour == 1),
+            ('check_overdue_maintenance', self.check_overdue_maintenance, lambda t: t.hour % 6 == 0),
+            ('forecast_usage_maintenance', self.forecast_usage_maintenance, lambda t: t.hour == 2),
+            ('archive_old_records', self.archive_old_records, lambda t: t.hour == 3)
+        ]
+        frequent = [
+            ('refresh_alert_scores', self.refresh_alert_scores, every(REFRESH_MINUTES)),
+            ('escalate_overdue_alerts', self.escalate_overdue_alerts, every(ESCALATION_MINUTES))
+        ]
+        
+        while self.clock.now() < end:
+            current = self.clock.advance(step)
+            if current.second or current.microsecond:
+                continue
+            due = frequent if current.minute else cadence + frequent
+            for name, job, is_due in due:
+                if is_due(current):
+                    started = time.perf_counter()
+                    job()
+                    if on_job:
+                        on_job(name, current, time.perf_counter() - started)
+                
     def daily_maintenance_check(self):
         """Daily check for upcoming maintenance"""
         if not self.app:
@@ -73,12 +159,17 @@ class MaintenanceScheduler:
             try:
                 logger.info("Running daily maintenance check")
                 
+                # Recurring cycles coming due get a real row to track and alert on
+                materialized = materialize_due_occurrences(self.clock.today())
+                if materialized:
+                    logger.info(f"Materialized {materialized} recurring maintenance occurrences")
+                
                 # Check for maintenance due in next 7 days
-                cutoff_date = date.today() + timedelta(days=7)
+                cutoff_date = self.clock.today() + timedelta(days=DUE_WINDOW_DAYS)
                 
                 upcoming_schedules = MaintenanceSchedule.query.filter(
                     and_(
-                        MaintenanceSchedule.scheduled_date >= date.today(),
+                        MaintenanceSchedule.scheduled_date >= self.clock.today(),
                         MaintenanceSchedule.scheduled_date <= cutoff_date,
                         MaintenanceSchedule.status == TaskStatus.SCHEDULED
                     )
@@ -97,12 +188,13 @@ class MaintenanceScheduler:
                     ).first()
                     
                     if not existing_alert:
-                        days_until = (schedule.scheduled_date - date.today()).days
+                        days_until = (schedule.scheduled_date - self.clock.today()).days
                         
                         # Create alert with appropriate priority
                         priority = Priority.HIGH if days_until <= 2 else Priority.MEDIUM
                         
                         alert = Alert(
+                            created_at=self.clock.now(),
                             studio_id=schedule.studio_id,
                             equipment_id=schedule.equipment_id,
                             schedule_id=schedule.id,
@@ -132,9 +224,12 @@ class MaintenanceScheduler:
             try:
                 logger.info("Checking for overdue maintenance")
                 
+                # Recurring cycles missed since the last daily check become overdue rows too
+                materialize_due_occurrences(self.clock.today())
+                
                 overdue_schedules = MaintenanceSchedule.query.filter(
                     and_(
-                        MaintenanceSchedule.scheduled_date < date.today(),
+                        MaintenanceSchedule.scheduled_date < self.clock.today(),
                         MaintenanceSchedule.status == TaskStatus.SCHEDULED
                     )
                 ).all()
@@ -152,7 +247,7 @@ class MaintenanceScheduler:
                     ).first()
                     
                     if not existing_alert:
-                        days_overdue = (date.today() - schedule.scheduled_date).days
+                        days_overdue = (self.clock.today() - schedule.scheduled_date).days
                         
                         # Escalate priority based on how overdue
                         if days_overdue > 14:
@@ -163,6 +258,7 @@ class MaintenanceScheduler:
                             priority = Priority.MEDIUM
                         
                         alert = Alert(
+                            created_at=self.clock.now(),
                             studio_id=schedule.studio_id,
                             equipment_id=schedule.equipment_id,
                             schedule_id=schedule.id,
@@ -200,7 +296,7 @@ class MaintenanceScheduler:
                     overdue_count = MaintenanceSchedule.query.filter(
                         and_(
                             MaintenanceSchedule.studio_id == studio.id,
-                            MaintenanceSchedule.scheduled_date < date.today(),
+                            MaintenanceSchedule.scheduled_date < self.clock.today(),
                             MaintenanceSchedule.status == TaskStatus.SCHEDULED
                         )
                     ).count()
@@ -209,8 +305,8 @@ class MaintenanceScheduler:
                     upcoming_count = MaintenanceSchedule.query.filter(
                         and_(
                             MaintenanceSchedule.studio_id == studio.id,
-                            MaintenanceSchedule.scheduled_date >= date.today(),
-                            MaintenanceSchedule.scheduled_date <= date.today() + timedelta(days=7),
+                            MaintenanceSchedule.scheduled_date >= self.clock.today(),
+                            MaintenanceSchedule.scheduled_date <= self.clock.today() + timedelta(days=7),
                             MaintenanceSchedule.status == TaskStatus.SCHEDULED
                         )
                     ).count()
@@ -227,6 +323,7 @@ class MaintenanceScheduler:
                         message += "\nPlease review and schedule accordingly."
                         
                         alert = Alert(
+                            created_at=self.clock.now(),
                             studio_id=studio.id,
                             alert_type='weekly_summary',
                             priority=priority,
@@ -246,7 +343,7 @@ class MaintenanceScheduler:
     def monthly_maintenance_report(self):
         """Generate monthly maintenance report alerts"""
         # Only run on the first day of the month
-        if date.today().day != 1:
+        if self.clock.today().day != 1:
             return
             
         if not self.app:
@@ -258,7 +355,7 @@ class MaintenanceScheduler:
                 logger.info("Generating monthly maintenance report")
                 
                 # Get last month's data
-                today = date.today()
+                today = self.clock.today()
                 if today.month == 1:
                     last_month = 12
                     last_year = today.year - 1
@@ -311,6 +408,7 @@ class MaintenanceScheduler:
                             MaintenanceSchedule.status == TaskStatus.SCHEDULED
                         )
                     ).count()
+                    upcoming_count += count_virtual_occurrences(next_month_start, next_month_end, studio.id)[studio.id]
                     
                     # Create monthly report alert
                     month_name = start_date.strftime('%B %Y')
@@ -332,6 +430,7 @@ class MaintenanceScheduler:
                         priority = Priority.HIGH
                     
                     alert = Alert(
+                        created_at=self.clock.now(),
                         studio_id=studio.id,
                         alert_type='monthly_report',
                         priority=priority,
@@ -348,6 +447,101 @@ class MaintenanceScheduler:
                 logger.error(f"Error in monthly maintenance report: {str(e)}")
                 db.session.rollback()
                 
+    def forecast_usage_maintenance(self):
+        """Nightly usage series compaction and forecast of usage-based maintenance due dates"""
+        if not self.app:
+            logger.error("Flask app not initialized")
+            return
+            
+        with self.app.app_context():
+            try:
+                logger.info("Running usage maintenance forecast")
+                
+                # Fold the day's appended segments first so the forecast reads one row per block
+                compacted = compact_usage_blocks()
+                if compacted:
+                    logger.info(f"Compacted {compacted} usage series blocks")
+                
+                summary = forecast_usage_maintenance(today=self.clock.today())
+                
+                logger.info(
+                    f"Usage forecast completed: {summary['forecast']} of {summary['devices']} devices forecast, "
+                    f"{summary['updated']} due dates updated in {summary['elapsed_seconds']}s"
+                )
+                
+            except Exception as e:
+                logger.error(f"Error in usage maintenance forecast: {str(e)}")
+                db.session.rollback()
+                
+    def archive_old_records(self):
+        """Nightly archival of old resolved alerts and reports, in throttled chunks"""
+        if not self.app:
+            logger.error("Flask app not initialized")
+            return
+            
+        with self.app.app_context():
+            try:
+                logger.info("Running retention archival")
+                
+                # Simulated runs skip the pause between chunks
+                pause = 0 if isinstance(self.clock, SimulatedClock) else CHUNK_PAUSE_SECONDS
+                run = run_retention(now=self.clock.now(), pause=pause)
+                
+                logger.info(
+                    f"Retention archival completed: {run['rows']} rows archived, "
+                    f"{run['freed_database_bytes']} database bytes freed in {run['elapsed_seconds']}s"
+                    + ("" if run['complete'] else " (backlog remains for the next run)")
+                )
+                
+            except Exception as e:
+                logger.error(f"Error in retention archival: {str(e)}")
+                db.session.rollback()
+                
+    def refresh_alert_scores(self):
+        """Advance the age component of priority_score for recent alerts"""
+        if not self.app:
+            logger.error("Flask app not initialized")
+            return
+            
+        with self.app.app_context():
+            try:
+                updated = refresh_priority_scores(now=self.clock.now())
+                db.session.commit()
+                logger.info(f"Alert severity refresh completed: {updated} alerts rescored")
+                
+            except Exception as e:
+                logger.error(f"Error in alert severity refresh: {str(e)}")
+                db.session.rollback()
+                
+    def escalate_overdue_alerts(self):
+        """Escalate alerts past their response time, then send queued notifications"""
+        if not self.app:
+            logger.error("Flask app not initialized")
+            return
+            
+        with self.app.app_context():
+            try:
+                summary = escalate_overdue_alerts(now=self.clock.now())
+                db.session.commit()
+                
+                sent = 0
+                while True:
+                    batch = dispatch_notifications(now=self.clock.now())
+                    db.session.commit()
+                    if not batch:
+                        break
+                    sent += batch
+                
+                if summary['total'] or sent:
+                    logger.info(
+                        f"Alert escalation completed: {summary['total']} alerts escalated "
+                        f"{summary['escalated']}, {sent} notifications sent"
+                    )
+                
+            except Exception as e:
+                logger.error(f"Error in alert escalation: {str(e)}")
+                db.session.rollback()
+                
     def check_warranty_expiration(self):
         """Check for equipment with expiring warranties"""
         if not self.app:
@@ -359,14 +553,14 @@ class MaintenanceScheduler:
                 logger.info("Checking warranty expiration")
                 
                 # Check for warranties expiring in next 90 days
-                cutoff_date = date.today() + timedelta(days=90)
+                cutoff_date = self.clock.today() + timedelta(days=90)
                 
                 expiring_equipment = Equipment.query.filter(
                     and_(
                         Equipment.is_active == True,
                         Equipment.warranty_expiry.isnot(None),
                         Equipment.warranty_expiry <= cutoff_date,
-                        Equipment.warranty_expiry >= date.today()
+                        Equipment.warranty_expiry >= self.clock.today()
                     )
                 ).all()
                 
@@ -381,11 +575,12 @@ class MaintenanceScheduler:
                     ).first()
                     
                     if not existing_alert:
-                        days_until_expiry = (equipment.warranty_expiry - date.today()).days
+                        days_until_expiry = (equipment.warranty_expiry - self.clock.today()).days
                         
                         priority = Priority.HIGH if days_until_expiry <= 30 else Priority.MEDIUM
                         
                         alert = Alert(
+                            created_at=self.clock.now(),
                             studio_id=equipment.studio_id,
                             equipment_id=equipment.id,
                             alert_type='warranty_expiring',
@@ -0,0 +1,50 @@
+from flask import Blueprint, request, jsonify
+from src.models.maintenance import db
+from src.search_index import search, is_available, rebuild_search_index
+
+search_bp = Blueprint('search', __name__)
+
+@search_bp.route('/search', methods=['GET'])
+def search_all():
+    """Full-text search across studios, equipment, tasks, schedules, history and alerts"""
+    try:
+        query = (request.args.get('q') or '').strip()
+        entity_type = request.args.get('type')
+        studio_id = request.args.get('studio_id', type=int)
+        limit = request.args.get('limit', default=20, type=int)
+        offset = request.args.get('offset', default=0, type=int)
+        
+        if not query:
+            return jsonify({'success': False, 'error': 'Missing search query: q'}), 400
+        if not is_available():
+            return jsonify({'success': False, 'error': 'Full-text search requires the SQLite database'}), 501
+        
+        try:
+            results = search(query, entity_type=entity_type, studio_id=studio_id, limit=limit, offset=offset)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        return jsonify({
+            'success': True,
+            'data': results,
+            'count': len(results['results'])
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@search_bp.route('/search/rebuild', methods=['POST'])
+def rebuild_search():
+    """Rebuild the full-text search index from the source tables"""
+    try:
+        if not is_available():
+            return jsonify({'success': False, 'error': 'Full-text search requires the SQLite database'}), 501
+        
+        rebuild_search_index()
+        
+        return jsonify({
+            'success': True,
+            'message': 'Search index rebuilt successfully'
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
@@ -0,0 +1,241 @@
+"""
+Full-text search over studios, equipment, tasks, schedules, history and alerts.
+
+Everything searchable lives in one SQLite FTS5 table using the trigram
+tokenizer, so substring queries ("QSC", "K2.8", "mic rec") are served from the
+index instead of ilike scans. Triggers on each source table keep it in sync;
+rows are keyed by rowid = entity id * 8 + entity code so updates and deletes
+touch exactly one index row. Results are ranked with BM25 (title matches weigh
+more than body matches) and carry entity-type facets and highlighted snippets.
+
+Indexed columns are taken from the models' actual tables, so free-text columns
+that a deployment doesn't have are simply skipped. At startup the index is
+rebuilt when its definition changed, when any of its triggers has gone
+missing (dropping a source table drops them, so writes since then were never
+indexed), or when its row count or highest id per entity type no longer
+matches the source tables.
+"""
+import html
+import hashlib
+import logging
+
+from sqlalchemy import text
+from src.models.maintenance import db, Studio, Equipment, MaintenanceTask, MaintenanceSchedule, MaintenanceHistory, Alert
+
+logger = logging.getLogger(__name__)
+
+INDEX_TABLE = 'search_index'
+META_TABLE = 'search_index_meta'
+MIN_TERM_LENGTH = 3
+MAX_RESULTS = 100
+
+# Marker characters survive snippet() and are swapped for <mark> after escaping
+_MARK_OPEN, _MARK_CLOSE = '\x02', '\x03'
+
+# entity type -> (code, model, title column, body candidates, studio expression)
+ENTITIES = {
+    'studio': (1, Studio, 'name', ('location', 'city', 'state', 'manager_name', 'notes'), 'NEW.id'),
+    'equipment': (2, Equipment, 'name', ('manufacturer', 'model', 'serial_number', 'location_in_studio', 'notes'),
+                  'NEW.studio_id'),
+    'task': (3, MaintenanceTask, 'name', ('description', 'safety_requirements', 'notes'), 'NULL'),
+    'schedule': (4, MaintenanceSchedule, 'assigned_technician',
+                 ('notes', 'completion_notes', 'technician_notes', 'completed_by'), 'NEW.studio_id'),
+    'history': (5, MaintenanceHistory, 'technician',
+                ('description', 'notes', 'completion_notes', 'technician_notes', 'issues_found', 'work_performed'),
+                'NULL'),
+    'alert': (6, Alert, 'title', ('message', 'resolution_notes'), 'NEW.studio_id'),
+}
+
+
+def is_available():
+    return db.engine.dialect.name == 'sqlite'
+
+
+def _entity_sql(entity_type, prefix):
+    """(table, watched columns, title SQL, body SQL, studio SQL) for one entity"""
+    code, model, title, candidates, studio = ENTITIES[entity_type]
+    table = model.__table__
+    columns = [name for name in candidates if name in table.c]
+    body = " || ' ' || ".join(f"coalesce({prefix}.{name}, '')" for name in columns) or "''"
+    if entity_type == 'history' and 'equipment_id' in table.c:
+        # History rows belong to a studio through their equipment
+        studio = f'(SELECT studio_id FROM {Equipment.__tablename__} WHERE id = NEW.equipment_id)'
+    # The studio facet follows these keys, so changing one re-indexes the row too
+    keys = [name for name in ('studio_id', 'equipment_id') if name in table.c]
+    return table.name, [title] + columns + keys, f"coalesce({prefix}.{title}, '')", body, studio.replace('NEW', prefix)
+
+
+def _history_studio_trigger():
+    """
+    Moving equipment to another studio moves its history rows' studio facet.
+    Returns (name, statement), or None when history isn't keyed by equipment.
+    """
+    history = MaintenanceHistory.__table__
+    if 'equipment_id' not in history.c:
+        return None
+    equipment = Equipment.__tablename__
+    code = ENTITIES['history'][0]
+    name = f'{INDEX_TABLE}_{equipment}_studio'
+    return name, (
+        f"CREATE TRIGGER {name} AFTER UPDATE OF studio_id ON {equipment} "
+        f"WHEN OLD.studio_id IS NOT NEW.studio_id BEGIN "
+        f"UPDATE {INDEX_TABLE} SET studio_id = NEW.studio_id "
+        f"WHERE rowid IN (SELECT id * 8 + {code} FROM {history.name} WHERE equipment_id = NEW.id); END"
+    )
+
+
+def _trigger_statements():
+    statements = []
+    for entity_type, (code, *_rest) in ENTITIES.items():
+        table, columns, title, body, studio = _entity_sql(entity_type, 'NEW')
+        insert = (
+            f"INSERT INTO {INDEX_TABLE}(rowid, title, body, entity_type, entity_id, studio_id) "
+            f"VALUES (NEW.id * 8 + {code}, {title}, {body}, '{entity_type}', NEW.id, {studio});"
+        )
+        delete = f"DELETE FROM {INDEX_TABLE} WHERE rowid = OLD.id * 8 + {code};"
+        statements += [
+            f"DROP TRIGGER IF EXISTS {INDEX_TABLE}_{table}_ai",
+            f"DROP TRIGGER IF EXISTS {INDEX_TABLE}_{table}_au",
+            f"DROP TRIGGER IF EXISTS {INDEX_TABLE}_{table}_ad",
+            f"CREATE TRIGGER {INDEX_TABLE}_{table}_ai AFTER INSERT ON {table} BEGIN {insert} END",
+            # Only re-index when an indexed or studio key column changes, not on every is_read flip
+            f"CREATE TRIGGER {INDEX_TABLE}_{table}_au AFTER UPDATE OF {', '.join(columns)} ON {table} "
+            f"BEGIN {delete} {insert} END",
+            f"CREATE TRIGGER {INDEX_TABLE}_{table}_ad AFTER DELETE ON {table} BEGIN {delete} END",
+        ]
+    cascade = _history_studio_trigger()
+    if cascade:
+        statements += [f"DROP TRIGGER IF EXISTS {cascade[0]}", cascade[1]]
+    return statements
+
+
+def _signature():
+    return hashlib.sha1('\n'.join(_trigger_statements()).encode()).hexdigest()
+
+
+def _trigger_names():
+    names = set()
+    for entity_type in ENTITIES:
+        table = ENTITIES[entity_type][1].__table__.name
+        names.update(f'{INDEX_TABLE}_{table}_{suffix}' for suffix in ('ai', 'au', 'ad'))
+    cascade = _history_studio_trigger()
+    if cascade:
+        names.add(cascade[0])
+    return names
+
+
+def _content_fingerprints(connection):
+    """(rows, highest id) per entity type in the source tables and in the index"""
+    source = {}
+    for entity_type, (code, model, *_rest) in ENTITIES.items():
+        rows, highest = connection.execute(text(f"SELECT count(*), max(id) FROM {model.__table__.name}")).one()
+        source[entity_type] = (rows, highest)
+    indexed = {entity_type: (0, None) for entity_type in ENTITIES}
+    for row in connection.execute(text(
+        f"SELECT entity_type, count(*), max(entity_id) FROM {INDEX_TABLE} GROUP BY entity_type"
+    )):
+        if row[0] in indexed:
+            indexed[row[0]] = (row[1], row[2])
+    return source, indexed
+
+
+def rebuild_search_index():
+    """Repopulate the index from every source table"""
+    with db.engine.begin() as connection:
+        connection.execute(text(f"DELETE FROM {INDEX_TABLE}"))
+        for entity_type, (code, *_rest) in ENTITIES.items():
+            table, _, title, body, studio = _entity_sql(entity_type, 'src')
+            connection.execute(text(
+                f"INSERT INTO {INDEX_TABLE}(rowid, title, body, entity_type, entity_id, studio_id) "
+                f"SELECT src.id * 8 + {code}, {title}, {body}, '{entity_type}', src.id, {studio} FROM {table} AS src"
+            ))
+        connection.execute(text(f"INSERT INTO {INDEX_TABLE}({INDEX_TABLE}) VALUES ('optimize')"))
+
+
+def ensure_search_index():
+    """Create the FTS table and triggers; rebuild when the definition or the indexed content is out of date"""
+    if not is_available():
+        logger.info("Full-text search index skipped: requires SQLite FTS5")
+        return False
+
+    with db.engine.begin() as connection:
+        connection.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {INDEX_TABLE} USING fts5("
+            f"title, body, entity_type UNINDEXED, entity_id UNINDEXED, studio_id UNINDEXED, tokenize='trigram')"
+        ))
+        connection.execute(text(f"CREATE TABLE IF NOT EXISTS {META_TABLE} (key TEXT PRIMARY KEY, value TEXT)"))
+        stored = connection.execute(text(f"SELECT value FROM {META_TABLE} WHERE key = 'signature'")).scalar()
+        existing = {row[0] for row in connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'trigger'"))}
+        triggers_missing = bool(_trigger_names() - existing)
+        for statement in _trigger_statements():
+            connection.execute(text(statement))
+        source, indexed = _content_fingerprints(connection)
+
+    signature = _signature()
+    if stored != signature or triggers_missing or source != indexed:
+        logger.info("Rebuilding full-text search index")
+        rebuild_search_index()
+        with db.engine.begin() as connection:
+            connection.execute(text(f"INSERT OR REPLACE INTO {META_TABLE} (key, value) VALUES ('signature', :value)"),
+                               {'value': signature})
+    return True
+
+
+def build_match_query(query):
+    """Turn free text into an FTS5 query: every term of 3+ characters must match"""
+    terms = [term for term in query.split() if len(term) >= MIN_TERM_LENGTH]
+    if not terms:
+        raise ValueError(f'Search terms must be at least {MIN_TERM_LENGTH} characters')
+    return ' AND '.join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def _marked(value):
+    return html.escape(value or '').replace(_MARK_OPEN, '<mark>').replace(_MARK_CLOSE, '</mark>')
+
+
+def search(query, entity_type=None, studio_id=None, limit=20, offset=0):
+    """Ranked, highlighted matches plus per-entity-type facet counts"""
+    match = build_match_query(query)
+    filters = ''
+    params = {'match': match, 'limit': max(1, min(int(limit), MAX_RESULTS)), 'offset': max(0, int(offset))}
+    if studio_id:
+        filters += ' AND studio_id = :studio_id'
+        params['studio_id'] = int(studio_id)
+
+    # Facets ignore the type filter so the UI can show counts for every tab
+    facets = {
+        row.entity_type: row.hits for row in db.session.execute(text(
+            f"SELECT entity_type, count(*) AS hits FROM {INDEX_TABLE} "
+            f"WHERE {INDEX_TABLE} MATCH :match{filters} GROUP BY entity_type"
+        ), params)
+    }
+
+    if entity_type:
+        if entity_type not in ENTITIES:
+            raise ValueError(f'Invalid entity type: {entity_type}')
+        filters += ' AND entity_type = :entity_type'
+        params['entity_type'] = entity_type
+
+    rows = db.session.execute(text(
+        f"SELECT entity_type, entity_id, studio_id, bm25({INDEX_TABLE}, 10.0, 1.0) AS score, "
+        f"highlight({INDEX_TABLE}, 0, '{_MARK_OPEN}', '{_MARK_CLOSE}') AS title, "
+        f"snippet({INDEX_TABLE}, 1, '{_MARK_OPEN}', '{_MARK_CLOSE}', '…', 16) AS snippet "
+        f"FROM {INDEX_TABLE} WHERE {INDEX_TABLE} MATCH :match{filters} "
+        f"ORDER BY score LIMIT :limit OFFSET :offset"
+    ), params)
+
+    results = [{
+        'entity_type': row.entity_type,
+        'id': row.entity_id,
+        'studio_id': row.studio_id,
+        'score': -row.score,
+        'title': _marked(row.title),
+        'snippet': _marked(row.snippet)
+    } for row in rows]
+
+    return {
+        'query': query,
+        'total': sum(facets.values()) if not entity_type else facets.get(entity_type, 0),
+        'facets': facets,
+        'results': results
+    }
@@ -0,0 +1,472 @@
+"""
+Technician assignment for open maintenance schedules.
+
+Open work in a planning horizon is assigned to technicians with a per-day
+capacity in minutes. A heap-based greedy places jobs earliest-due-first (higher
+priority first on ties) on the least-loaded eligible technician, on the job's
+scheduled day or the first later day with room. A local search then swaps late
+jobs onto their due day in place of lower-priority work and evens out load
+between technicians on the same day.
+
+The solver works on plain Job/Technician tuples so it can be benchmarked
+without a database; load_open_jobs and apply_assignments bridge to
+MaintenanceSchedule. Open work includes virtual occurrences of recurrence
+rules in the horizon; applying an assignment to one materializes its row. A
+previewed plan carries a plan_token, an HMAC of the plan and the open work it
+was solved from, so the plan that gets applied is the one that was reviewed,
+and only while that work is unchanged.
+"""
+import heapq
+import hmac
+import json
+import time
+import hashlib
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import update, bindparam
+from src.models.maintenance import db, MaintenanceSchedule, TaskStatus, Priority
+from src.recurrence import RecurrenceRule, expand_virtual_occurrences, materialize_occurrence, schedule_keys
+
+PRIORITY_WEIGHTS = {Priority.LOW: 1, Priority.MEDIUM: 2, Priority.HIGH: 4, Priority.CRITICAL: 8}
+DEFAULT_HORIZON_DAYS = 14
+DEFAULT_CAPACITY_MINUTES = 480
+DEFAULT_DURATION_MINUTES = 60
+DEFAULT_TIME_LIMIT = 2.0
+
+# ``due`` and assigned days are day offsets from the plan start (negative = overdue).
+# Virtual occurrences have no id; ``occurrence`` is their (rule_id, ISO date).
+Job = namedtuple('Job', ['id', 'studio_id', 'due', 'duration', 'weight', 'technician', 'occurrence'], defaults=(None,))
+Technician = namedtuple('Technician', ['name', 'capacity_minutes', 'studio_ids'])
+
+
+class AssignmentSolver:
+    """Greedy plus local-search assignment of jobs to technician-days"""
+
+    def __init__(self, jobs, technicians, horizon_days, keep_existing=True, time_limit=DEFAULT_TIME_LIMIT):
+        self.jobs = jobs
+        self.technicians = technicians
+        self.days = horizon_days
+        self.keep_existing = keep_existing
+        self.time_limit = time_limit
+
+        self.capacity = [tech.capacity_minutes for tech in technicians]
+        self.loads = [[0] * len(technicians) for _ in range(horizon_days)]
+        # (technician, day) -> set of job indexes
+        self.cells = {}
+        # job index -> (technician, day)
+        self.placement = {}
+        self.locked = set()
+
+        # Technicians sharing the same studio restriction form one pool with its own heaps
+        pools = {}
+        for index, tech in enumerate(technicians):
+            key = frozenset(tech.studio_ids) if tech.studio_ids else None
+            pools.setdefault(key, []).append(index)
+        self.pools = list(pools.items())
+        self._pools_by_studio = {}
+
+    def _eligible(self, tech_index, job):
+        studios = self.technicians[tech_index].studio_ids
+        return not studios or job.studio_id in studios
+
+    def _candidate_pools(self, studio_id):
+        pools = self._pools_by_studio.get(studio_id)
+        if pools is None:
+            pools = [index for index, (key, _) in enumerate(self.pools) if key is None or studio_id in key]
+            self._pools_by_studio[studio_id] = pools
+        return pools
+
+    def _target(self, job_index):
+        return max(0, self.jobs[job_index].due)
+
+    def _lateness(self, job_index, day):
+        return max(0, day - self.jobs[job_index].due)
+
+    def _place(self, job_index, tech_index, day):
+        self.placement[job_index] = (tech_index, day)
+        self.loads[day][tech_index] += self.jobs[job_index].duration
+        self.cells.setdefault((tech_index, day), set()).add(job_index)
+
+    def _remove(self, job_index):
+        tech_index, day = self.placement.pop(job_index)
+        self.loads[day][tech_index] -= self.jobs[job_index].duration
+        self.cells[(tech_index, day)].discard(job_index)
+
+    def greedy(self):
+        names = {tech.name: index for index, tech in enumerate(self.technicians)}
+        free = []
+        for job_index, job in enumerate(self.jobs):
+            tech_index = names.get(job.technician)
+            if self.keep_existing and tech_index is not None:
+                self._place(job_index, tech_index, min(self._target(job_index), self.days - 1))
+                self.locked.add(job_index)
+            else:
+                free.append(job_index)
+
+        # heaps[day][pool] holds (load, technician) with exactly one entry per technician
+        heaps = []
+        for day in range(self.days):
+            day_heaps = []
+            for _, members in self.pools:
+                heap = [(self.loads[day][tech_index], tech_index) for tech_index in members]
+                heapq.heapify(heap)
+                day_heaps.append(heap)
+            heaps.append(day_heaps)
+
+        free.sort(key=lambda j: (self._target(j), -self.jobs[j].weight, -self.jobs[j].duration))
+        unassigned = []
+        for job_index in free:
+            job = self.jobs[job_index]
+            pools = self._candidate_pools(job.studio_id)
+            placed = False
+            for day in range(self._target(job_index), self.days):
+                # The least-loaded technician in each pool has the most room left
+                best = None
+                for pool in pools:
+                    load, tech_index = heaps[day][pool][0]
+                    if load + job.duration <= self.capacity[tech_index] and (best is None or load < best[0]):
+                        best = (load, pool)
+                if best is not None:
+                    load, tech_index = heapq.heappop(heaps[day][best[1]])
+                    self._place(job_index, tech_index, day)
+                    heapq.heappush(heaps[day][best[1]], (load + job.duration, tech_index))
+                    placed = True
+                    break
+            if not placed:
+                unassigned.append(job_index)
+        return unassigned
+
+    def _fits(self, tech_index, day, extra):
+        return self.loads[day][tech_index] + extra <= self.capacity[tech_index]
+
+    def improve_lateness(self, deadline):
+        """Move late jobs earlier, displacing lower-priority work where that lowers total cost"""
+        moves = 0
+        late = [j for j, (_, day) in self.placement.items() if j not in self.locked and day > self._target(j)]
+        late.sort(key=lambda j: (-self.jobs[j].weight, -self._lateness(j, self.placement[j][1])))
+
+        for job_index in late:
+            if time.perf_counter() > deadline:
+                break
+            job = self.jobs[job_index]
+            tech_from, day_from = self.placement[job_index]
+            cost_now = job.weight * self._lateness(job_index, day_from)
+            best = None
+
+            for day in range(self._target(job_index), day_from):
+                gain = cost_now - job.weight * self._lateness(job_index, day)
+                for tech_index in range(len(self.technicians)):
+                    if not self._eligible(tech_index, job):
+                        continue
+                    if self._fits(tech_index, day, job.duration):
+                        if best is None or gain >= best[0]:
+                            best = (gain, tech_index, day, None)
+                        break
+                    # Swap with a lower-priority job that frees enough room
+                    shortfall = self.loads[day][tech_index] + job.duration - self.capacity[tech_index]
+                    for other in self.cells.get((tech_index, day), ()):
+                        other_job = self.jobs[other]
+                        if other in self.locked or other_job.duration < shortfall or other_job.weight >= job.weight:
+                            continue
+                        if not self._eligible(tech_from, other_job):
+                            continue
+                        if self.loads[day_from][tech_from] - job.duration + other_job.duration > self.capacity[tech_from]:
+                            continue
+                        penalty = other_job.weight * (self._lateness(other, day_from) - self._lateness(other, day))
+                        if gain - penalty > 0 and (best is None or gain - penalty > best[0]):
+                            best = (gain - penalty, tech_index, day, other)
+                if best is not None and best[3] is None:
+                    break
+            if best is None:
+                continue
+
+            _, tech_index, day, other = best
+            self._remove(job_index)
+            if other is not None:
+                self._remove(other)
+                self._place(other, tech_from, day_from)
+            self._place(job_index, tech_index, day)
+            moves += 1
+        return moves
+
+    def improve_balance(self, deadline, rounds=50):
+        """Even out load between technicians on the same day by moving single jobs"""
+        moves = 0
+        for day in range(self.days):
+            for _ in range(rounds):
+                if time.perf_counter() > deadline:
+                    return moves
+                loads = self.loads[day]
+                ratios = sorted(range(len(loads)), key=lambda t: loads[t] / self.capacity[t])
+                low, high = ratios[0], ratios[-1]
+                gap = loads[high] - loads[low]
+                if gap <= 0:
+                    break
+                # Best single move halves the gap between the busiest and idlest technician
+                best = None
+                for job_index in self.cells.get((high, day), ()):
+                    job = self.jobs[job_index]
+                    if job_index in self.locked or job.duration >= gap or not self._eligible(low, job):
+                        continue
+                    if not self._fits(low, day, job.duration):
+                        continue
+                    score = abs(gap / 2 - job.duration)
+                    if best is None or score < best[0]:
+                        best = (score, job_index)
+                if best is None:
+                    break
+                self._remove(best[1])
+                self._place(best[1], low, day)
+                moves += 1
+        return moves
+
+    def metrics(self, unassigned):
+        lateness = [self._lateness(j, day) for j, (_, day) in self.placement.items()]
+        weighted = sum(self.jobs[j].weight * self._lateness(j, day) for j, (_, day) in self.placement.items())
+        utilization = [
+            sum(self.loads[day][t] for day in range(self.days)) / (self.capacity[t] * self.days)
+            for t in range(len(self.technicians))
+        ] if self.technicians and self.days else [0]
+        return {
+            'assigned': len(self.placement),
+            'unassigned': len(unassigned),
+            'late_jobs': sum(1 for days in lateness if days > 0),
+            'total_lateness_days': sum(lateness),
+            'weighted_lateness': weighted,
+            'utilization_min': round(min(utilization), 3),
+            'utilization_max': round(max(utilization), 3),
+            'utilization_mean': round(sum(utilization) / len(utilization), 3)
+        }
+
+    def solve(self):
+        started = time.perf_counter()
+        unassigned = self.greedy()
+        greedy_metrics = self.metrics(unassigned)
+        greedy_seconds = time.perf_counter() - started
+
+        deadline = started + self.time_limit
+        lateness_moves = self.improve_lateness(deadline)
+        balance_moves = self.improve_balance(deadline)
+
+        return {
+            'placement': dict(self.placement),
+            'unassigned': unassigned,
+            'greedy': greedy_metrics,
+            'final': self.metrics(unassigned),
+            'lateness_moves': lateness_moves,
+            'balance_moves': balance_moves,
+            'greedy_seconds': round(greedy_seconds, 3),
+            'elapsed_seconds': round(time.perf_counter() - started, 3)
+        }
+
+
+def parse_technicians(data):
+    """Build Technician tuples from request JSON"""
+    technicians = []
+    seen = set()
+    for entry in data or []:
+        if isinstance(entry, str):
+            entry = {'name': entry}
+        name = (entry.get('name') or '').strip()
+        if not name:
+            raise ValueError('Each technician needs a name')
+        if name in seen:
+            raise ValueError(f'Duplicate technician: {name}')
+        seen.add(name)
+        capacity = int(entry.get('capacity_minutes', DEFAULT_CAPACITY_MINUTES))
+        if capacity <= 0:
+            raise ValueError(f'capacity_minutes must be positive for {name}')
+        studio_ids = entry.get('studio_ids')
+        technicians.append(Technician(name, capacity, frozenset(int(s) for s in studio_ids) if studio_ids else None))
+    if not technicians:
+        raise ValueError('At least one technician is required')
+    return technicians
+
+
+def load_open_jobs(start, horizon_days, studio_id=None):
+    """
+    Open schedules due before the end of the horizon, overdue work included,
+    followed by virtual occurrences of recurrence rules within the horizon.
+    """
+    end = start + timedelta(days=horizon_days - 1)
+    query = db.session.query(
+        MaintenanceSchedule.id, MaintenanceSchedule.studio_id, MaintenanceSchedule.scheduled_date,
+        MaintenanceSchedule.estimated_duration_minutes, MaintenanceSchedule.priority,
+        MaintenanceSchedule.assigned_technician
+    ).filter(
+        MaintenanceSchedule.status.in_([TaskStatus.SCHEDULED, TaskStatus.OVERDUE]),
+        MaintenanceSchedule.scheduled_date <= end
+    )
+    if studio_id:
+        query = query.filter(MaintenanceSchedule.studio_id == studio_id)
+
+    jobs = [
+        Job(
+            row.id, row.studio_id, (row.scheduled_date - start).days,
+            row.estimated_duration_minutes or DEFAULT_DURATION_MINUTES,
+            PRIORITY_WEIGHTS.get(row.priority, 2), row.assigned_technician
+        )
+        for row in query.order_by(MaintenanceSchedule.id)
+    ]
+
+    virtual = expand_virtual_occurrences(start, end, studio_id=studio_id, real_keys=schedule_keys(start, end, studio_id))
+    for occurrence in sorted(virtual, key=lambda item: (item['rule_id'], item['occurrence_date'])):
+        occurrence_date = date.fromisoformat(occurrence['occurrence_date'])
+        jobs.append(Job(
+            None, occurrence['studio_id'], (occurrence_date - start).days,
+            occurrence['estimated_duration_minutes'] or DEFAULT_DURATION_MINUTES,
+            PRIORITY_WEIGHTS.get(Priority(occurrence['priority']) if occurrence['priority'] else None, 2),
+            occurrence['assigned_technician'], (occurrence['rule_id'], occurrence['occurrence_date'])
+        ))
+    return jobs
+
+
+def plan_assignments(technicians, start=None, horizon_days=DEFAULT_HORIZON_DAYS, studio_id=None,
+                     keep_existing=True, time_limit=DEFAULT_TIME_LIMIT):
+    """Solve assignments for open work; returns (jobs, solver result)"""
+    start = start or date.today()
+    jobs = load_open_jobs(start, horizon_days, studio_id)
+    solver = AssignmentSolver(jobs, technicians, horizon_days, keep_existing=keep_existing, time_limit=time_limit)
+    return jobs, solver.solve()
+
+
+def describe_plan(jobs, technicians, result, start):
+    """Assignments that differ from the current state, in API form"""
+    changes = []
+    for job_index, (tech_index, day) in sorted(result['placement'].items(), key=lambda item: item[0]):
+        job = jobs[job_index]
+        technician = technicians[tech_index].name
+        planned = start + timedelta(days=day)
+        if technician == job.technician and day == max(0, job.due):
+            continue
+        change = {
+            'schedule_id': job.id,
+            'technician': technician,
+            'planned_date': planned.isoformat(),
+            'scheduled_date': (start + timedelta(days=job.due)).isoformat(),
+            'previous_technician': job.technician,
+            'late_days': max(0, day - job.due)
+        }
+        if job.occurrence:
+            change['rule_id'], change['occurrence_date'] = job.occurrence
+        changes.append(change)
+    return changes
+
+
+def plan_token(secret_key, start, technicians, jobs, changes):
+    """HMAC of a plan together with the start date, technicians and open work it was solved from"""
+    payload = json.dumps([
+        start.isoformat(),
+        [[tech.name, tech.capacity_minutes, sorted(tech.studio_ids or ())] for tech in technicians],
+        [list(job) for job in jobs],
+        changes
+    ], sort_keys=True, separators=(',', ':'))
+    return hmac.new(secret_key.encode('utf-8'), payload.encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+def validate_changes(changes, jobs, technicians, start, horizon_days):
+    """
+    Check a submitted plan against the reloaded open work and technicians.
+
+    Every change must name one open job (by schedule_id, or rule_id and
+    occurrence_date for a virtual occurrence) at most once, a technician
+    allowed at its studio and a planned_date inside the horizon. Returns new
+    change dicts with scheduled_date taken from the job, not the request.
+    """
+    by_id = {job.id: job for job in jobs if job.id is not None}
+    by_occurrence = {job.occurrence: job for job in jobs if job.occurrence}
+    by_name = {tech.name: tech for tech in technicians}
+    end = start + timedelta(days=horizon_days - 1)
+
+    validated, seen = [], set()
+    for change in changes:
+        if not isinstance(change, dict):
+            raise ValueError('Each assignment must be an object')
+        if change.get('schedule_id') is not None:
+            job = by_id.get(change['schedule_id'])
+        else:
+            job = by_occurrence.get((change.get('rule_id'), change.get('occurrence_date')))
+        if job is None:
+            raise ValueError(f"Assignment for {change.get('schedule_id') or change.get('rule_id')} is not open work in the horizon")
+        if job in seen:
+            raise ValueError(f"Schedule {job.id or job.occurrence[0]} is assigned more than once")
+        seen.add(job)
+
+        technician = by_name.get(change.get('technician'))
+        if technician is None:
+            raise ValueError(f"Unknown technician: {change.get('technician')}")
+        if technician.studio_ids and job.studio_id not in technician.studio_ids:
+            raise ValueError(f'{technician.name} does not cover studio {job.studio_id}')
+        try:
+            planned = date.fromisoformat(change.get('planned_date'))
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid planned_date: {change.get('planned_date')}")
+        if planned < start or planned > end:
+            raise ValueError(f'planned_date {planned.isoformat()} is outside the planning horizon')
+
+        validated.append({
+            'schedule_id': job.id,
+            'rule_id': job.occurrence[0] if job.occurrence else None,
+            'occurrence_date': job.occurrence[1] if job.occurrence else None,
+            'technician': technician.name,
+            'planned_date': planned.isoformat(),
+            'scheduled_date': (start + timedelta(days=job.due)).isoformat()
+        })
+    return validated
+
+
+def apply_assignments(changes, start, reschedule=False):
+    """
+    Write a plan in one executemany UPDATE.
+
+    scheduled_date is only moved when ``reschedule`` is set, and never for work
+    that is already overdue, so overdue tracking stays intact. Virtual
+    occurrences in the plan are materialized first. ``changes`` should come
+    from validate_changes and are not modified.
+    """
+    table = MaintenanceSchedule.__table__
+    now = datetime.utcnow()
+    try:
+        changes = [dict(change) for change in changes]
+        for change in changes:
+            if change.get('schedule_id') is None:
+                rule = RecurrenceRule.query.get(change['rule_id'])
+                if rule is None:
+                    raise ValueError(f"Recurrence rule {change['rule_id']} not found")
+                change['schedule_id'] = materialize_occurrence(rule, date.fromisoformat(change['occurrence_date'])).id
+    except Exception:
+        db.session.rollback()
+        raise
+
+    technician_updates = [
+        {'b_id': change['schedule_id'], 'b_technician': change['technician'], 'b_updated_at': now}
+        for change in changes
+    ]
+    date_updates = [
+        {'b_id': change['schedule_id'], 'b_date': date.fromisoformat(change['planned_date']), 'b_updated_at': now}
+        for change in changes
+        if reschedule and change['planned_date'] != change['scheduled_date'] and date.fromisoformat(change['scheduled_date']) >= start
+    ]
+
+    try:
+        if technician_updates:
+            db.session.execute(
+                update(table).where(table.c.id == bindparam('b_id')).values(
+                    assigned_technician=bindparam('b_technician'), updated_at=bindparam('b_updated_at')
+                ),
+                technician_updates
+            )
+        if date_updates:
+            db.session.execute(
+                update(table).where(table.c.id == bindparam('b_id')).values(
+                    scheduled_date=bindparam('b_date'), updated_at=bindparam('b_updated_at')
+                ),
+                date_updates
+            )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return {'assigned': len(technician_updates), 'rescheduled': len(date_updates)}
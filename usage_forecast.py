@@ -0,0 +1,228 @@
+"""
+Usage-based maintenance forecasting.
+
+For every active device with usage_based_maintenance set, fit a usage rate
+(operating hours per day) by least squares over the recent daily points in the
+usage series store, predict the date its operating hours cross the next
+usage_threshold_hours boundary, and bring next_maintenance forward to that date
+when it falls before the calendar-based due date.
+
+Devices are processed in batches, each in one NumPy pass: the batch's daily
+blocks are decoded together, per-device regression sums come from bincount,
+and changed due dates are written with one executemany UPDATE.
+"""
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from sqlalchemy import select, update, bindparam
+from src.models.maintenance import db, Equipment
+from src.usage_series import EquipmentUsageBlock, FORMAT_VERSION, HOURS_SCALE, EPOCH, block_starts_between
+
+DEFAULT_WINDOW_DAYS = 30
+DEFAULT_BATCH_SIZE = 10000
+# Fewer daily points than this, or a slower rate, is not a usable trend
+MIN_POINTS = 3
+MIN_RATE_HOURS_PER_DAY = 0.01
+MAX_HORIZON_DAYS = 3650
+
+
+def decode_blocks(payloads, point_counts, block_starts):
+    """
+    Decode many usage blocks at once.
+
+    Returns (block_index, seconds, hours, cycles) arrays with one entry per
+    point; seconds are counted from usage_series.EPOCH.
+    """
+    point_counts = np.asarray(point_counts, dtype=np.int64)
+    raw = np.frombuffer(b''.join(payloads), dtype=np.uint8)
+    if raw.size == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0), empty
+
+    # Split the byte stream into varints: a byte below 0x80 ends one
+    ends = raw < 0x80
+    starts = np.flatnonzero(np.concatenate(([True], ends[:-1])))
+    varint_index = np.cumsum(np.concatenate(([0], ends[:-1]))).astype(np.int64)
+    shifts = (np.arange(raw.size) - starts[varint_index]) * 7
+    values = np.add.reduceat((raw & 0x7F).astype(np.int64) << shifts, starts)
+
+    # Each block is [version, count, 3 varints per point]
+    block_first = np.concatenate(([0], np.cumsum(2 + 3 * point_counts)[:-1]))
+    if np.any(values[block_first] != FORMAT_VERSION) or np.any(values[block_first + 1] != point_counts):
+        raise ValueError('Unsupported or corrupt usage block')
+
+    block_index = np.repeat(np.arange(point_counts.size), point_counts)
+    point_offsets = np.concatenate(([0], np.cumsum(point_counts)[:-1]))
+    position = np.arange(block_index.size) - point_offsets[block_index]
+    base = block_first[block_index] + 2 + 3 * position
+    zigzag = values[base[:, None] + np.arange(3)]
+    deltas = (zigzag >> 1) ^ -(zigzag & 1)
+
+    # Deltas restart at every block, so undo the running sum of earlier blocks
+    totals = np.cumsum(deltas, axis=0)
+    carried = np.vstack((np.zeros((1, 3), dtype=np.int64), totals))[point_offsets]
+    totals -= carried[block_index]
+
+    start_seconds = np.array([(start - EPOCH).total_seconds() for start in block_starts], dtype=np.int64)
+    seconds = totals[:, 0] + start_seconds[block_index]
+    return block_index, seconds, totals[:, 1] / HOURS_SCALE, totals[:, 2]
+
+
+def fit_usage_rates(device_index, days, hours, device_count):
+    """Least-squares hours-per-day slope per device; NaN where there's no usable trend"""
+    n = np.bincount(device_index, minlength=device_count).astype(float)
+    sum_t = np.bincount(device_index, days, device_count)
+    sum_h = np.bincount(device_index, hours, device_count)
+    sum_tt = np.bincount(device_index, days * days, device_count)
+    sum_th = np.bincount(device_index, days * hours, device_count)
+
+    denominator = n * sum_tt - sum_t * sum_t
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rates = (n * sum_th - sum_t * sum_h) / denominator
+    rates[(n < MIN_POINTS) | (denominator <= 0)] = np.nan
+    return rates, n
+
+
+def predict_threshold_dates(operating_hours, thresholds, rates):
+    """Days until each device crosses its next threshold boundary (NaN if unknown)"""
+    operating_hours = np.nan_to_num(operating_hours)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        boundaries = (np.floor(operating_hours / thresholds) + 1) * thresholds
+        days = np.ceil((boundaries - operating_hours) / rates)
+    usable = (thresholds > 0) & (rates >= MIN_RATE_HOURS_PER_DAY) & (days <= MAX_HORIZON_DAYS)
+    return np.where(usable, days, np.nan)
+
+
+def _forecast_batch(devices, today, window_start):
+    """Forecast one batch of device rows; returns {equipment_id: (predicted, next_maintenance, rate)}"""
+    ids = np.array([device.id for device in devices], dtype=np.int64)
+    blocks = db.session.execute(
+        select(
+            EquipmentUsageBlock.equipment_id, EquipmentUsageBlock.block_start,
+            EquipmentUsageBlock.point_count, EquipmentUsageBlock.payload
+        ).where(
+            EquipmentUsageBlock.resolution == 'day',
+            EquipmentUsageBlock.equipment_id.between(int(ids[0]), int(ids[-1])),
+            EquipmentUsageBlock.block_start.in_(block_starts_between(window_start, datetime.combine(today, datetime.min.time()), 'day')),
+            EquipmentUsageBlock.last_at >= window_start
+        )
+    ).all()
+
+    # Devices outside the batch can share the id range; keep only batch members
+    block_devices = np.array([block.equipment_id for block in blocks], dtype=np.int64)
+    slots = np.searchsorted(ids, block_devices)
+    in_batch = (slots < ids.size) & (ids[np.minimum(slots, ids.size - 1)] == block_devices)
+    blocks = [block for block, keep in zip(blocks, in_batch) if keep]
+    slots = slots[in_batch]
+
+    block_index, seconds, hours, _ = decode_blocks(
+        [block.payload for block in blocks],
+        [block.point_count for block in blocks],
+        [block.block_start for block in blocks]
+    )
+    now_seconds = (datetime.combine(today, datetime.min.time()) - EPOCH).total_seconds()
+    recent = seconds >= (window_start - EPOCH).total_seconds()
+    device_index, seconds, hours = slots[block_index][recent], seconds[recent], hours[recent]
+
+    # Uncompacted segments can repeat a day; keep its highest reading
+    order = np.lexsort((hours, seconds, device_index))
+    device_index, seconds, hours = device_index[order], seconds[order], hours[order]
+    last = np.ones(device_index.size, dtype=bool)
+    last[:-1] = (device_index[1:] != device_index[:-1]) | (seconds[1:] != seconds[:-1])
+    device_index, seconds, hours = device_index[last], seconds[last], hours[last]
+    days = (seconds - now_seconds) / 86400.0
+
+    rates, _ = fit_usage_rates(device_index, days, hours, ids.size)
+    operating_hours = np.array([device.operating_hours or 0 for device in devices], dtype=float)
+    thresholds = np.array([device.usage_threshold_hours or 0 for device in devices], dtype=float)
+    days_until = predict_threshold_dates(operating_hours, thresholds, rates)
+
+    today64 = np.datetime64(today, 'D')
+    last = np.array([device.last_maintenance for device in devices], dtype='datetime64[D]')
+    intervals = np.array([device.maintenance_interval_days or 90 for device in devices], dtype='timedelta64[D]')
+    calendar_due = last + intervals
+
+    forecast = ~np.isnan(days_until)
+    predicted = today64 + np.where(forecast, days_until, 0).astype('timedelta64[D]')
+    # Usage can only bring maintenance forward from the calendar due date
+    due = np.where(np.isnat(calendar_due), predicted, np.minimum(predicted, calendar_due))
+
+    results = {}
+    for position in np.flatnonzero(forecast):
+        results[devices[position].id] = (predicted[position].item(), due[position].item(), float(rates[position]))
+    return results
+
+
+def forecast_usage_maintenance(today=None, window_days=DEFAULT_WINDOW_DAYS, studio_id=None,
+                               dry_run=False, batch_size=DEFAULT_BATCH_SIZE, prediction_limit=100):
+    """
+    Forecast threshold crossings for all usage-based devices and write the
+    resulting next_maintenance dates in bulk (one transaction).
+
+    Returns a summary plus the soonest ``prediction_limit`` predictions.
+    """
+    started = time.perf_counter()
+    today = today or date.today()
+    window_start = datetime.combine(today - timedelta(days=window_days), datetime.min.time())
+
+    query = db.session.query(
+        Equipment.id, Equipment.operating_hours, Equipment.usage_threshold_hours,
+        Equipment.last_maintenance, Equipment.maintenance_interval_days, Equipment.next_maintenance
+    ).filter(Equipment.is_active == True, Equipment.usage_based_maintenance == True)
+    if studio_id:
+        query = query.filter(Equipment.studio_id == studio_id)
+    devices = query.order_by(Equipment.id).all()
+
+    table = Equipment.__table__
+    statement = update(table).where(table.c.id == bindparam('b_id')).values(
+        next_maintenance=bindparam('b_next_maintenance'),
+        updated_at=bindparam('b_updated_at')
+    )
+    now = datetime.utcnow()
+
+    forecast_count = updated = 0
+    predictions = []
+    try:
+        for offset in range(0, len(devices), batch_size):
+            batch = devices[offset:offset + batch_size]
+            results = _forecast_batch(batch, today, window_start)
+            forecast_count += len(results)
+
+            changes = []
+            for device in batch:
+                if device.id not in results:
+                    continue
+                predicted, due, rate = results[device.id]
+                predictions.append({
+                    'equipment_id': device.id,
+                    'hours_per_day': round(rate, 2),
+                    'predicted_threshold_date': predicted.isoformat(),
+                    'next_maintenance': due.isoformat()
+                })
+                if due != device.next_maintenance:
+                    changes.append({'b_id': device.id, 'b_next_maintenance': due, 'b_updated_at': now})
+
+            if changes and not dry_run:
+                db.session.execute(statement, changes)
+            updated += len(changes)
+
+        if dry_run:
+            db.session.rollback()
+        else:
+            db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    predictions.sort(key=lambda p: p['next_maintenance'])
+    return {
+        'devices': len(devices),
+        'forecast': forecast_count,
+        'insufficient_data': len(devices) - forecast_count,
+        'updated': updated,
+        'window_days': window_days,
+        'dry_run': dry_run,
+        'elapsed_seconds': round(time.perf_counter() - started, 3),
+        'predictions': predictions[:prediction_limit]
+    }
@@ -0,0 +1,341 @@
+"""
+Compact append-only store for equipment usage time series.
+
+Equipment.operating_hours and power_cycles only hold the latest counters. Every
+reading is also kept here, packed into per-device blocks rather than one row
+per reading:
+
+    raw   - every reading, one block per device per calendar month
+    hour  - max counters per hour, one block per device per calendar month
+    day   - max counters per day, one block per device per calendar year
+
+A block payload is a sequence of (timestamp, operating_hours, power_cycles)
+points, delta encoded as zigzag varints (timestamps in seconds, hours in
+hundredths). Hourly and daily aggregates are maintained on write, so a year of
+daily data for one device is read from one or two blocks and a year of hourly
+data from thirteen.
+
+Writes never touch existing rows: each batch inserts one new segment per block
+it covers, holding only that batch's points, so concurrent ingesters can't lose
+each other's points and an append costs the same however full a block is.
+Readers merge a block's segments in write order, and compact_usage_blocks
+folds them back into one row per block.
+"""
+from datetime import datetime, timedelta
+from itertools import groupby
+
+from sqlalchemy import insert, delete, func
+from src.models.maintenance import db, Equipment
+
+FORMAT_VERSION = 1
+HOURS_SCALE = 100
+# Timestamps are naive UTC; encode them as seconds from this epoch
+EPOCH = datetime(1970, 1, 1)
+# Block keys per IN query / executemany batch
+BLOCK_CHUNK_SIZE = 500
+
+RESOLUTIONS = ('raw', 'hour', 'day')
+
+
+class EquipmentUsageBlock(db.Model):
+    __tablename__ = 'equipment_usage_blocks'
+    __table_args__ = (
+        db.Index('ix_usage_block_key', 'equipment_id', 'resolution', 'block_start'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    equipment_id = db.Column(db.Integer, db.ForeignKey(f'{Equipment.__tablename__}.id'), nullable=False, index=True)
+    resolution = db.Column(db.String(8), nullable=False)
+    block_start = db.Column(db.DateTime, nullable=False)
+    first_at = db.Column(db.DateTime, nullable=False)
+    last_at = db.Column(db.DateTime, nullable=False)
+    point_count = db.Column(db.Integer, nullable=False, default=0)
+    payload = db.Column(db.LargeBinary, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+def _zigzag(value):
+    return value << 1 if value >= 0 else ((-value) << 1) - 1
+
+
+def _unzigzag(value):
+    return value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+
+def _write_varint(buffer, value):
+    while value >= 0x80:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def _read_varint(payload, offset):
+    result = shift = 0
+    while True:
+        byte = payload[offset]
+        offset += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, offset
+        shift += 7
+
+
+def _seconds(timestamp):
+    return int((timestamp - EPOCH).total_seconds())
+
+
+def encode_points(block_start, points):
+    """Pack sorted (timestamp, hours, cycles) points into a block payload"""
+    buffer = bytearray([FORMAT_VERSION])
+    _write_varint(buffer, len(points))
+    previous = (_seconds(block_start), 0, 0)
+    for timestamp, hours, cycles in points:
+        current = (_seconds(timestamp), int(round(hours * HOURS_SCALE)), int(cycles))
+        for value, last in zip(current, previous):
+            _write_varint(buffer, _zigzag(value - last))
+        previous = current
+    return bytes(buffer)
+
+
+def decode_points(block_start, payload):
+    """Unpack a block payload into a list of (timestamp, hours, cycles)"""
+    if not payload or payload[0] != FORMAT_VERSION:
+        raise ValueError('Unsupported usage block format')
+    count, offset = _read_varint(payload, 1)
+    points = []
+    seconds, hours, cycles = _seconds(block_start), 0, 0
+    for _ in range(count):
+        deltas = []
+        for _ in range(3):
+            value, offset = _read_varint(payload, offset)
+            deltas.append(_unzigzag(value))
+        seconds += deltas[0]
+        hours += deltas[1]
+        cycles += deltas[2]
+        points.append((EPOCH + timedelta(seconds=seconds), hours / HOURS_SCALE, cycles))
+    return points
+
+
+def bucket_start(timestamp, resolution):
+    """Timestamp a point is stored under at ``resolution``"""
+    if resolution == 'hour':
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    if resolution == 'day':
+        return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    return timestamp.replace(microsecond=0)
+
+
+def block_start_for(timestamp, resolution):
+    """Start of the block holding ``timestamp`` at ``resolution``"""
+    if resolution == 'day':
+        return datetime(timestamp.year, 1, 1)
+    return datetime(timestamp.year, timestamp.month, 1)
+
+
+def block_starts_between(start, end, resolution):
+    """Every block start covering [start, end]"""
+    starts = []
+    current = block_start_for(start, resolution)
+    while current <= end:
+        starts.append(current)
+        if resolution == 'day':
+            current = datetime(current.year + 1, 1, 1)
+        else:
+            current = datetime(current.year + (current.month == 12), current.month % 12 + 1, 1)
+    return starts
+
+
+def _bucket_points(new_points, resolution, fallback):
+    """
+    Turn one batch's readings for a block into sorted segment points.
+
+    Raw readings replace a reading with the same timestamp; hourly and daily
+    buckets keep the max of each counter since both only ever grow. A counter
+    missing from a reading is carried forward from the previous point.
+    """
+    merged = {}
+    for timestamp, hours, cycles in new_points:
+        key = bucket_start(timestamp, resolution)
+        current = merged.get(key)
+        if current is None or resolution == 'raw':
+            merged[key] = [hours, cycles] if current is None else [
+                hours if hours is not None else current[0],
+                cycles if cycles is not None else current[1]
+            ]
+        else:
+            for index, value in enumerate((hours, cycles)):
+                if value is not None and (current[index] is None or value > current[index]):
+                    current[index] = value
+
+    points = []
+    previous = fallback
+    for timestamp in sorted(merged):
+        hours, cycles = merged[timestamp]
+        hours = hours if hours is not None else (previous[0] or 0)
+        cycles = cycles if cycles is not None else (previous[1] or 0)
+        points.append((timestamp, hours, cycles))
+        previous = (hours, cycles)
+    return points
+
+
+def merge_segments(segments, resolution):
+    """Fold a block's decoded segments, oldest first, into one sorted point list"""
+    merged = {}
+    for segment in segments:
+        for timestamp, hours, cycles in segment:
+            current = merged.get(timestamp)
+            if current is None or resolution == 'raw':
+                merged[timestamp] = (hours, cycles)
+            else:
+                merged[timestamp] = (max(current[0], hours), max(current[1], cycles))
+    return [(timestamp, *merged[timestamp]) for timestamp in sorted(merged)]
+
+
+def _segment_row(equipment_id, resolution, block_start, points, written_at):
+    return {
+        'equipment_id': equipment_id,
+        'resolution': resolution,
+        'block_start': block_start,
+        'first_at': points[0][0],
+        'last_at': points[-1][0],
+        'point_count': len(points),
+        'payload': encode_points(block_start, points),
+        'updated_at': written_at
+    }
+
+
+def append_usage_points(points, fallback=None):
+    """
+    Append readings to the series store as new segments; the caller commits.
+
+    ``points`` is an iterable of (equipment_id, timestamp, hours, cycles) where
+    either counter may be None. ``fallback`` maps equipment_id to the
+    (hours, cycles) to assume when a device's first point lacks a counter.
+    Returns the number of segments written.
+    """
+    fallback = fallback or {}
+    pending = {}
+    for equipment_id, timestamp, hours, cycles in points:
+        for resolution in RESOLUTIONS:
+            key = (equipment_id, resolution, block_start_for(timestamp, resolution))
+            pending.setdefault(key, []).append((timestamp, hours, cycles))
+
+    now = datetime.utcnow()
+    rows = [
+        _segment_row(equipment_id, resolution, block_start,
+                     _bucket_points(block_points, resolution, fallback.get(equipment_id, (0, 0))), now)
+        for (equipment_id, resolution, block_start), block_points in pending.items()
+    ]
+
+    table = EquipmentUsageBlock.__table__
+    for start in range(0, len(rows), BLOCK_CHUNK_SIZE):
+        db.session.execute(insert(table), rows[start:start + BLOCK_CHUNK_SIZE])
+    return len(rows)
+
+
+def compact_usage_blocks(chunk_size=BLOCK_CHUNK_SIZE):
+    """
+    Fold every block with more than one segment back into a single row.
+
+    Only the segments that were read are deleted, so points appended while this
+    runs survive as newer segments. The merged row keeps the write time of its
+    newest segment to stay in order with them. Commits after each chunk of
+    blocks and returns the number of blocks compacted.
+    """
+    table = EquipmentUsageBlock.__table__
+    keys = db.session.query(
+        table.c.equipment_id, table.c.resolution, table.c.block_start
+    ).group_by(
+        table.c.equipment_id, table.c.resolution, table.c.block_start
+    ).having(func.count() > 1).all()
+
+    compacted = 0
+    for start in range(0, len(keys), chunk_size):
+        chunk = {tuple(key) for key in keys[start:start + chunk_size]}
+        rows = db.session.query(
+            table.c.id, table.c.equipment_id, table.c.resolution, table.c.block_start,
+            table.c.payload, table.c.updated_at
+        ).filter(
+            table.c.equipment_id.in_({key[0] for key in chunk}),
+            table.c.block_start.in_({key[2] for key in chunk})
+        ).order_by(table.c.updated_at, table.c.id)
+
+        segments = {}
+        for row in rows:
+            key = (row.equipment_id, row.resolution, row.block_start)
+            if key in chunk:
+                segments.setdefault(key, []).append(row)
+
+        merged_rows, segment_ids = [], []
+        for (equipment_id, resolution, block_start), block_rows in segments.items():
+            if len(block_rows) < 2:
+                continue
+            points = merge_segments([decode_points(block_start, row.payload) for row in block_rows], resolution)
+            merged_rows.append(_segment_row(equipment_id, resolution, block_start, points, block_rows[-1].updated_at))
+            segment_ids.extend(row.id for row in block_rows)
+
+        if merged_rows:
+            db.session.execute(insert(table), merged_rows)
+            for offset in range(0, len(segment_ids), chunk_size):
+                db.session.execute(delete(table).where(table.c.id.in_(segment_ids[offset:offset + chunk_size])))
+        db.session.commit()
+        compacted += len(merged_rows)
+
+    return compacted
+
+
+def pick_resolution(start, end):
+    """Coarsest-sensible resolution for a range when none is requested"""
+    span = end - start
+    if span <= timedelta(days=2):
+        return 'raw'
+    if span <= timedelta(days=90):
+        return 'hour'
+    return 'day'
+
+
+def query_usage_series(equipment_id, start, end, resolution=None):
+    """
+    Return points for one device between ``start`` and ``end`` inclusive.
+
+    Each point carries the cumulative counters and the hours/cycles used since
+    the previous point in the range.
+    """
+    resolution = resolution or pick_resolution(start, end)
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f'Invalid resolution: {resolution}')
+
+    blocks = EquipmentUsageBlock.query.filter(
+        EquipmentUsageBlock.equipment_id == equipment_id,
+        EquipmentUsageBlock.resolution == resolution,
+        EquipmentUsageBlock.block_start.in_(block_starts_between(start, end, resolution)),
+        EquipmentUsageBlock.last_at >= start,
+        EquipmentUsageBlock.first_at <= end
+    ).order_by(
+        EquipmentUsageBlock.block_start, EquipmentUsageBlock.updated_at, EquipmentUsageBlock.id
+    ).all()
+
+    series = []
+    previous = None
+    for block_start, segments in groupby(blocks, key=lambda block: block.block_start):
+        points = merge_segments([decode_points(block_start, block.payload) for block in segments], resolution)
+        for timestamp, hours, cycles in points:
+            if timestamp < start or timestamp > end:
+                continue
+            series.append({
+                'timestamp': timestamp.isoformat(),
+                'operating_hours': hours,
+                'power_cycles': cycles,
+                'hours_used': round(hours - previous[0], 2) if previous else None,
+                'cycles_added': cycles - previous[1] if previous else None
+            })
+            previous = (hours, cycles)
+
+    return {
+        'equipment_id': equipment_id,
+        'resolution': resolution,
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'blocks_read': len(blocks),
+        'points': series
+    }
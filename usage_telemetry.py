@@ -0,0 +1,193 @@
+"""
+Batched ingestion of device usage telemetry.
+
+AV controllers report cumulative operating hours and power cycles for every
+device. Readings are coalesced per device (the most recent reading wins, as the
+counters are cumulative), applied with one executemany UPDATE per chunk, and
+usage-based next_maintenance is recomputed only for devices whose reading
+crossed a usage_threshold_hours boundary. Every reading is also appended to the
+usage series store for trending.
+"""
+from datetime import datetime, timezone
+
+from sqlalchemy import update, bindparam, func
+from src.models.maintenance import db, Equipment
+from src.bulk_import import DEFAULT_CHUNK_SIZE, MAX_REPORTED_ERRORS
+from src.usage_series import append_usage_points
+
+
+def _parse_reading(record):
+    """Validate one raw reading; returns (equipment_id, hours, cycles, recorded_at)"""
+    try:
+        equipment_id = int(record['equipment_id'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError('Missing or invalid equipment_id')
+
+    hours = record.get('operating_hours')
+    cycles = record.get('power_cycles')
+    if hours in (None, '') and cycles in (None, ''):
+        raise ValueError('Reading must include operating_hours or power_cycles')
+
+    try:
+        hours = float(hours) if hours not in (None, '') else None
+        cycles = int(cycles) if cycles not in (None, '') else None
+    except (TypeError, ValueError):
+        raise ValueError('operating_hours and power_cycles must be numeric')
+    if (hours is not None and hours < 0) or (cycles is not None and cycles < 0):
+        raise ValueError('operating_hours and power_cycles cannot be negative')
+
+    recorded_at = record.get('recorded_at')
+    if recorded_at:
+        try:
+            recorded_at = datetime.fromisoformat(str(recorded_at).replace('Z', '+00:00'))
+        except ValueError:
+            raise ValueError(f'Invalid recorded_at: {recorded_at}')
+        # Stored naive in UTC like every other timestamp
+        if recorded_at.tzinfo is not None:
+            recorded_at = recorded_at.astimezone(timezone.utc).replace(tzinfo=None)
+
+    return equipment_id, hours, cycles, recorded_at
+
+
+def coalesce_readings(records):
+    """
+    Reduce raw readings to one reading per device.
+
+    ``records`` yields (line_number, record, error) tuples as produced by
+    parse_import_records. Returns ({equipment_id: reading}, errors, rejected,
+    received); errors is capped at MAX_REPORTED_ERRORS, rejected is not.
+    """
+    latest = {}
+    errors = []
+    rejected = 0
+    received = 0
+    received_at = datetime.utcnow().replace(microsecond=0)
+
+    for line_number, record, error in records:
+        received += 1
+        if error is None:
+            try:
+                equipment_id, hours, cycles, recorded_at = _parse_reading(record)
+            except ValueError as e:
+                error = str(e)
+        if error is not None:
+            rejected += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({'line': line_number, 'error': error})
+            continue
+
+        current = latest.get(equipment_id)
+        point = (recorded_at or received_at, hours, cycles)
+        if current is not None:
+            current['points'].append(point)
+        # Undated readings count as arriving in request order
+        if current is None or recorded_at is None or current['recorded_at'] is None or recorded_at >= current['recorded_at']:
+            merged = {'equipment_id': equipment_id, 'operating_hours': hours, 'power_cycles': cycles,
+                      'recorded_at': recorded_at, 'line': line_number,
+                      'points': current['points'] if current is not None else [point]}
+            if current is not None:
+                # Keep a counter the newer reading didn't carry
+                if merged['operating_hours'] is None:
+                    merged['operating_hours'] = current['operating_hours']
+                if merged['power_cycles'] is None:
+                    merged['power_cycles'] = current['power_cycles']
+            latest[equipment_id] = merged
+
+    return latest, errors, rejected, received
+
+
+def _crossed_threshold(old_hours, new_hours, threshold):
+    """True when usage moved past a multiple of ``threshold`` hours"""
+    if not threshold or threshold <= 0 or new_hours is None:
+        return False
+    return int((new_hours or 0) // threshold) > int((old_hours or 0) // threshold)
+
+
+def apply_usage_readings(readings, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Apply coalesced readings to Equipment in chunked executemany UPDATEs.
+
+    Returns (updated_ids, recalculated_ids, missing_ids).
+    """
+    table = Equipment.__table__
+    statement = (
+        update(table)
+        .where(table.c.id == bindparam('b_id'))
+        .values(
+            operating_hours=func.coalesce(bindparam('b_hours'), table.c.operating_hours),
+            power_cycles=func.coalesce(bindparam('b_cycles'), table.c.power_cycles),
+            updated_at=bindparam('b_updated_at')
+        )
+    )
+
+    updated, recalculated, missing = [], [], []
+    ids = list(readings)
+    now = datetime.utcnow()
+
+    for start in range(0, len(ids), chunk_size):
+        chunk_ids = ids[start:start + chunk_size]
+        current = {
+            row.id: row for row in db.session.query(
+                Equipment.id, Equipment.operating_hours, Equipment.power_cycles,
+                Equipment.usage_based_maintenance, Equipment.usage_threshold_hours
+            ).filter(Equipment.id.in_(chunk_ids))
+        }
+
+        params = []
+        crossed = []
+        for equipment_id in chunk_ids:
+            device = current.get(equipment_id)
+            if device is None:
+                missing.append(equipment_id)
+                continue
+            reading = readings[equipment_id]
+            params.append({
+                'b_id': equipment_id,
+                'b_hours': reading['operating_hours'],
+                'b_cycles': reading['power_cycles'],
+                'b_updated_at': now
+            })
+            if device.usage_based_maintenance and _crossed_threshold(
+                device.operating_hours, reading['operating_hours'], device.usage_threshold_hours
+            ):
+                crossed.append(equipment_id)
+
+        if params:
+            db.session.execute(statement, params)
+            updated.extend(p['b_id'] for p in params)
+            append_usage_points(
+                ((p['b_id'], *point) for p in params for point in readings[p['b_id']]['points']),
+                fallback={p['b_id']: (current[p['b_id']].operating_hours, current[p['b_id']].power_cycles) for p in params}
+            )
+
+        # Only devices that crossed a usage boundary need the model's rescheduling logic
+        if crossed:
+            for equipment in Equipment.query.filter(Equipment.id.in_(crossed)):
+                equipment.next_maintenance = equipment.calculate_next_maintenance()
+            recalculated.extend(crossed)
+
+        db.session.commit()
+
+    return updated, recalculated, missing
+
+
+def ingest_usage_readings(records, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Coalesce and apply a batch of readings; returns a report for the API"""
+    if chunk_size < 1:
+        raise ValueError('chunk_size must be at least 1')
+    readings, errors, rejected, received = coalesce_readings(records)
+    updated, recalculated, missing = apply_usage_readings(readings, chunk_size=chunk_size)
+
+    for equipment_id in missing:
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append({'line': readings[equipment_id]['line'], 'error': f'Equipment {equipment_id} not found'})
+
+    return {
+        'received': received,
+        'devices': len(readings),
+        'devices_updated': len(updated),
+        'maintenance_recalculated': recalculated,
+        'rejected': rejected + len(missing),
+        'errors': errors,
+        'errors_truncated': rejected + len(missing) > len(errors)
+    }